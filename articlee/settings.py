@@ -59,20 +59,24 @@ CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 MIDDLEWARE = [
     'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'core.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.db.routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.page_cache.AnonymousPageCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'articlee.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # measures time of rendering for RequestMetricsMiddleware
+        'BACKEND': 'core.metrics.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -94,15 +98,44 @@ WSGI_APPLICATION = 'articlee.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'core.db.mysql_pool',
         'NAME': env("DB_NAME"),
         'HOST': env("DB_HOST"),
         'USER': env("DB_USER"),
         'PASSWORD': env("DB_PASSWORD"),
-        'PORT': env("DB_PORT")
+        'PORT': env("DB_PORT"),
+        # connections are returned to the pool at the end of
+        # a request, see core/db/mysql_pool/base.py
+        'POOL': {
+            'MAX_SIZE': env.int("DB_POOL_MAX_SIZE", default=10),
+            'TIMEOUT': env.int("DB_POOL_TIMEOUT", default=10),
+            'HEALTH_CHECK_INTERVAL': 30,
+            'MAX_AGE': 3600,
+        },
     }
 }
 
+# Read-only requests read from replicas, which are copies
+# of default database at hosts listed in DB_REPLICA_HOSTS
+REPLICA_DATABASES = []
+for number, host in enumerate(env.list("DB_REPLICA_HOSTS", default=[]), start=1):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+
+# Cache shared by all processes of the site, e.g. redis://127.0.0.1:6379/1
+# (needs redis package), without CACHE_URL every process has its own
+# memory cache, see PAGE_CACHE_LOCAL_MEMORY
+CACHES = {
+    'default': env.cache("CACHE_URL", default='locmemcache://'),
+}
+
+# Users read from default database for this many seconds after
+# they wrote something, so they see their changes before replicas do
+REPLICA_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -150,6 +183,27 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploaded images are also stored as WebP renditions of these sizes,
+# size is the biggest side of image in pixels
+IMAGE_RENDITIONS = {
+    'thumb': 100,
+    'card': 600,
+    'large': 1200,
+}
+
+IMAGE_RENDITION_QUALITY = 80
+
+# Uploaded images with more pixels are rejected by reading only their
+# header, decoding them would take too much memory of worker
+IMAGE_MAX_PIXELS = 24_000_000
+
+# Jobs of local queue run by 'run_worker' command, failed job is tried
+# again after JOB_RETRY_DELAY seconds multiplied by number of attempts,
+# job running longer than JOB_TIMEOUT seconds is given to another worker
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 60
+JOB_TIMEOUT = 600
+
 MESSAGE_TAGS = {
     messages.DEBUG: 'alert-secondary',
     messages.INFO: 'alert-info',
@@ -162,6 +216,58 @@ LOGIN_URL = reverse_lazy('core:become-user')
 
 TAGGIT_CASE_INSENSITIVE = True
 
+# Reads of articles are buffered in memory of each process and written
+# to the database at most every READ_COUNTER_FLUSH_INTERVAL seconds,
+# or earlier, when READ_COUNTER_MAX_PENDING articles have pending reads
+READ_COUNTER_FLUSH_INTERVAL = 10
+
+READ_COUNTER_MAX_PENDING = 500
+
+# Tag cloud of index page is cached and invalidated, when tags of articles
+# change, timeout limits staleness for caches that are not shared between processes
+TAG_CLOUD_CACHE_TIMEOUT = 300
+
+# Rendered cards of articles in lists are cached until article, its tags
+# or its author change, timeout has the same purpose as above
+ARTICLE_CARD_CACHE_TIMEOUT = 300
+
+# Pages for visitors that are not logged in are cached whole and purged
+# when objects they show change, timeout limits staleness of counters
+# like times read, which change without purging, 0 turns cache off
+PAGE_CACHE_TIMEOUT = 60
+
+# Purges of pages reach other processes only through a shared cache,
+# so with local memory cache pages are cached only in development
+PAGE_CACHE_LOCAL_MEMORY = DEBUG
+
+# Number of articles stored for each user by 'build_recommendations' command
+RECOMMENDATIONS_PER_USER = 20
+
+# Weight of a read, like or comment in trending score of an article
+# halves every TRENDING_HALF_LIFE_HOURS, scores are updated by
+# 'update_trending' management command, which should be run periodically
+TRENDING_HALF_LIFE_HOURS = 24
+
+# Events are added to trending scores only when they are older than
+# TRENDING_LAG_SECONDS, so events inserted by transactions that were
+# still running during an update are not skipped. It must be longer
+# than any transaction inserting readings, reactions or comments
+TRENDING_LAG_SECONDS = 300
+
+# On MySQL articles are searched with FULLTEXT index,
+# set to False to use inverted index table that works on every database
+SEARCH_USE_FULLTEXT = True
+
+# Number of articles on one page of lists of articles
+ARTICLES_PER_PAGE = 20
+
+# Number of comments on one page and in one 'load more' fragment
+COMMENTS_PER_PAGE = 20
+
+# Number of the latest requests of every view whose measures
+# are kept for percentiles shown at 'core:request-stats'
+REQUEST_METRICS_SAMPLES = 1000
+
 INTERNAL_IPS = [
     # ...
     "127.0.0.1",
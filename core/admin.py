@@ -5,13 +5,15 @@ from django.http.request import HttpRequest
 from django.utils.html import format_html
 from django.db.models.query_utils import Q
 from users.models import CustomUser
-from core.models import Article, Comment, Reaction
+from core.models import Article, Comment, Job, Reaction
+from core.renditions import get_rendition_url
 
 
 @admin.register(Article)
 class ArticleAdmin(admin.ModelAdmin):
-    list_display = ['title', 'author', 'times_read',
+    list_display = ['title', 'author', 'times_read', 'likes', 'dislikes',
                     'pub_date', 'tag_list', 'image_tag']
+    readonly_fields = ['likes', 'dislikes']
     list_filter = ['title', 'tags', 'author', 'pub_date']
     search_fields = ['title']
 
@@ -23,7 +25,8 @@ class ArticleAdmin(admin.ModelAdmin):
         return u", ".join(o.name for o in obj.tags.all())
 
     def image_tag(self, obj):
-        return format_html(f'<img src="{obj.image.url}" width="100" height="100">')
+        return format_html('<img src="{}" width="100" height="100">',
+                           get_rendition_url(obj.image, 'thumb'))
 
     image_tag.short_description = 'Article image'
 
@@ -44,7 +47,8 @@ class CustomUserAdmin(admin.ModelAdmin):
             return None
         elif not obj.user_image:
             return None
-        return format_html(f'<img src="{obj.user_image.url}" width="100" height="100">')
+        return format_html('<img src="{}" width="100" height="100">',
+                           get_rendition_url(obj.user_image, 'thumb'))
     image_tag.short_description = "User's image"
 
 
@@ -58,3 +62,10 @@ class CommentAdmin(admin.ModelAdmin):
     def get_queryset(self, request: HttpRequest) -> QuerySet[Any]:
         return super().get_queryset(request).\
             select_related('user', 'article')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'run_after', 'created']
+    list_filter = ['name', 'status']
+    readonly_fields = ['started', 'last_error']
@@ -0,0 +1,46 @@
+import hashlib
+from calendar import timegm
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*values):
+    return quote_etag(hashlib.md5(repr(values).encode()).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    Mixin for views that answer GET of visitors, that are not
+    logged in, with 304 Not Modified when page has not changed.
+    Validators are computed by get_validators before the view runs,
+    so they have to be cheaper than the view itself
+    """
+
+    def get_validators(self):
+        # returns ETag made with make_etag and last modification
+        # datetime, any of them can be None
+        return None, None
+
+    def can_validate(self, request):
+        # pages of logged users and pages with messages
+        # are different for every request
+        return request.method in ('GET', 'HEAD') and \
+            not request.user.is_authenticated and \
+            not len(get_messages(request))
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.can_validate(request):
+            return super().dispatch(request, *args, **kwargs)
+        etag, last_modified = self.get_validators()
+        timestamp = timegm(last_modified.utctimetuple()) if last_modified else None
+        response = get_conditional_response(request, etag=etag,
+                                            last_modified=timestamp)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if etag and not response.has_header('ETag'):
+                response['ETag'] = etag
+            if timestamp and not response.has_header('Last-Modified'):
+                response['Last-Modified'] = http_date(timestamp)
+        return response
@@ -0,0 +1,127 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from core.models import Article, AuthorStats
+
+logger = logging.getLogger(__name__)
+
+
+class ReadCounterBuffer:
+    """
+    Write-behind buffer for Article.times_read.
+    Reads are accumulated in memory of the process and written
+    periodically with one UPDATE per distinct increment, instead of
+    saving the whole Article row on every read.
+    Flush is a transaction of its own and is refused inside another one.
+    Flushes started by add() and flush_if_due() only log their errors,
+    a read is not failed because of them
+    """
+
+    def __init__(self):
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    @property
+    def flush_interval(self):
+        # number of seconds increments can stay in memory
+        return getattr(settings, 'READ_COUNTER_FLUSH_INTERVAL', 10)
+
+    @property
+    def max_pending(self):
+        # number of articles with pending increments that forces flush
+        return getattr(settings, 'READ_COUNTER_MAX_PENDING', 500)
+
+    def is_due(self):
+        return len(self._pending) >= self.max_pending or \
+            time.monotonic() - self._last_flush >= self.flush_interval
+
+    def add(self, article_id, amount=1):
+        with self._lock:
+            self._pending[article_id] += amount
+            should_flush = self.is_due()
+        if should_flush:
+            self.try_flush()
+
+    def flush_if_due(self):
+        with self._lock:
+            should_flush = bool(self._pending) and self.is_due()
+        if should_flush:
+            self.try_flush()
+
+    def pending(self, article_id):
+        with self._lock:
+            return self._pending[article_id]
+
+    def clear(self):
+        with self._lock:
+            self._pending = Counter()
+            self._last_flush = time.monotonic()
+
+    def try_flush(self):
+        # increments stay in the buffer when flush fails,
+        # so only the error is logged
+        try:
+            return self.flush()
+        except Exception:
+            logger.exception('Flush of read counters failed')
+            return 0
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        # articles that were read the same number of times
+        # are updated with a single statement
+        articles_by_amount = defaultdict(list)
+        for article_id, amount in pending.items():
+            articles_by_amount[amount].append(article_id)
+        try:
+            # durable, so increments are never committed or rolled back
+            # by a transaction of the caller after the buffer let them go,
+            # either all of them are written or none and they are returned
+            with transaction.atomic(durable=True):
+                for amount, ids in articles_by_amount.items():
+                    Article.objects.filter(id__in=ids).\
+                        update(times_read=F('times_read') + amount)
+                self.flush_authors(pending)
+        except Exception:
+            # increments are returned to the buffer,
+            # so they are written with the next flush
+            with self._lock:
+                self._pending.update(pending)
+            raise
+        return len(pending)
+
+    def flush_authors(self, pending):
+        # reads of all articles of an author are summed,
+        # then authors are grouped by amount like articles
+        authors = Article.objects.\
+            filter(id__in=list(pending)).\
+            values_list('id', 'author_id')
+        reads = Counter()
+        for article_id, author_id in authors:
+            reads[author_id] += pending[article_id]
+        authors_by_amount = defaultdict(list)
+        for author_id, amount in reads.items():
+            authors_by_amount[amount].append(author_id)
+        for amount, ids in authors_by_amount.items():
+            AuthorStats.objects.filter(user_id__in=ids).\
+                update(reads=F('reads') + amount)
+
+
+read_counter = ReadCounterBuffer()
+
+
+def flush_on_exit():
+    read_counter.try_flush()
+
+
+atexit.register(flush_on_exit)
@@ -0,0 +1,60 @@
+"""
+MySQL backend which keeps connections of each worker process in a
+pool, so closing a connection at the end of a request hands it over
+to the next one instead of disconnecting. Pool is configured with
+POOL key of database settings:
+
+    'POOL': {
+        'MAX_SIZE': 10,                 # connections per process
+        'TIMEOUT': 10,                  # seconds to wait for a free one
+        'HEALTH_CHECK_INTERVAL': 30,    # ping connections idle longer
+        'MAX_AGE': 3600,                # close connections older than
+    }
+"""
+from django.db.backends.mysql.base import Database
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+
+from core.db.pool import PoolTimeout, get_pool
+
+POOL_DEFAULTS = {
+    'MAX_SIZE': 10,
+    'TIMEOUT': 10,
+    'HEALTH_CHECK_INTERVAL': 30,
+    'MAX_AGE': 3600,
+}
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+    def get_pool(self, conn_params):
+        options = {**POOL_DEFAULTS, **self.settings_dict.get('POOL', {})}
+        return get_pool(
+            self.alias,
+            create=lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+            check=lambda connection: connection.ping(),
+            close=lambda connection: connection.close(),
+            max_size=options['MAX_SIZE'],
+            timeout=options['TIMEOUT'],
+            health_check_interval=options['HEALTH_CHECK_INTERVAL'],
+            max_age=options['MAX_AGE'],
+        )
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        try:
+            return self.pool.acquire()
+        except PoolTimeout as error:
+            raise Database.OperationalError(str(error)) from error
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # connections which broke or were closed in the middle
+        # of a transaction are not given to other requests
+        reusable = not (self.in_atomic_block or self.errors_occurred)
+        if reusable and not self.autocommit:
+            try:
+                self.connection.rollback()
+            except Database.Error:
+                reusable = False
+        with self.wrap_database_errors:
+            self.pool.release(self.connection, reusable=reusable)
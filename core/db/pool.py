@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PooledConnection:
+    def __init__(self, connection):
+        self.connection = connection
+        self.created = time.monotonic()
+        self.released = self.created
+
+
+class ConnectionPool:
+    """
+    Pool of open database connections of one process. Connections
+    are created by 'create', checked by 'check' when they were idle
+    longer than health_check_interval and closed by 'close' when they
+    are older than max_age or do not pass the check
+    """
+
+    def __init__(self, create, check, close, max_size=10, timeout=10,
+                 health_check_interval=30, max_age=3600):
+        self.create = create
+        self.check = check
+        self.close = close
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.max_age = max_age
+        self.condition = threading.Condition()
+        self.reset()
+
+    def reset(self):
+        # connections of parent process must not be
+        # used by processes forked from it
+        self.pid = os.getpid()
+        self.idle = []
+        self.in_use = {}
+        self.stats = {'created': 0, 'reused': 0, 'discarded': 0, 'waits': 0,
+                      'wait_time_total': 0.0, 'wait_time_max': 0.0}
+
+    def get_stats(self):
+        with self.condition:
+            return dict(self.stats, idle=len(self.idle), in_use=len(self.in_use),
+                        max_size=self.max_size)
+
+    def is_expired(self, pooled, now):
+        return now - pooled.created > self.max_age
+
+    def is_healthy(self, pooled, now):
+        if now - pooled.released < self.health_check_interval:
+            return True
+        try:
+            self.check(pooled.connection)
+        except Exception:
+            return False
+        return True
+
+    def discard(self, pooled):
+        self.stats['discarded'] += 1
+        try:
+            self.close(pooled.connection)
+        except Exception:
+            pass
+
+    def take_idle(self):
+        # called with condition held, returns None when
+        # no idle connection can be used
+        now = time.monotonic()
+        while self.idle:
+            pooled = self.idle.pop()
+            if self.is_expired(pooled, now) or not self.is_healthy(pooled, now):
+                self.discard(pooled)
+                continue
+            self.stats['reused'] += 1
+            return pooled
+        return None
+
+    def acquire(self):
+        with self.condition:
+            if self.pid != os.getpid():
+                self.reset()
+            started = time.monotonic()
+            waited = False
+            while True:
+                pooled = self.take_idle()
+                if pooled is None and len(self.in_use) < self.max_size:
+                    break
+                if pooled is not None:
+                    self.in_use[id(pooled.connection)] = pooled
+                    self.record_wait(started, waited)
+                    return pooled.connection
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.record_wait(started, waited)
+                    raise PoolTimeout(
+                        f'No database connection was released in {self.timeout} seconds')
+                waited = True
+                self.condition.wait(remaining)
+            self.record_wait(started, waited)
+            # place is reserved before connecting, so other threads
+            # do not go over max_size while this one connects
+            placeholder = object()
+            self.in_use[id(placeholder)] = placeholder
+        try:
+            connection = self.create()
+        except Exception:
+            with self.condition:
+                del self.in_use[id(placeholder)]
+                self.condition.notify()
+            raise
+        with self.condition:
+            del self.in_use[id(placeholder)]
+            self.in_use[id(connection)] = PooledConnection(connection)
+            self.stats['created'] += 1
+        return connection
+
+    def record_wait(self, started, waited):
+        if not waited:
+            return
+        wait_time = time.monotonic() - started
+        self.stats['waits'] += 1
+        self.stats['wait_time_total'] += wait_time
+        self.stats['wait_time_max'] = max(self.stats['wait_time_max'], wait_time)
+
+    def release(self, connection, reusable=True):
+        with self.condition:
+            pooled = self.in_use.pop(id(connection), None)
+            if pooled is None:
+                # connection of another process or of a reset pool
+                reusable = False
+                pooled = PooledConnection(connection)
+            if reusable:
+                pooled.released = time.monotonic()
+                self.idle.append(pooled)
+            else:
+                self.discard(pooled)
+            self.condition.notify()
+
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+def get_pool(alias, **options):
+    with pools_lock:
+        if alias not in pools:
+            pools[alias] = ConnectionPool(**options)
+        return pools[alias]
+
+
+def get_pool_stats():
+    return {alias: pool.get_stats() for alias, pool in pools.items()}
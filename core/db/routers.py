@@ -0,0 +1,73 @@
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'pin_primary'
+# reads go to replicas only in requests which only read
+use_replica = ContextVar('use_replica', default=False)
+wrote = ContextVar('wrote_to_primary', default=False)
+
+
+def get_replicas():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+def get_pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+class ReplicaRouter:
+    """
+    Sends reads of GET and HEAD requests to one of REPLICA_DATABASES,
+    everything else goes to default database. After the first write
+    of a request the rest of it reads from default database too
+    """
+    # sessions are read right after they are written by login
+    primary_apps = {'sessions'}
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if (not replicas or not use_replica.get() or wrote.get()
+                or model._meta.app_label in self.primary_apps):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas have the same data as default database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in get_replicas()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets reads of GET and HEAD requests go to replicas, unless user
+    wrote something in the last REPLICA_PIN_SECONDS. Cookie that pins
+    user to default database is set by requests that wrote, so
+    user sees what they published, commented or liked right away
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reads_only = request.method in ('GET', 'HEAD') and PIN_COOKIE not in request.COOKIES
+        use_replica_token = use_replica.set(reads_only)
+        wrote_token = wrote.set(False)
+        try:
+            response = self.get_response(request)
+            # writes of GET requests are counters and readings,
+            # which do not need to be seen right away
+            if wrote.get() and request.method not in ('GET', 'HEAD'):
+                response.set_cookie(PIN_COOKIE, '1', max_age=get_pin_seconds(),
+                                    httponly=True, samesite='Lax')
+        finally:
+            use_replica.reset(use_replica_token)
+            wrote.reset(wrote_token)
+        return response
@@ -0,0 +1,71 @@
+from collections import Counter
+from django.db.models import Count, F
+
+
+def get_duplicate_ids(queryset, fields, order_by):
+    # ids of all rows of every group except
+    # the first one in order_by order
+    groups = queryset.\
+        values(*fields).\
+        annotate(number=Count('id')).\
+        filter(number__gt=1).order_by()
+    ids = []
+    for group in groups:
+        rows = queryset.\
+            filter(**{field: group[field] for field in fields}).\
+            order_by(*order_by).\
+            values_list('id', flat=True)
+        ids.extend(list(rows)[1:])
+    return ids
+
+
+def decrease(queryset, key, field, numbers):
+    for pk, number in numbers.items():
+        queryset.filter(**{key: pk}).update(**{field: F(field) - number})
+
+
+def remove_duplicates(apps, dry_run=False):
+    """
+    Removes duplicated reactions and subscriptions and decreases
+    counters of articles and authors by the removed rows.
+
+    Works with historical models of migrations as well: rows are
+    deleted without signals and counters are changed with plain
+    UPDATEs, so nothing touches tables of later migrations.
+    Returns the numbers of duplicates of both models.
+    """
+    Reaction = apps.get_model('core', 'Reaction')
+    Subscription = apps.get_model('core', 'Subscription')
+    Article = apps.get_model('core', 'Article')
+    AuthorStats = apps.get_model('core', 'AuthorStats')
+
+    # the latest reaction is what user saw last
+    reaction_ids = get_duplicate_ids(Reaction.objects.all(), ('user', 'article'),
+                                     ('-reaction_date', '-id'))
+    subscription_ids = get_duplicate_ids(Subscription.objects.all(),
+                                         ('subscriber', 'subscribe_to'), ('id',))
+    if dry_run:
+        return len(reaction_ids), len(subscription_ids)
+
+    likes, dislikes, author_likes = Counter(), Counter(), Counter()
+    reactions = Reaction.objects.\
+        filter(id__in=reaction_ids).\
+        values_list('article_id', 'article__author_id', 'value')
+    for article_id, author_id, value in reactions:
+        if value == 1:
+            likes[article_id] += 1
+            author_likes[author_id] += 1
+        elif value == -1:
+            dislikes[article_id] += 1
+    subscribers = Counter(Subscription.objects.
+                          filter(id__in=subscription_ids).
+                          values_list('subscribe_to_id', flat=True))
+
+    Reaction.objects.filter(id__in=reaction_ids)._raw_delete(Reaction.objects.db)
+    Subscription.objects.filter(id__in=subscription_ids).\
+        _raw_delete(Subscription.objects.db)
+    decrease(Article.objects.all(), 'id', 'likes', likes)
+    decrease(Article.objects.all(), 'id', 'dislikes', dislikes)
+    decrease(AuthorStats.objects.all(), 'user_id', 'likes', author_likes)
+    decrease(AuthorStats.objects.all(), 'user_id', 'subscribers', subscribers)
+    return len(reaction_ids), len(subscription_ids)
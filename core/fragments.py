@@ -0,0 +1,60 @@
+import time
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+
+VERSION_KEY = 'core:article-version:{}'
+
+
+def get_cache():
+    # the same cache {% cache %} template tag uses
+    try:
+        return caches['template_fragments']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def get_timeout():
+    return getattr(settings, 'ARTICLE_CARD_CACHE_TIMEOUT', 300)
+
+
+def invalidate_article_cards(article_ids):
+    # version is created again on the next read, so cached cards
+    # of these articles are not used anymore. It is deleted again
+    # after commit, because cards rendered before it show old rows
+    keys = [VERSION_KEY.format(i) for i in article_ids]
+    get_cache().delete_many(keys)
+    transaction.on_commit(lambda: get_cache().delete_many(keys))
+
+
+def get_card_versions(article_ids):
+    cache = get_cache()
+    keys = {VERSION_KEY.format(i): i for i in article_ids}
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, get_timeout())
+        versions.update(missing)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def set_card_versions(articles, fragment_name):
+    """
+    Sets 'card_version' of every article, which is a part of the key
+    of its cached card. Tags are prefetched only for articles
+    whose cards have to be rendered again
+    """
+    articles = list(articles or [])
+    versions = get_card_versions([article.id for article in articles])
+    keys = {}
+    for article in articles:
+        article.card_version = versions[article.id]
+        key = make_template_fragment_key(fragment_name,
+                                         [article.id, article.card_version])
+        keys[key] = article
+    cached = get_cache().get_many(keys)
+    prefetch_related_objects([article for key, article in keys.items()
+                              if key not in cached], 'tags')
+    return articles
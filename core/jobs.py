@@ -0,0 +1,73 @@
+import logging
+import traceback
+from datetime import timedelta
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from core.models import Job
+from core.renditions import delete_renditions, generate_renditions
+
+logger = logging.getLogger(__name__)
+
+handlers = {}
+
+
+def handler(name):
+    # registers function that does jobs with this name,
+    # it gets payload of job as keyword arguments
+    def register(function):
+        handlers[name] = function
+        return function
+    return register
+
+
+def get_max_attempts():
+    return getattr(settings, 'JOB_MAX_ATTEMPTS', 3)
+
+
+def get_retry_delay():
+    return getattr(settings, 'JOB_RETRY_DELAY', 60)
+
+
+def run_job(job):
+    try:
+        handlers[job.name](**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < get_max_attempts():
+            # attempts are spread more and more in time
+            job.status = Job.PENDING
+            job.run_after = job.started + \
+                timedelta(seconds=get_retry_delay() * job.attempts)
+        else:
+            job.status = Job.FAILED
+            logger.error('Job %s failed: %s', job.id, job.last_error)
+        job.save(update_fields=['status', 'run_after', 'last_error'])
+        return False
+    job.delete()
+    return True
+
+
+def run_pending_jobs(limit=100):
+    """
+    Runs jobs that are due, returns the number of jobs
+    that were run, successfully or not
+    """
+    jobs = Job.objects.claim(limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
+
+
+@handler('generate_renditions')
+def generate_renditions_job(model, pk, field):
+    obj = apps.get_model(model).objects.filter(pk=pk).first()
+    # image could be changed or removed after job was enqueued,
+    # current one is processed then
+    if obj is not None:
+        generate_renditions(getattr(obj, field))
+
+
+@handler('delete_renditions')
+def delete_renditions_job(name):
+    delete_renditions(name, default_storage)
@@ -0,0 +1,283 @@
+import bisect
+import logging
+import itertools
+import random
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from core.metrics import PERCENTILES, percentile
+from core.models import Article, TagCloud
+from users.models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+# not in INTERNAL_IPS, so debug toolbar is not rendered into pages
+REMOTE_ADDR = '198.51.100.1'
+
+
+class ZipfSampler:
+    """
+    Picks items of a list with probability proportional to
+    1 / rank ** exponent, so the first items are picked most often,
+    like popular articles and active users on a real site
+    """
+
+    def __init__(self, items, exponent, rng):
+        self.items = items
+        self.rng = rng
+        weights = (1 / rank ** exponent for rank in range(1, len(items) + 1))
+        self.cum_weights = list(itertools.accumulate(weights))
+
+    def weight(self, index):
+        previous = self.cum_weights[index - 1] if index else 0
+        return (self.cum_weights[index] - previous) / self.cum_weights[-1]
+
+    def sample(self):
+        point = self.rng.random() * self.cum_weights[-1]
+        return self.items[bisect.bisect(self.cum_weights, point)]
+
+
+class Results:
+    """
+    Latencies and statuses of requests of all workers, grouped by name of URL
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.journeys = 0
+        self.failed_journeys = 0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def add(self, name, seconds, status_code):
+        with self.lock:
+            self.latencies[name].append(seconds)
+            if status_code >= 400:
+                self.errors[name] += 1
+
+    def add_journey(self, failed=False):
+        with self.lock:
+            self.journeys += 1
+            self.failed_journeys += failed
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def summarize(self, seconds):
+        values = sorted(seconds)
+        summary = {'requests': len(values),
+                   'mean_ms': sum(values) / len(values) * 1000,
+                   'max_ms': values[-1] * 1000}
+        for number in PERCENTILES:
+            summary[f'p{number}_ms'] = percentile(values, number) * 1000
+        return summary
+
+    def as_dict(self):
+        # rounded, so results of runs can be compared in version control
+        duration = (self.finished or time.perf_counter()) - self.started
+        endpoints = {}
+        for name, seconds in sorted(self.latencies.items()):
+            endpoints[name] = self.summarize(seconds)
+            endpoints[name]['errors'] = self.errors[name]
+            endpoints[name]['throughput'] = len(seconds) / duration
+        requests = sum(len(seconds) for seconds in self.latencies.values())
+        total = self.summarize(list(itertools.chain(*self.latencies.values()))) \
+            if requests else {'requests': 0}
+        total.update(errors=sum(self.errors.values()),
+                     throughput=requests / duration,
+                     journeys=self.journeys,
+                     failed_journeys=self.failed_journeys)
+        return round_floats({'duration': duration, 'total': total, 'endpoints': endpoints})
+
+
+def round_floats(value):
+    if isinstance(value, dict):
+        return {key: round_floats(item) for key, item in value.items()}
+    if isinstance(value, float):
+        return round(value, 3)
+    return value
+
+
+class Session:
+    """
+    One simulated visitor, requests are sent to the WSGI handler
+    of this process by the test client and timed
+    """
+
+    def __init__(self, results, host):
+        self.results = results
+        # errors of views are answered with 500 like by a server
+        self.client = Client(SERVER_NAME=host, REMOTE_ADDR=REMOTE_ADDR,
+                             raise_request_exception=False)
+
+    def request(self, method, name, kwargs=None, data=None):
+        url = reverse(name, kwargs=kwargs)
+        started = time.perf_counter()
+        response = getattr(self.client, method)(url, data or {})
+        # the same URL can be read and posted, like article detail
+        key = name if method == 'get' else f'{name} ({method})'
+        self.results.add(key, time.perf_counter() - started, response.status_code)
+        return response
+
+    def get(self, name, kwargs=None, data=None):
+        return self.request('get', name, kwargs, data)
+
+    def post(self, name, kwargs=None, data=None):
+        return self.request('post', name, kwargs, data)
+
+
+class Site:
+    """
+    Articles, tags and users that journeys pick from, the most
+    read articles and the most used tags are picked most often
+    """
+
+    def __init__(self, rng, exponent=1.1, limit=1000):
+        articles = Article.objects.order_by('-times_read', 'id').values_list('id', flat=True)
+        tags = TagCloud.objects.\
+            order_by('-articles_count').\
+            values_list('tag__slug', flat=True)
+        users = CustomUser.objects.order_by('id').values_list('id', flat=True)
+        self.articles = ZipfSampler(list(articles[:limit]), exponent, rng)
+        self.tags = ZipfSampler(list(tags[:limit]), exponent, rng)
+        self.users = list(users[:limit])
+        self.rng = rng
+        if not self.articles.items or not self.users:
+            raise ValueError('Database has no articles or users, '
+                             'run "seed_load_data" command first')
+
+    def article(self):
+        return {'pk': self.articles.sample()}
+
+    def tag(self):
+        return {'slug': self.tags.sample()} if self.tags.items else None
+
+    def user(self):
+        return CustomUser.objects.get(pk=self.rng.choice(self.users))
+
+
+def browse(session, site):
+    # visitor that is not logged in reads an article found by tag
+    session.client.logout()
+    session.get('core:index')
+    tag = site.tag()
+    if tag:
+        session.get('public:articles-tag', tag)
+    article = site.article()
+    session.get('public:article-detail', article)
+    # reading to the end is posted, it counts the read
+    session.post('public:article-detail', article)
+    session.get('public:article-comments', article)
+
+
+def participate(session, site):
+    # member reads, likes, comments and saves an article
+    session.client.force_login(site.user())
+    session.get('core:index')
+    tag = site.tag()
+    if tag:
+        session.get('public:articles-tag', tag)
+    article = site.article()
+    session.get('public:article-detail', article)
+    session.post('public:article-detail', article)
+    session.post('public:like-article', article)
+    session.post('public:comment-article', article,
+                 {'content': f'Load test comment {timezone.now().isoformat()}'})
+    session.post('public:manage-favorites', article)
+    session.get('public:article-comments', article)
+    session.get('personal:favorite-articles')
+
+
+def search(session, site):
+    session.client.logout()
+    session.get('public:search', data={'query': site.rng.choice(('python', 'music', 'travel'))})
+    session.get('public:trending')
+    session.get('public:article-detail', site.article())
+
+
+# name: (journey, weight of journey in mix of all of them)
+SCENARIOS = {
+    'browse': (browse, 6),
+    'participate': (participate, 1),
+    'search': (search, 2),
+}
+
+
+def get_host():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+    return hosts[0] if hosts else 'localhost'
+
+
+class LoadTest:
+    """
+    Runs journeys of scenarios by concurrency workers until duration
+    seconds pass or iterations journeys are done, whichever is first
+    """
+
+    def __init__(self, scenarios, concurrency=1, duration=None, iterations=None,
+                 rng=None, exponent=1.1):
+        self.scenarios = [SCENARIOS[name] for name in scenarios]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.iterations = iterations
+        self.rng = rng or random.Random()
+        self.site = Site(self.rng, exponent)
+        self.host = get_host()
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def next_journey(self, deadline):
+        with self.lock:
+            number = next(self.counter)
+            if self.iterations is not None and number >= self.iterations:
+                return None
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            journeys, weights = zip(*self.scenarios)
+            return self.rng.choices(journeys, weights=weights)[0]
+
+    def work(self, results, deadline):
+        session = Session(results, self.host)
+        while True:
+            journey = self.next_journey(deadline)
+            if journey is None:
+                break
+            try:
+                journey(session, self.site)
+            except Exception:
+                # e.g. login of simulated user failed, journey
+                # is counted and the worker goes on
+                logger.exception('Journey %s failed', journey.__name__)
+                results.add_journey(failed=True)
+            else:
+                results.add_journey()
+
+    def work_in_thread(self, results, deadline):
+        try:
+            self.work(results, deadline)
+        finally:
+            # every thread has its own connection
+            connection.close()
+
+    def run(self):
+        results = Results()
+        deadline = time.perf_counter() + self.duration if self.duration else None
+        if self.concurrency == 1:
+            # calling thread, so tests see data of their transaction
+            self.work(results, deadline)
+        else:
+            workers = [threading.Thread(target=self.work_in_thread, args=(results, deadline))
+                       for _ in range(self.concurrency)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        results.finish()
+        return results
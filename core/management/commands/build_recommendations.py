@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from core.recommendations import RecommendationBuilder
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = 'Builds top recommended articles for every user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of users processed in one batch')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Number of articles recommended to each user')
+
+    def handle(self, *args, **options):
+        builder = RecommendationBuilder(limit=options['limit'])
+        last_id = 0
+        users = 0
+        recommendations = 0
+        while True:
+            user_ids = CustomUser.objects.\
+                filter(id__gt=last_id).\
+                order_by('id').\
+                values_list('id', flat=True)
+            user_ids = list(user_ids[:options['batch_size']])
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            users += len(user_ids)
+            recommendations += builder.build(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Built {recommendations} recommendations for {users} users'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from core.models import Article
+from core.renditions import generate_renditions
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = 'Generates missing renditions of images of articles and users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Generate again renditions that already exist')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of objects read from the database at once')
+
+    def handle(self, *args, **options):
+        articles = Article.objects.\
+            exclude(image='').\
+            only('id', 'image')
+        users = CustomUser.objects.\
+            exclude(user_image__isnull=True).\
+            exclude(user_image='').\
+            only('id', 'user_image')
+        images = generated = 0
+        for queryset, field in ((articles, 'image'), (users, 'user_image')):
+            for obj in queryset.iterator(chunk_size=options['batch_size']):
+                images += 1
+                generated += generate_renditions(getattr(obj, field),
+                                                 force=options['force'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{generated} renditions of {images} images generated'))
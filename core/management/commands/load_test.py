@@ -0,0 +1,67 @@
+import json
+import random
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.loadtest import SCENARIOS, LoadTest
+
+
+class Command(BaseCommand):
+    help = 'Sends journeys of simulated users to this site in-process and reports ' \
+           'throughput and latency of every URL, journeys like, comment and save ' \
+           'articles, so run it against a database made by "seed_load_data"'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                            help='Journey to run, can be repeated, all of them by default')
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='Number of simulated users at the same time')
+        parser.add_argument('--duration', type=float, default=30,
+                            help='Seconds to run for')
+        parser.add_argument('--iterations', type=int, default=None,
+                            help='Number of journeys to run, ends before duration if reached')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--exponent', type=float, default=1.1,
+                            help='Exponent of Zipf distribution of picked articles and tags')
+        parser.add_argument('--label', default='',
+                            help='Name of run stored with results, e.g. version of release')
+        parser.add_argument('--output', default=None,
+                            help='File to write results as JSON to, - for standard output')
+
+    def handle(self, *args, **options):
+        scenarios = options['scenario'] or sorted(SCENARIOS)
+        try:
+            load_test = LoadTest(scenarios,
+                                 concurrency=options['concurrency'],
+                                 duration=options['duration'],
+                                 iterations=options['iterations'],
+                                 rng=random.Random(options['seed']),
+                                 exponent=options['exponent'])
+        except ValueError as error:
+            raise CommandError(error)
+        started = timezone.now()
+        results = load_test.run().as_dict()
+        results.update(label=options['label'], started=started.isoformat(),
+                       scenarios=scenarios, concurrency=options['concurrency'],
+                       seed=options['seed'])
+
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
+        self.write_table(results)
+
+    def write_table(self, results):
+        row = '{:<36} {:>8} {:>7} {:>9} {:>9} {:>9} {:>9}'
+        self.stdout.write(row.format('URL', 'requests', 'errors', 'req/s',
+                                     'p50 ms', 'p95 ms', 'p99 ms'))
+        for name, endpoint in [*results['endpoints'].items(), ('total', results['total'])]:
+            if not endpoint['requests']:
+                continue
+            self.stdout.write(row.format(name, endpoint['requests'], endpoint['errors'],
+                                         endpoint['throughput'], endpoint['p50_ms'],
+                                         endpoint['p95_ms'], endpoint['p99_ms']))
+        self.stdout.write(self.style.SUCCESS(
+            f"{results['total']['journeys']} journeys in {results['duration']} seconds, "
+            f"{results['total']['failed_journeys']} failed"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from core.models import AuthorStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds statistics of authors from articles and subscriptions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of rows inserted by one statement')
+
+    def handle(self, *args, **options):
+        number = AuthorStats.objects.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Statistics of {number} users rebuilt'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from core.models import Article
+from core.search import get_search_backend, index_articles
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds search index of all articles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of articles indexed in one batch')
+
+    def handle(self, *args, **options):
+        get_search_backend().clear()
+        last_id = 0
+        indexed = 0
+        while True:
+            articles = Article.objects.\
+                select_related('author').\
+                prefetch_related('tags').\
+                filter(id__gt=last_id).\
+                order_by('id')
+            articles = list(articles[:options['batch_size']])
+            if not articles:
+                break
+            last_id = articles[-1].id
+            index_articles(articles)
+            indexed += len(articles)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} articles'))
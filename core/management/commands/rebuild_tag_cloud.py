@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from core.models import TagCloud
+from core.tag_cloud import invalidate_tag_cloud
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds materialized tag cloud from tags of articles'
+
+    def handle(self, *args, **options):
+        number = TagCloud.objects.rebuild()
+        invalidate_tag_cloud()
+        self.stdout.write(self.style.SUCCESS(
+            f'Tag cloud rebuilt, {number} tags are in use'))
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from core.models import Article, Reaction
+
+
+class Command(BaseCommand):
+    help = 'Recounts likes and dislikes of articles and repairs counters that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of articles processed in one batch')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report articles with wrong counters')
+
+    def get_batch(self, last_id, batch_size):
+        articles = Article.objects.\
+            filter(id__gt=last_id).\
+            order_by('id').\
+            annotate(actual_likes=Count('reaction', filter=Q(reaction__value=1)),
+                     actual_dislikes=Count('reaction', filter=Q(reaction__value=-1))).\
+            only('id', 'likes', 'dislikes')
+        return list(articles[:batch_size])
+
+    def count_reactions(self, value):
+        reactions = Reaction.objects.\
+            filter(article=OuterRef('pk'), value=value).\
+            order_by().values('article').\
+            annotate(number=Count('id')).values('number')
+        return Coalesce(Subquery(reactions), 0)
+
+    def repair(self, ids):
+        # counters are recomputed inside UPDATE statement itself,
+        # so reactions left while command runs are not lost
+        Article.objects.filter(id__in=ids).\
+            update(likes=self.count_reactions(1),
+                   dislikes=self.count_reactions(-1))
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        checked = 0
+        repaired = 0
+        while True:
+            articles = self.get_batch(last_id, batch_size)
+            if not articles:
+                break
+            last_id = articles[-1].id
+            checked += len(articles)
+            drifted = [article.id for article in articles
+                       if article.likes != article.actual_likes or
+                       article.dislikes != article.actual_dislikes]
+            repaired += len(drifted)
+            if drifted and not options['dry_run']:
+                self.repair(drifted)
+        if options['dry_run']:
+            message = f'Checked {checked} articles, {repaired} have wrong counters'
+        else:
+            message = f'Checked {checked} articles, repaired {repaired}'
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,22 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.duplicates import remove_duplicates
+
+
+class Command(BaseCommand):
+    help = 'Removes duplicated reactions and subscriptions, ' \
+           'the same is done by migration creating their unique constraints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count duplicates')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            reactions, subscriptions = remove_duplicates(apps, options['dry_run'])
+        verb = 'found' if options['dry_run'] else 'removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{reactions} duplicated reactions {verb}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'{subscriptions} duplicated subscriptions {verb}'))
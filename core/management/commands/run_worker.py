@@ -0,0 +1,30 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.jobs import get_max_attempts, run_pending_jobs
+from core.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Runs jobs of local job queue, like processing of uploaded images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20,
+                            help='Number of jobs claimed at once')
+        parser.add_argument('--sleep', type=float, default=1,
+                            help='Seconds to wait when there are no jobs')
+        parser.add_argument('--once', action='store_true',
+                            help='Run jobs that are due and exit')
+
+    def handle(self, *args, **options):
+        timeout = getattr(settings, 'JOB_TIMEOUT', 600)
+        done = 0
+        while True:
+            Job.objects.requeue_stale(timeout, get_max_attempts())
+            number = run_pending_jobs(options['batch_size'])
+            done += number
+            if options['once'] and not number:
+                break
+            if not number:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f'{done} jobs run'))
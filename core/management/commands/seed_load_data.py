@@ -0,0 +1,232 @@
+import itertools
+import random
+from datetime import timedelta
+from io import BytesIO, StringIO
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from PIL import Image
+from taggit.models import Tag, TaggedItem
+from core.loadtest import ZipfSampler
+from core.models import Article, Comment, FavoriteArticles, Reaction, Subscription, UserReading
+from users.models import CustomUser
+
+IMAGE_NAME = 'core/images/load-data-{}.jpg'
+PASSWORD = 'load-data-password'
+WORDS = ('performance', 'database', 'python', 'music', 'travel', 'science', 'history',
+         'cooking', 'design', 'football', 'privacy', 'startup', 'garden', 'movies')
+# commands that rebuild data kept next to rows this command inserts
+DERIVED = ('recount_reactions', 'rebuild_author_stats', 'rebuild_tag_cloud',
+           'rebuild_search_index', 'update_trending', 'build_recommendations')
+
+
+class Command(BaseCommand):
+    help = 'Fills database with generated users, articles and activity of users ' \
+           'for load testing, popularity of articles and activity of users is skewed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--articles', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--reactions', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--readings', type=int, default=100000)
+        parser.add_argument('--subscriptions', type=int, default=10000)
+        parser.add_argument('--favorites', type=int, default=20000)
+        parser.add_argument('--exponent', type=float, default=1.1,
+                            help='Exponent of Zipf distribution, higher is more skewed')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Same seed generates the same data')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of rows inserted by one statement')
+        parser.add_argument('--no-derived', action='store_true',
+                            help='Do not run commands that rebuild counters, '
+                                 'statistics and indexes afterwards')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.exponent = options['exponent']
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+
+        users = self.create_users(options['users'])
+        tags = self.create_tags(options['tags'])
+        articles = self.create_articles(options['articles'], users, tags)
+        # users in random order are ranked by activity and articles
+        # by popularity, independently of who wrote them
+        self.readers = self.zipf(self.rng.sample(users, len(users)))
+        self.popular = self.zipf(self.rng.sample(articles, len(articles)))
+
+        self.create_reactions(options['reactions'])
+        self.create_comments(options['comments'])
+        self.create_readings(options['readings'])
+        self.create_subscriptions(options['subscriptions'], users)
+        self.create_favorites(options['favorites'])
+        if not options['no_derived']:
+            for command in DERIVED:
+                call_command(command, stdout=StringIO())
+                self.report(f'{command} finished')
+        self.stdout.write(self.style.SUCCESS('Load data generated'))
+
+    def zipf(self, items):
+        return ZipfSampler(items, self.exponent, self.rng)
+
+    def report(self, message):
+        self.stdout.write(message)
+
+    def insert(self, model, rows, ignore_conflicts=False):
+        # rows are generated lazily and inserted batch by batch,
+        # so memory does not grow with number of rows
+        inserted = 0
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                return inserted
+            model.objects.bulk_create(batch, ignore_conflicts=ignore_conflicts)
+            inserted += len(batch)
+
+    def new_ids(self, model, last_id):
+        # MySQL does not return ids of rows made by bulk_create
+        return list(model.objects.filter(id__gt=last_id).
+                    order_by('id').values_list('id', flat=True))
+
+    def get_last_id(self, model):
+        return model.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    def unique_pairs(self, number, pick):
+        # pairs that came out before are skipped, so popular
+        # items do not make the loop run forever
+        seen = set()
+        attempts = 0
+        while len(seen) < number and attempts < number * 10:
+            attempts += 1
+            pair = pick()
+            if pair not in seen:
+                seen.add(pair)
+                yield pair
+
+    def create_users(self, number):
+        last_id = self.get_last_id(CustomUser)
+        # hashing is slow, every user gets the same password
+        password = make_password(PASSWORD)
+        rows = (CustomUser(username=f'load{last_id + index}',
+                           email=f'load{last_id + index}@example.com',
+                           password=password)
+                for index in range(1, number + 1))
+        self.insert(CustomUser, rows)
+        users = self.new_ids(CustomUser, last_id)
+        self.report(f'{len(users)} users created, password is "{PASSWORD}"')
+        return users
+
+    def create_tags(self, number):
+        last_id = self.get_last_id(Tag)
+        names = (f'{self.rng.choice(WORDS)}{last_id + index}' for index in range(1, number + 1))
+        rows = (Tag(name=name, slug=name) for name in names)
+        self.insert(Tag, rows)
+        tags = self.new_ids(Tag, last_id)
+        self.report(f'{len(tags)} tags created')
+        return tags
+
+    def get_image(self):
+        content = BytesIO()
+        Image.new('RGB', (1200, 800), (70, 110, 160)).save(content, 'JPEG')
+        return content.getvalue()
+
+    def save_image(self, number, content):
+        # every article has a file of its own, so deleting one article
+        # does not remove image and renditions of the others
+        return default_storage.save(IMAGE_NAME.format(number), ContentFile(content))
+
+    def create_articles(self, number, users, tags):
+        last_id = self.get_last_id(Article)
+        image = self.get_image()
+        authors = self.zipf(users)
+        rows = (Article(title=' '.join(self.rng.choices(WORDS, k=5)).capitalize(),
+                        content=' '.join(self.rng.choices(WORDS, k=300)),
+                        author_id=authors.sample(),
+                        image=self.save_image(last_id + index, image))
+                for index in range(1, number + 1))
+        self.insert(Article, rows)
+        articles = self.new_ids(Article, last_id)
+        # pub_date is set by database on insert, articles
+        # are spread over the last year afterwards
+        dated = (Article(id=article_id,
+                         pub_date=self.now - timedelta(minutes=self.rng.randrange(525600)))
+                 for article_id in articles)
+        while True:
+            batch = list(itertools.islice(dated, self.batch_size))
+            if not batch:
+                break
+            Article.objects.bulk_update(batch, ['pub_date'])
+
+        content_type = ContentType.objects.get_for_model(Article)
+        tag_sampler = self.zipf(tags)
+        tagged = (TaggedItem(content_type=content_type, object_id=article_id, tag_id=tag_id)
+                  for article_id in articles
+                  for tag_id in {tag_sampler.sample() for _ in range(self.rng.randint(1, 4))})
+        tagged_number = self.insert(TaggedItem, tagged)
+        self.report(f'{len(articles)} articles with {tagged_number} tags created')
+        return articles
+
+    def create_reactions(self, number):
+        pairs = self.unique_pairs(number, lambda: (self.readers.sample(), self.popular.sample()))
+        # most reactions are likes
+        rows = (Reaction(user_id=user_id, article_id=article_id,
+                         value=1 if self.rng.random() < 0.85 else -1)
+                for user_id, article_id in pairs)
+        self.report(f'{self.insert(Reaction, rows, ignore_conflicts=True)} reactions created')
+
+    def create_comments(self, number):
+        rows = (Comment(user_id=self.readers.sample(), article_id=self.popular.sample(),
+                        content=' '.join(self.rng.choices(WORDS, k=self.rng.randint(3, 40))))
+                for _ in range(number))
+        self.report(f'{self.insert(Comment, rows)} comments created')
+
+    def create_readings(self, number):
+        # one reading of an article by a user is kept for a day
+        readings = {}
+        for _ in range(number):
+            date_read = self.now - timedelta(minutes=self.rng.randrange(43200))
+            key = (self.readers.sample(), self.popular.sample(), date_read.date())
+            readings[key] = date_read
+        rows = (UserReading(user_id=user_id, article_id=article_id, day=day, date_read=date_read)
+                for (user_id, article_id, day), date_read in readings.items())
+        self.report(f'{self.insert(UserReading, rows, ignore_conflicts=True)} readings created')
+
+        # times read of articles follows their popularity
+        articles = self.popular.items
+        counted = (Article(id=article_id,
+                           times_read=round(number * 5 * self.popular.weight(index)))
+                   for index, article_id in enumerate(articles))
+        while True:
+            batch = list(itertools.islice(counted, self.batch_size))
+            if not batch:
+                break
+            Article.objects.bulk_update(batch, ['times_read'])
+
+    def create_subscriptions(self, number, users):
+        # authors in the same order on every run, so the same seed
+        # subscribes the same users to them
+        authors = self.zipf(list(Article.objects.filter(author_id__in=users).
+                                 order_by('author_id').values_list('author_id', flat=True).
+                                 distinct()))
+        pairs = self.unique_pairs(number, lambda: (self.readers.sample(), authors.sample()))
+        rows = (Subscription(subscriber_id=subscriber_id, subscribe_to_id=author_id)
+                for subscriber_id, author_id in pairs if subscriber_id != author_id)
+        self.report(f'{self.insert(Subscription, rows, ignore_conflicts=True)} subscriptions created')
+
+    def create_favorites(self, number):
+        pairs = list(self.unique_pairs(number, lambda: (self.readers.sample(), self.popular.sample())))
+        user_ids = {user_id for user_id, _ in pairs}
+        FavoriteArticles.objects.bulk_create(
+            [FavoriteArticles(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+        favorites = dict(FavoriteArticles.objects.filter(user_id__in=user_ids).
+                         values_list('user_id', 'id'))
+        through = FavoriteArticles.articles.through
+        rows = (through(favoritearticles_id=favorites[user_id], article_id=article_id)
+                for user_id, article_id in pairs)
+        self.report(f'{self.insert(through, rows, ignore_conflicts=True)} favorites created')
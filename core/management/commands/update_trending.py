@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from core.trending import TrendingUpdater
+
+
+class Command(BaseCommand):
+    help = 'Decays trending scores of articles and adds events since the previous run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of scores written in one batch')
+
+    def handle(self, *args, **options):
+        updater = TrendingUpdater(batch_size=options['batch_size'])
+        number = updater.update()
+        self.stdout.write(self.style.SUCCESS(
+            f'Trending scores updated for {number} articles'))
@@ -0,0 +1,159 @@
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+MEASURES = ('duration', 'queries', 'db_time', 'render_time', 'size')
+PERCENTILES = (50, 95, 99)
+# measures of the request that is handled by current thread
+current = ContextVar('request_metrics', default=None)
+
+
+def get_max_samples():
+    return getattr(settings, 'REQUEST_METRICS_SAMPLES', 1000)
+
+
+def percentile(values, number):
+    # nearest rank of sorted values
+    return values[max(0, math.ceil(number / 100 * len(values)) - 1)]
+
+
+class RequestMetrics:
+    """
+    Keeps the last REQUEST_METRICS_SAMPLES measures of every view
+    in memory of the process and summarizes them with percentiles
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.counts = defaultdict(int)
+        self.samples = defaultdict(lambda: deque(maxlen=get_max_samples()))
+
+    def add(self, view, measures):
+        with self.lock:
+            self.counts[view] += 1
+            self.samples[view].append(measures)
+
+    def get_summary(self):
+        with self.lock:
+            samples = {view: list(rows) for view, rows in self.samples.items()}
+            counts = dict(self.counts)
+        summary = {}
+        for view, rows in samples.items():
+            summary[view] = {'requests': counts[view], 'samples': len(rows)}
+            for measure in MEASURES:
+                values = sorted(row[measure] for row in rows)
+                for number in PERCENTILES:
+                    summary[view][f'{measure}_p{number}'] = percentile(values, number)
+        return summary
+
+
+request_metrics = RequestMetrics()
+
+
+class QueryTimer:
+    """
+    Execute wrapper that counts queries and time spent in them
+    """
+
+    def __init__(self, measures):
+        self.measures = measures
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.measures['queries'] += 1
+            self.measures['db_time'] += time.perf_counter() - started
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        measures = current.get()
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            if measures is not None:
+                measures['render_time'] += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Django template backend that adds time spent rendering
+    templates to measures of the current request
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures duration, number of queries, time spent in the database
+    and in templates and size of every response, adds them to
+    request_metrics and writes them to log of 'core.metrics'
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        measures = dict.fromkeys(MEASURES, 0)
+        token = current.set(measures)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                timer = QueryTimer(measures)
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        measures['duration'] = time.perf_counter() - started
+        if not response.streaming:
+            measures['size'] = len(response.content)
+        view = self.get_view_name(request)
+        request_metrics.add(view, measures)
+        logger.info('view=%s method=%s status=%s duration_ms=%.1f queries=%d '
+                    'db_ms=%.1f render_ms=%.1f size=%d',
+                    view, request.method, response.status_code,
+                    measures['duration'] * 1000, measures['queries'],
+                    measures['db_time'] * 1000, measures['render_time'] * 1000,
+                    measures['size'])
+        return response
+
+    def get_view_name(self, request):
+        # pages served from page cache never reach URL resolver
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            try:
+                match = resolve(request.path_info)
+            except Resolver404:
+                return 'unresolved'
+        name = match.view_name or match._func_path
+        if getattr(request, 'page_cache_hit', False):
+            return f'{name} (cached)'
+        return name
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.3 on 2026-10-18 16:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_reactions(Reaction, value):
+    reactions = Reaction.objects.\
+        filter(article=OuterRef('pk'), value=value).\
+        order_by().values('article').\
+        annotate(number=Count('id')).values('number')
+    return Coalesce(Subquery(reactions), 0)
+
+
+def populate_counters(apps, schema_editor):
+    Article = apps.get_model('core', 'Article')
+    Reaction = apps.get_model('core', 'Reaction')
+    Article.objects.update(likes=count_reactions(Reaction, 1),
+                           dislikes=count_reactions(Reaction, -1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_remove_comment_is_article_author'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='dislikes',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='likes',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def populate_days(apps, schema_editor):
+    UserReading = apps.get_model('core', 'UserReading')
+    UserReading.objects.update(day=TruncDate('date_read'))
+
+
+def remove_duplicates(apps, schema_editor):
+    # only the latest reading of an article by a user
+    # is kept for every day
+    UserReading = apps.get_model('core', 'UserReading')
+    duplicates = UserReading.objects.\
+        values('user', 'article', 'day').\
+        annotate(number=Count('id')).\
+        filter(number__gt=1).order_by()
+    for duplicate in list(duplicates):
+        ids = UserReading.objects.\
+            filter(user=duplicate['user'],
+                   article=duplicate['article'],
+                   day=duplicate['day']).\
+            order_by('-date_read', '-id').\
+            values_list('id', flat=True)
+        UserReading.objects.filter(id__in=list(ids[1:])).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_article_likes_dislikes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userreading',
+            name='day',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(populate_days, migrations.RunPython.noop),
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='userreading',
+            name='day',
+            field=models.DateField(),
+        ),
+        migrations.AddConstraint(
+            model_name='userreading',
+            constraint=models.UniqueConstraint(fields=('user', 'article', 'day'), name='unique_user_reading_per_day'),
+        ),
+    ]
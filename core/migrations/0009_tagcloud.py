@@ -0,0 +1,46 @@
+# Generated by Django 4.2.3 on 2026-10-18 16:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+from django.utils import timezone
+
+
+def populate_tag_cloud(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    TagCloud = apps.get_model('core', 'TagCloud')
+    content_type = ContentType.objects.\
+        filter(app_label='core', model='article').first()
+    if not content_type:
+        return
+    counts = TaggedItem.objects.\
+        filter(content_type=content_type).\
+        order_by().values('tag_id').\
+        annotate(number=Count('id'))
+    TagCloud.objects.bulk_create(
+        [TagCloud(tag_id=count['tag_id'],
+                  articles_count=count['number'],
+                  last_used=timezone.now()) for count in counts],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0005_auto_20220424_2025'),
+        ('core', '0008_userreading_day'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagCloud',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cloud', serialize=False, to='taggit.tag')),
+                ('articles_count', models.IntegerField(default=0)),
+                ('last_used', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.RunPython(populate_tag_cloud, migrations.RunPython.noop),
+    ]
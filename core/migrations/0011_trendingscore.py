@@ -0,0 +1,25 @@
+# Generated by Django 4.2.3 on 2026-10-18 16:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='core.article')),
+                ('score', models.FloatField(default=0)),
+                ('updated', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-score'], name='trending_score')],
+            },
+        ),
+    ]
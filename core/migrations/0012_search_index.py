@@ -0,0 +1,53 @@
+# Generated by Django 4.2.3 on 2026-10-18 16:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def add_fulltext_index(apps, schema_editor):
+    # FULLTEXT index exists only on MySQL,
+    # other databases use SearchTerm table
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX search_document_fulltext ON core_searchdocument '
+            '(title, tags, author, content)')
+
+
+def remove_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'DROP INDEX search_document_fulltext ON core_searchdocument')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_trendingscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='core.article')),
+                ('title', models.CharField(max_length=255)),
+                ('tags', models.TextField()),
+                ('author', models.CharField(max_length=150)),
+                ('content', models.TextField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.IntegerField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.article')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'article'), name='unique_search_term'),
+        ),
+        migrations.RunPython(add_fulltext_index, remove_fulltext_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.3 on 2026-10-18 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', 'pub_date', 'id'], name='comment_article_pub_date'),
+        ),
+    ]
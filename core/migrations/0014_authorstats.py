@@ -0,0 +1,51 @@
+# Generated by Django 4.2.3 on 2026-10-18 16:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+
+
+def populate_author_stats(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    Article = apps.get_model('core', 'Article')
+    Subscription = apps.get_model('core', 'Subscription')
+    AuthorStats = apps.get_model('core', 'AuthorStats')
+    entries = {user_id: AuthorStats(user_id=user_id) for user_id in
+               CustomUser.objects.values_list('id', flat=True)}
+    articles = Article.objects.\
+        order_by().values('author_id').\
+        annotate(number=Count('id'), reads=Sum('times_read'), likes=Sum('likes'))
+    for row in articles:
+        stats = entries[row['author_id']]
+        stats.articles = row['number']
+        stats.reads = row['reads']
+        stats.likes = row['likes']
+    subscribers = Subscription.objects.\
+        order_by().values('subscribe_to_id').\
+        annotate(number=Count('id'))
+    for row in subscribers:
+        entries[row['subscribe_to_id']].subscribers = row['number']
+    AuthorStats.objects.bulk_create(entries.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_alter_customuser_user_image'),
+        ('core', '0013_comment_article_pub_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('articles', models.IntegerField(default=0)),
+                ('reads', models.BigIntegerField(default=0)),
+                ('likes', models.BigIntegerField(default=0)),
+                ('subscribers', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_author_stats, migrations.RunPython.noop),
+    ]
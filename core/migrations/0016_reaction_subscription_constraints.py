@@ -0,0 +1,41 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:19
+
+from django.db import migrations, models
+from core.duplicates import remove_duplicates
+
+
+def remove_duplicate_rows(apps, schema_editor):
+    # unique constraints below can not be created while
+    # duplicates exist, counters are decreased by removed rows
+    remove_duplicates(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_rows, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reaction',
+            index=models.Index(fields=['article', 'value'], name='reaction_article_value'),
+        ),
+        migrations.AddIndex(
+            model_name='reaction',
+            index=models.Index(fields=['user', 'value', '-reaction_date'], name='reaction_user_value_date'),
+        ),
+        migrations.AddIndex(
+            model_name='userreading',
+            index=models.Index(fields=['user', '-date_read'], name='user_reading_user_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='reaction',
+            constraint=models.UniqueConstraint(fields=('user', 'article'), name='unique_reaction'),
+        ),
+        migrations.AddConstraint(
+            model_name='subscription',
+            constraint=models.UniqueConstraint(fields=('subscriber', 'subscribe_to'), name='unique_subscription'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:57
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def create_state(apps, schema_editor):
+    # scores that were already computed keep counting from
+    # the last events that happened before they were updated
+    last_run = apps.get_model('core', 'TrendingScore').objects.\
+        aggregate(Max('updated'))['updated__max']
+    if last_run is None:
+        return
+    sources = {
+        'last_reading_id': ('UserReading', 'date_read'),
+        'last_reaction_id': ('Reaction', 'reaction_date'),
+        'last_comment_id': ('Comment', 'pub_date'),
+    }
+    ids = {}
+    for field, (model_name, date_field) in sources.items():
+        ids[field] = apps.get_model('core', model_name).objects.\
+            filter(**{f'{date_field}__lte': last_run}).\
+            aggregate(Max('id'))['id__max'] or 0
+    apps.get_model('core', 'TrendingState').objects.create(updated=last_run, **ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_reaction_subscription_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('updated', models.DateTimeField()),
+                ('last_reading_id', models.BigIntegerField(default=0)),
+                ('last_reaction_id', models.BigIntegerField(default=0)),
+                ('last_comment_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_state, migrations.RunPython.noop),
+    ]
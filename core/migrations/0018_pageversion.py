@@ -0,0 +1,20 @@
+# Generated by Django 4.2.3 on 2026-10-18 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_trendingstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageVersion',
+            fields=[
+                ('tag', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
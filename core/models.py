@@ -1,18 +1,23 @@
-from django.db import models
-from django.core.exceptions import ValidationError
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.db import connections, models, transaction
+from django.db.models import Count, F
+from django.utils import timezone
 from taggit.managers import TaggableManager
+from core.validators import check_image
 
 
 def validate_image(image):
-    file_size = image.file.size
-    limit_kb = 1000
-    if file_size > limit_kb * 1024:
-        raise ValidationError(f"Maximum size of the image is {limit_kb} KB")
+    check_image(image, limit_kb=1000)
 
-    # file_size = image.file.size
-    # limit_mb = 8
-    # if file_size > limit_mb * 1024 * 1024:
-    #     raise ValidationError(f"Maximum size of the image is {limit_mb} MB")
+
+class ArticleQuerySet(models.QuerySet):
+    def trending(self):
+        # articles ordered by time-decayed score computed
+        # by 'update_trending' management command
+        return self.filter(trendingscore__score__gt=0).\
+            order_by('-trendingscore__score')
 
 
 class Article(models.Model):
@@ -23,10 +28,30 @@ class Article(models.Model):
         upload_to='core/images', null=False, validators=[validate_image]
     )
     times_read = models.BigIntegerField(default=0)
+    # denormalized counters of Reaction objects, they are maintained
+    # by Reaction model and its queryset, use 'recount_reactions'
+    # management command to repair them
+    likes = models.BigIntegerField(default=0)
+    dislikes = models.BigIntegerField(default=0)
     tags = TaggableManager(
         help_text='Use comma to separate tags, # is not needed to add tag')
     pub_date = models.DateTimeField(auto_now_add=True)
 
+    objects = ArticleQuerySet.as_manager()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # counters that are currently stored in the database,
+        # needed to know how statistics of author change on save
+        self._saved_counters = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'times_read' in field_names and 'likes' in field_names:
+            instance._saved_counters = (instance.times_read, instance.likes)
+        return instance
+
     def __str__(self):
         return self.title
 
@@ -61,6 +86,104 @@ class FavoriteArticles(models.Model):
     user = models.OneToOneField('users.CustomUser', on_delete=models.CASCADE)
     articles = models.ManyToManyField('core.Article')
 
+    # Membership of an article is checked and changed directly in
+    # the intermediate table, which has unique index on
+    # (favoritearticles_id, article_id), so favorites of a user are
+    # never loaded to answer whether one article is among them
+
+    def get_membership(self, article):
+        return FavoriteArticles.articles.through.objects.\
+            filter(favoritearticles_id=self.id, article_id=article.id)
+
+    def has_article(self, article):
+        return self.get_membership(article).exists()
+
+    def add_article(self, article):
+        # add() inserts row only if it is not there yet
+        self.articles.add(article)
+
+    def remove_article(self, article):
+        # returns True if article was in favorites
+        deleted, _ = self.get_membership(article).delete()
+        return deleted > 0
+
+    def toggle_article(self, article):
+        # returns True if article was added and False if it was removed
+        if self.remove_article(article):
+            return False
+        self.add_article(article)
+        return True
+
+
+def purge_reacted_article(article_id):
+    # reactions are purged by their save and delete instead of
+    # post_save and post_delete signals, signals would turn off
+    # fast deletion of reactions of a deleted article
+    from core.page_cache import purge_page_cache
+    purge_page_cache(f'article:{article_id}')
+
+
+def update_reaction_counters(article_id, likes=0, dislikes=0):
+    # counters are changed with F() expressions, so concurrent
+    # reactions on the same article never overwrite each other
+    changes = {}
+    if likes:
+        changes['likes'] = F('likes') + likes
+    if dislikes:
+        changes['dislikes'] = F('dislikes') + dislikes
+    if changes:
+        Article.objects.filter(pk=article_id).update(**changes)
+    if likes:
+        author_id = Article.objects.filter(pk=article_id).values('author_id')
+        AuthorStats.objects.\
+            filter(user_id=models.Subquery(author_id)).\
+            update(likes=F('likes') + likes)
+
+
+class ReactionQuerySet(models.QuerySet):
+    def delete(self):
+        # reactions are counted by article and value with one query
+        # and counters of all articles and authors are changed by
+        # one UPDATE each, so clearing all likes of a user costs
+        # the same for any number of them
+        from core.page_cache import purge_page_cache
+        with transaction.atomic():
+            groups = self.order_by().\
+                values('article_id', 'article__author_id', 'value').\
+                annotate(number=Count('id'))
+            articles = defaultdict(Counter)
+            authors = Counter()
+            for group in groups:
+                if group['value'] == 1:
+                    articles[group['article_id']]['likes'] += group['number']
+                    authors[group['article__author_id']] += group['number']
+                elif group['value'] == -1:
+                    articles[group['article_id']]['dislikes'] += group['number']
+            if articles:
+                Article.objects.\
+                    filter(id__in=list(articles)).\
+                    update(**{field: F(field) - subtrahends('id', articles, field)
+                              for field in ('likes', 'dislikes')})
+            if authors:
+                AuthorStats.objects.\
+                    filter(user_id__in=list(authors)).\
+                    update(likes=F('likes') - subtrahends('user_id', {
+                        user_id: {'likes': number} for user_id, number in authors.items()
+                    }, 'likes'))
+            # pages of all articles are purged at once, instead of
+            # a post_delete signal for every reaction
+            purge_page_cache(*[f'article:{article_id}' for article_id in articles])
+            deleted = self.order_by()._raw_delete(self.db)
+            return deleted, {self.model._meta.label: deleted}
+
+
+def subtrahends(key, counters, field):
+    # value of field for every row picked by key
+    return models.Case(
+        *[models.When(**{key: pk}, then=models.Value(counter[field]))
+          for pk, counter in counters.items() if counter[field]],
+        default=models.Value(0))
+
 
 class Reaction(models.Model):
     value = models.SmallIntegerField()
@@ -68,6 +191,175 @@ class Reaction(models.Model):
     article = models.ForeignKey('core.Article', on_delete=models.CASCADE)
     reaction_date = models.DateTimeField(auto_now_add=True)
 
+    objects = ReactionQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'article'],
+                                    name='unique_reaction')
+        ]
+        # counts of likes and dislikes of articles
+        # and lists of them made by a user
+        indexes = [
+            models.Index(fields=['article', 'value'],
+                         name='reaction_article_value'),
+            models.Index(fields=['user', 'value', '-reaction_date'],
+                         name='reaction_user_value_date'),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # value that is currently stored in the database,
+        # needed to know which counter to change on save
+        self._saved_value = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_value = instance.value
+        return instance
+
+    @staticmethod
+    def counter_changes(value, sign):
+        if value == 1:
+            return {'likes': sign}
+        if value == -1:
+            return {'dislikes': sign}
+        return {}
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self._saved_value != self.value:
+                changes = self.counter_changes(self.value, 1)
+                for field, number in self.counter_changes(self._saved_value, -1).items():
+                    changes[field] = changes.get(field, 0) + number
+                update_reaction_counters(self.article_id, **changes)
+                self._saved_value = self.value
+                purge_reacted_article(self.article_id)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            # row is locked and its stored value is read again, so
+            # a reaction deleted or changed by a concurrent request
+            # does not change counters twice
+            value = Reaction.objects.\
+                select_for_update().\
+                filter(pk=self.pk).\
+                values_list('value', flat=True).first()
+            if value is None:
+                return 0, {}
+            deleted = super().delete(*args, **kwargs)
+            update_reaction_counters(self.article_id,
+                                     **self.counter_changes(value, -1))
+            purge_reacted_article(self.article_id)
+            return deleted
+
+
+class TagCloudQuerySet(models.QuerySet):
+    def increment(self, tag_ids):
+        if not tag_ids:
+            return
+        self.bulk_create([self.model(tag_id=tag_id) for tag_id in tag_ids],
+                         ignore_conflicts=True)
+        self.filter(tag_id__in=tag_ids).\
+            update(articles_count=F('articles_count') + 1,
+                   last_used=timezone.now())
+
+    def decrement(self, tag_ids):
+        if not tag_ids:
+            return
+        self.filter(tag_id__in=tag_ids).\
+            update(articles_count=F('articles_count') - 1)
+        # tags that are not used by any article disappear from the cloud
+        self.filter(tag_id__in=tag_ids, articles_count__lte=0).delete()
+
+    def rebuild(self):
+        from taggit.models import TaggedItem
+        from django.contrib.contenttypes.models import ContentType
+        content_type = ContentType.objects.get_for_model(Article)
+        counts = TaggedItem.objects.\
+            filter(content_type=content_type).\
+            order_by().values('tag_id').\
+            annotate(number=Count('id'))
+        entries = [self.model(tag_id=count['tag_id'],
+                              articles_count=count['number'],
+                              last_used=timezone.now())
+                   for count in counts]
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(entries, batch_size=1000)
+        return len(entries)
+
+
+class TagCloud(models.Model):
+    # Materialized number of articles for every tag that is in use,
+    # maintained by handlers of taggit's m2m_changed signal,
+    # so index page never scans TaggedItem table
+    tag = models.OneToOneField('taggit.Tag', primary_key=True,
+                               related_name='cloud', on_delete=models.CASCADE)
+    articles_count = models.IntegerField(default=0)
+    last_used = models.DateTimeField(null=True)
+
+    objects = TagCloudQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.tag_id}: {self.articles_count}'
+
+
+class AuthorStatsQuerySet(models.QuerySet):
+    def for_user(self, user):
+        # statistics of user who has no row yet are all zeros
+        return self.filter(user=user).first() or self.model(user=user)
+
+    def change(self, user_id, **deltas):
+        changes = {field: F(field) + delta
+                   for field, delta in deltas.items() if delta}
+        if changes:
+            self.filter(user_id=user_id).update(**changes)
+
+    def rebuild(self, batch_size=1000):
+        from users.models import CustomUser
+        articles = Article.objects.\
+            order_by().values('author_id').\
+            annotate(number=Count('id'),
+                     reads=models.Sum('times_read'),
+                     likes=models.Sum('likes'))
+        subscribers = Subscription.objects.\
+            order_by().values('subscribe_to_id').\
+            annotate(number=Count('id'))
+        entries = {user_id: self.model(user_id=user_id) for user_id in
+                   CustomUser.objects.values_list('id', flat=True)}
+        for row in articles:
+            stats = entries[row['author_id']]
+            stats.articles = row['number']
+            stats.reads = row['reads']
+            stats.likes = row['likes']
+        for row in subscribers:
+            entries[row['subscribe_to_id']].subscribers = row['number']
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(entries.values(), batch_size=batch_size)
+        return len(entries)
+
+
+class AuthorStats(models.Model):
+    # Rollup of numbers shown on profile pages of a user, maintained
+    # incrementally by writes of articles, reads, reactions and
+    # subscriptions, use 'rebuild_author_stats' management
+    # command to repair it
+    user = models.OneToOneField('users.CustomUser', primary_key=True,
+                                related_name='stats', on_delete=models.CASCADE)
+    articles = models.IntegerField(default=0)
+    reads = models.BigIntegerField(default=0)
+    likes = models.BigIntegerField(default=0)
+    subscribers = models.IntegerField(default=0)
+
+    objects = AuthorStatsQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.user_id}: {self.reads}'
+
 
 class Comment(models.Model):
     user = models.ForeignKey('users.CustomUser', on_delete=models.CASCADE)
@@ -76,11 +368,76 @@ class Comment(models.Model):
     pub_date = models.DateTimeField(auto_now_add=True)
     update_date = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # matches keyset ordering of comments of an article,
+        # so any page is read straight from the index
+        indexes = [
+            models.Index(fields=['article', 'pub_date', 'id'],
+                         name='comment_article_pub_date')
+        ]
+
+
+class UserReadingQuerySet(models.QuerySet):
+    def record(self, user, article, date_read=None):
+        # Reading log keeps one row per user, article and day.
+        # Row is inserted or its date_read is moved forward by a single
+        # upsert statement, so the cost of a read does not depend
+        # on how many times user read this article before
+        date_read = date_read or timezone.now()
+        reading = self.model(user=user, article=article,
+                             date_read=date_read, day=date_read.date())
+        options = {'update_conflicts': True,
+                   'update_fields': ['date_read']}
+        if connections[self.db].features.supports_update_conflicts_with_target:
+            options['unique_fields'] = ['user', 'article', 'day']
+        self.bulk_create([reading], **options)
+
 
 class UserReading(models.Model):
     user = models.ForeignKey('users.CustomUser', on_delete=models.CASCADE)
     article = models.ForeignKey('core.Article', on_delete=models.CASCADE)
     date_read = models.DateTimeField()
+    day = models.DateField()
+
+    objects = UserReadingQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'article', 'day'],
+                                    name='unique_user_reading_per_day')
+        ]
+        # reading history is listed from the latest reading
+        indexes = [
+            models.Index(fields=['user', '-date_read'],
+                         name='user_reading_user_date')
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.day is None and self.date_read:
+            self.day = self.date_read.date()
+        super().save(*args, **kwargs)
+
+
+class SubscriptionQuerySet(models.QuerySet):
+    def delete(self):
+        # subscribers of all authors are decreased by one UPDATE
+        # and their pages are purged at once, the same way
+        # as ReactionQuerySet.delete does it for reactions
+        from core.page_cache import purge_page_cache
+        with transaction.atomic():
+            authors = self.order_by().\
+                values('subscribe_to_id').\
+                annotate(number=Count('id'))
+            authors = {row['subscribe_to_id']: {'subscribers': row['number']}
+                       for row in authors}
+            if authors:
+                AuthorStats.objects.\
+                    filter(user_id__in=list(authors)).\
+                    update(subscribers=F('subscribers') -
+                           subtrahends('user_id', authors, 'subscribers'))
+            purge_page_cache(*[f'author:{author_id}' for author_id in authors])
+            deleted = self.order_by()._raw_delete(self.db)
+            return deleted, {self.model._meta.label: deleted}
 
 
 class Subscription(models.Model):
@@ -88,3 +445,200 @@ class Subscription(models.Model):
         'users.CustomUser', related_name='subscriber', on_delete=models.CASCADE)
     subscribe_to = models.ForeignKey(
         'users.CustomUser', related_name='subscribe_to', on_delete=models.CASCADE)
+
+    objects = SubscriptionQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['subscriber', 'subscribe_to'],
+                                    name='unique_subscription')
+        ]
+
+    # subscribers are counted and pages purged here instead of
+    # post_save and post_delete signals, which would turn off
+    # fast deletion of subscriptions of a deleted user. Views
+    # already lock the row in a transaction, so no savepoint is made
+    def save(self, *args, **kwargs):
+        from core.page_cache import purge_page_cache
+        with transaction.atomic(savepoint=False):
+            created = self._state.adding
+            super().save(*args, **kwargs)
+            if created:
+                AuthorStats.objects.change(self.subscribe_to_id, subscribers=1)
+            purge_page_cache(f'author:{self.subscribe_to_id}')
+
+    def delete(self, *args, **kwargs):
+        from core.page_cache import purge_page_cache
+        with transaction.atomic(savepoint=False):
+            deleted, rows = super().delete(*args, **kwargs)
+            # subscription deleted by another request already
+            # took its subscriber off the author
+            if deleted:
+                AuthorStats.objects.change(self.subscribe_to_id, subscribers=-1)
+                purge_page_cache(f'author:{self.subscribe_to_id}')
+            return deleted, rows
+
+
+class Recommendation(models.Model):
+    # Top articles recommended to a user, computed periodically
+    # by 'build_recommendations' management command
+    user = models.ForeignKey('users.CustomUser', on_delete=models.CASCADE)
+    article = models.ForeignKey('core.Article', on_delete=models.CASCADE)
+    score = models.FloatField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'article'],
+                                    name='unique_recommendation')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score'],
+                         name='recommendation_user_score')
+        ]
+
+
+class TrendingScore(models.Model):
+    # Sum of reads, likes and comments of an article, each of them
+    # decays exponentially with its age, all scores are decayed
+    # to the same moment stored in 'updated'
+    article = models.OneToOneField('core.Article', primary_key=True,
+                                   on_delete=models.CASCADE)
+    score = models.FloatField(default=0)
+    updated = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='trending_score')
+        ]
+
+
+class TrendingState(models.Model):
+    # Single row with the moment all trending scores are decayed to
+    # and ids of the last events added to them, events are taken by
+    # id, so one committed late with an older date is not missed
+    updated = models.DateTimeField()
+    last_reading_id = models.BigIntegerField(default=0)
+    last_reaction_id = models.BigIntegerField(default=0)
+    last_comment_id = models.BigIntegerField(default=0)
+
+
+class PageVersionQuerySet(models.QuerySet):
+    def bump(self, tags):
+        # new version is the moment of change, so rows are
+        # inserted or changed by a single upsert statement
+        if not tags:
+            return
+        version = time.time_ns()
+        options = {'update_conflicts': True,
+                   'update_fields': ['version']}
+        if connections[self.db].features.supports_update_conflicts_with_target:
+            options['unique_fields'] = ['tag']
+        self.bulk_create([self.model(tag=tag, version=version) for tag in tags],
+                         **options)
+
+    def get_versions(self, tags):
+        versions = dict(self.filter(tag__in=tags).values_list('tag', 'version'))
+        return [versions.get(tag, 0) for tag in tags]
+
+
+class PageVersion(models.Model):
+    # Version of an object pages show, e.g. 'article:1', raised with
+    # purge of cached pages in the transaction that changes the object,
+    # so ETags made of versions are the same in every process
+    tag = models.CharField(max_length=255, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    objects = PageVersionQuerySet.as_manager()
+
+
+class SearchDocument(models.Model):
+    # Text of an article prepared for search, MySQL keeps
+    # FULLTEXT index over all its text columns
+    article = models.OneToOneField('core.Article', primary_key=True,
+                                   on_delete=models.CASCADE)
+    title = models.CharField(max_length=255)
+    tags = models.TextField()
+    author = models.CharField(max_length=150)
+    content = models.TextField()
+
+
+class SearchTerm(models.Model):
+    # Inverted index used when FULLTEXT search is not available,
+    # weight tells how important the term is for the article
+    term = models.CharField(max_length=64)
+    article = models.ForeignKey('core.Article', on_delete=models.CASCADE)
+    weight = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'article'],
+                                    name='unique_search_term')
+        ]
+
+
+class JobQuerySet(models.QuerySet):
+    def enqueue(self, name, payload=None, delay=0):
+        # job is visible to workers only when transaction
+        # that enqueued it is committed
+        run_after = timezone.now() + timedelta(seconds=delay)
+        return self.create(name=name, payload=payload or {}, run_after=run_after)
+
+    def claim(self, limit):
+        # pending jobs are locked, so two workers never take the same
+        # job, rows locked by another worker are skipped where possible
+        now = timezone.now()
+        with transaction.atomic(using=self.db):
+            jobs = self.filter(status=Job.PENDING, run_after__lte=now).\
+                order_by('run_after', 'id')
+            skip_locked = connections[self.db].features.has_select_for_update_skip_locked
+            jobs = list(jobs.select_for_update(skip_locked=skip_locked)[:limit])
+            self.filter(id__in=[job.id for job in jobs]).\
+                update(status=Job.RUNNING, started=now,
+                       attempts=F('attempts') + 1)
+        for job in jobs:
+            job.status, job.started, job.attempts = Job.RUNNING, now, job.attempts + 1
+        return jobs
+
+    def requeue_stale(self, timeout, max_attempts):
+        # jobs of workers that died while running them, job that
+        # used all its attempts, e.g. one that kills the worker
+        # every time, is failed instead of being run forever
+        started = timezone.now() - timedelta(seconds=timeout)
+        stale = self.filter(status=Job.RUNNING, started__lt=started)
+        stale.filter(attempts__gte=max_attempts).\
+            update(status=Job.FAILED,
+                   last_error=f'Not finished in {timeout} seconds')
+        return stale.update(status=Job.PENDING)
+
+
+class Job(models.Model):
+    # Task of local job queue, done by 'run_worker' management
+    # command, finished jobs are deleted, failed ones are kept
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed')
+    ]
+    name = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=16, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    started = models.DateTimeField(null=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'],
+                         name='job_status_run_after')
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
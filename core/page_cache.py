@@ -0,0 +1,161 @@
+import hashlib
+import re
+import time
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from core.db.routers import use_replica
+from core.models import PageVersion
+
+PAGE_KEY = 'core:page:{}'
+TAG_KEY = 'core:page-tag:{}'
+TAG_TIMEOUT = 24 * 60 * 60
+# tokens of forms are personal, so they are replaced with a placeholder
+# in cached pages and filled with token of each visitor on the way out
+CSRF_PLACEHOLDER = b'page-cache-csrf-token'
+CSRF_TOKEN = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def get_timeout():
+    return getattr(settings, 'PAGE_CACHE_TIMEOUT', 60)
+
+
+def add_page_cache_tags(request, *tags):
+    """
+    Marks response to request as cacheable for anonymous visitors,
+    tags name objects the page shows, e.g. 'article:1' or 'tag:music'
+    """
+    request.page_cache_tags = getattr(request, 'page_cache_tags', set()) | set(tags)
+
+
+def set_tag_versions(keys):
+    cache.set_many(dict.fromkeys(keys, time.time_ns()), TAG_TIMEOUT)
+
+
+def purge_page_cache(*tags):
+    # version of tag is moved to the current moment, so pages stored
+    # with an older version are not served anymore and pages rendered
+    # while it changes are not stored. It is moved again after commit,
+    # because pages rendered before it still show old rows. Version
+    # in the database makes ETags of pages change
+    keys = [TAG_KEY.format(tag) for tag in tags]
+    set_tag_versions(keys)
+    transaction.on_commit(lambda: set_tag_versions(keys))
+    PageVersion.objects.bump(set(tags))
+
+
+def get_tag_versions(tags, default):
+    # missing version is created with default moment, unless
+    # another process created or purged it in the meantime
+    keys = {TAG_KEY.format(tag): tag for tag in tags}
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, default, TAG_TIMEOUT)
+        versions.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def is_shared_cache():
+    # purges of pages cached in memory of a process
+    # do not reach other processes of the site
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    Caches whole responses of pages marked with add_page_cache_tags
+    for visitors that are not logged in. Key is made of path and
+    query string only, pages are purged by tags when objects
+    they show change and expire after PAGE_CACHE_TIMEOUT.
+    Cache must be shared by all processes of the site, local memory
+    cache is used only with PAGE_CACHE_LOCAL_MEMORY. Pages that are
+    going to be stored are rendered from default database
+    """
+
+    def __init__(self, get_response):
+        if not is_shared_cache() and \
+                not getattr(settings, 'PAGE_CACHE_LOCAL_MEMORY', False):
+            raise MiddlewareNotUsed('Page cache needs a cache shared by processes, '
+                                    'set CACHE_URL or PAGE_CACHE_LOCAL_MEMORY')
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.can_use_cache(request):
+            return self.get_response(request)
+        key = PAGE_KEY.format(
+            hashlib.md5(request.get_full_path().encode()).hexdigest())
+        response = self.get_cached_response(request, key)
+        if response is None:
+            # versions of tags are only known after the view ran,
+            # page is stored if none of them changed since it started
+            started = time.time_ns()
+            # replica can lag behind a purge, page rendered from it
+            # would be stored with fresh versions of its tags
+            use_replica_token = use_replica.set(False)
+            try:
+                response = self.get_response(request)
+            finally:
+                use_replica.reset(use_replica_token)
+            if self.can_store(request, response):
+                self.store(request, response, key, started)
+        return response
+
+    def can_use_cache(self, request):
+        return get_timeout() > 0 and \
+            request.method in ('GET', 'HEAD') and \
+            not request.user.is_authenticated and \
+            not len(get_messages(request))
+
+    def can_store(self, request, response):
+        session = getattr(request, 'session', None)
+        return request.method == 'GET' and \
+            getattr(request, 'page_cache_tags', None) and \
+            response.status_code == 200 and \
+            not response.streaming and \
+            not response.cookies and \
+            'private' not in response.get('Cache-Control', '') and \
+            not (session is not None and session.modified) and \
+            not len(get_messages(request))
+
+    def store(self, request, response, key, started):
+        versions = get_tag_versions(request.page_cache_tags, started)
+        if any(version > started for version in versions.values()):
+            return
+        content = CSRF_TOKEN.sub(rb'\g<1>' + CSRF_PLACEHOLDER + rb'\g<2>',
+                                 response.content)
+        cache.set(key, {'tags': versions,
+                        'content': content,
+                        'status': response.status_code,
+                        'headers': list(response.items())},
+                  get_timeout())
+
+    def get_cached_response(self, request, key):
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        versions = cache.get_many([TAG_KEY.format(tag) for tag in entry['tags']])
+        if any(versions.get(TAG_KEY.format(tag)) != version
+               for tag, version in entry['tags'].items()):
+            return None
+        content = entry['content']
+        if CSRF_PLACEHOLDER in content:
+            content = content.replace(CSRF_PLACEHOLDER, get_token(request).encode())
+        request.page_cache_hit = True
+        response = HttpResponse(content, status=entry['status'])
+        for header, value in entry['headers']:
+            response[header] = value
+        # validators stored with the page are checked here,
+        # because view is not called
+        return get_conditional_response(
+            request, etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(response.get('Last-Modified', '')),
+            response=response)
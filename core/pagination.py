@@ -0,0 +1,192 @@
+import base64
+import json
+from datetime import datetime
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models.query_utils import Q
+from django.http import Http404
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values, direction):
+    # datetimes keep microseconds, otherwise rows published
+    # in the same millisecond could be skipped
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    data = json.dumps({'v': values, 'd': direction})
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor):
+    # values are converted to types of ordering fields by paginator
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        values, direction = data['v'], data['d']
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor
+    if direction not in ('next', 'previous') or not isinstance(values, list):
+        raise InvalidCursor
+    return values, direction
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.next_url = None
+        self.previous_url = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginates queryset by values of its ordering fields instead of
+    OFFSET, so every page costs the same as the first one and
+    pages stay stable when new rows are inserted. The last field
+    of ordering must be unique, e.g. ('-times_read', 'id'), so rows
+    with equal values of other fields, or values that change between
+    requests, are still paged in a fixed order
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = ordering
+        self.per_page = per_page
+
+    def get_fields(self, reverse=False):
+        fields = []
+        for field in self.ordering:
+            descending = field.startswith('-')
+            fields.append((field.lstrip('-'), descending != reverse))
+        return fields
+
+    def get_order_by(self, fields):
+        return [f'-{name}' if descending else name for name, descending in fields]
+
+    def get_filter(self, fields, values):
+        # (a, b) > (x, y) is written as a > x OR (a = x AND b > y),
+        # which is what databases can match with composite index
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(fields, values):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def get_output_field(self, name):
+        query = self.queryset.query
+        if name in query.annotations:
+            return query.annotations[name].output_field
+        opts = self.queryset.model._meta
+        *relations, field_name = name.split('__')
+        for relation in relations:
+            opts = opts.get_field(relation).related_model._meta
+        return opts.get_field(field_name)
+
+    def clean_values(self, values):
+        # cursor comes from query string, every value must be
+        # converted to type of its field or page is not found
+        if len(values) != len(self.ordering):
+            raise InvalidCursor
+        cleaned = []
+        for (name, _), value in zip(self.get_fields(), values):
+            if value is None or isinstance(value, (bool, dict, list)):
+                raise InvalidCursor
+            try:
+                value = self.get_output_field(name).to_python(value)
+            except (ValidationError, TypeError, ValueError):
+                raise InvalidCursor
+            if value is None:
+                raise InvalidCursor
+            cleaned.append(value)
+        return cleaned
+
+    def get_values(self, obj):
+        values = []
+        for field in self.ordering:
+            value = obj
+            for attr in field.lstrip('-').split('__'):
+                value = getattr(value, attr)
+            values.append(value)
+        return values
+
+    def page(self, cursor=None):
+        values, direction = decode_cursor(cursor) if cursor else (None, 'next')
+        if values is not None:
+            values = self.clean_values(values)
+        reverse = direction == 'previous'
+        fields = self.get_fields(reverse)
+        queryset = self.queryset.order_by(*self.get_order_by(fields))
+        if values is not None:
+            queryset = queryset.filter(self.get_filter(fields, values))
+        # one extra row tells whether there is one more page
+        objects = list(queryset[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if reverse:
+            objects.reverse()
+        if not objects:
+            return KeysetPage([], None, None)
+        next_cursor = previous_cursor = None
+        if has_more or reverse:
+            next_cursor = encode_cursor(self.get_values(objects[-1]), 'next')
+        if values is not None and (has_more or not reverse):
+            previous_cursor = encode_cursor(self.get_values(objects[0]), 'previous')
+        return KeysetPage(objects, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    Mixin for list views, page is chosen by 'cursor'
+    parameter of query string
+    """
+    keyset_ordering = ('-pub_date', 'id')
+    per_page = None
+
+    def get_per_page(self):
+        return self.per_page or getattr(settings, 'ARTICLES_PER_PAGE', 20)
+
+    def get_page_url(self, cursor):
+        query = self.request.GET.copy()
+        query['cursor'] = cursor
+        return f'?{query.urlencode()}'
+
+    def paginate_keyset(self, queryset):
+        paginator = KeysetPaginator(queryset, self.keyset_ordering,
+                                    self.get_per_page())
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404
+        if page.has_next:
+            page.next_url = self.get_page_url(page.next_cursor)
+        if page.has_previous:
+            page.previous_url = self.get_page_url(page.previous_cursor)
+        return page
+
+    def get_context_data(self, **kwargs):
+        # used by ListView, page replaces the whole object_list
+        page = None
+        if self.object_list is not None:
+            page = self.paginate_keyset(self.object_list)
+            kwargs['object_list'] = page.object_list
+        context = super().get_context_data(**kwargs)
+        context['page'] = page
+        return context
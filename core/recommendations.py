@@ -0,0 +1,185 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.db.models.query_utils import Q
+from django.utils import timezone
+from taggit.models import TaggedItem
+from core.models import Article, FavoriteArticles, Reaction, Recommendation, \
+    Subscription, UserReading
+
+# how much a single signal adds to user's interest in a tag
+FAVORITE_WEIGHT = 3
+LIKE_WEIGHT = 2
+READING_WEIGHT = 1
+# bonus for recent articles of authors user is subscribed to
+SUBSCRIPTION_WEIGHT = 5
+# only the most read articles of every tag and the latest of every
+# author are scored, for the tags user is most interested in, so
+# building does not grow with number of articles on the site
+CANDIDATES_PER_TAG = 50
+CANDIDATES_PER_AUTHOR = 20
+TAGS_PER_USER = 10
+
+
+def get_limit():
+    return getattr(settings, 'RECOMMENDATIONS_PER_USER', 20)
+
+
+def get_popular_articles(limit=None):
+    # fallback for anonymous users and users without recommendations
+    return Article.objects.\
+        select_related('author').\
+        prefetch_related('tags').\
+        order_by('-times_read', '-pub_date')[:limit or get_limit()]
+
+
+def get_recommended_articles(user, limit=None):
+    if not user.is_authenticated:
+        return get_popular_articles(limit)
+    articles = Article.objects.\
+        select_related('author').\
+        prefetch_related('tags').\
+        filter(recommendation__user=user).\
+        order_by('-recommendation__score')
+    articles = list(articles[:limit or get_limit()])
+    return articles or get_popular_articles(limit)
+
+
+class RecommendationBuilder:
+    """
+    Builds recommendations for a batch of users with a fixed
+    number of queries: signals of all users in the batch are fetched
+    at once and scored with Counters in memory against a limited
+    number of candidate articles of every tag and author
+    """
+
+    def __init__(self, limit=None, subscription_days=7):
+        self.limit = limit or get_limit()
+        self.since = timezone.now() - timedelta(days=subscription_days)
+        self.content_type = ContentType.objects.get_for_model(Article)
+
+    def get_article_tags(self, article_ids):
+        article_tags = defaultdict(set)
+        items = TaggedItem.objects.\
+            filter(content_type=self.content_type,
+                   object_id__in=article_ids).\
+            values_list('object_id', 'tag_id')
+        for article_id, tag_id in items:
+            article_tags[article_id].add(tag_id)
+        return article_tags
+
+    def get_signals(self, user_ids):
+        # (user, article, weight) for every favorite, like and reading
+        signals = []
+        favorites = FavoriteArticles.articles.through.objects.\
+            filter(favoritearticles__user_id__in=user_ids).\
+            values_list('favoritearticles__user_id', 'article_id')
+        signals += [(u, a, FAVORITE_WEIGHT) for u, a in favorites]
+        likes = Reaction.objects.\
+            filter(Q(user_id__in=user_ids) & Q(value=1)).\
+            values_list('user_id', 'article_id')
+        signals += [(u, a, LIKE_WEIGHT) for u, a in likes]
+        readings = UserReading.objects.\
+            filter(user_id__in=user_ids).\
+            values_list('user_id', 'article_id')
+        signals += [(u, a, READING_WEIGHT) for u, a in readings]
+        return signals
+
+    def get_tag_interests(self, signals):
+        article_tags = self.get_article_tags({a for _, a, _ in signals})
+        interests = defaultdict(Counter)
+        seen = defaultdict(set)
+        for user_id, article_id, weight in signals:
+            seen[user_id].add(article_id)
+            for tag_id in article_tags[article_id]:
+                interests[user_id][tag_id] += weight
+        return interests, seen
+
+    def get_subscriptions(self, user_ids):
+        subscriptions = defaultdict(set)
+        pairs = Subscription.objects.\
+            filter(subscriber_id__in=user_ids).\
+            values_list('subscriber_id', 'subscribe_to_id')
+        for subscriber_id, author_id in pairs:
+            subscriptions[subscriber_id].add(author_id)
+        return subscriptions
+
+    def rank(self, articles, partition, order_by):
+        # first articles of every partition, numbered by window function
+        return articles.\
+            annotate(group_id=F(partition),
+                     position=Window(RowNumber(), partition_by=F(partition),
+                                     order_by=order_by))
+
+    def get_candidates(self, tag_ids, author_ids):
+        # most read articles of tags users are interested in
+        tag_articles = defaultdict(set)
+        ranked = self.rank(Article.objects.filter(tags__id__in=tag_ids), 'tags__id',
+                           [F('times_read').desc(), F('pub_date').desc(), F('id').desc()]).\
+            filter(position__lte=CANDIDATES_PER_TAG).\
+            values_list('group_id', 'id')
+        for tag_id, article_id in ranked:
+            tag_articles[tag_id].add(article_id)
+        # recent articles of subscriptions
+        author_articles = defaultdict(set)
+        ranked = self.rank(Article.objects.filter(author_id__in=author_ids,
+                                                  pub_date__gt=self.since), 'author_id',
+                           [F('pub_date').desc(), F('id').desc()]).\
+            filter(position__lte=CANDIDATES_PER_AUTHOR).\
+            values_list('group_id', 'id')
+        for author_id, article_id in ranked:
+            author_articles[author_id].add(article_id)
+        article_ids = set().union(*tag_articles.values(), *author_articles.values())
+        articles = Article.objects.\
+            filter(id__in=article_ids).\
+            values_list('id', 'author_id', 'pub_date', 'times_read')
+        articles = {row[0]: row for row in articles}
+        return tag_articles, author_articles, articles, self.get_article_tags(article_ids)
+
+    def score_user(self, user_id, interests, seen, subscriptions,
+                   tag_articles, author_articles, articles, article_tags):
+        candidates = set()
+        for tag_id, _ in interests.most_common(TAGS_PER_USER):
+            candidates |= tag_articles[tag_id]
+        for author_id in subscriptions:
+            candidates |= author_articles[author_id]
+        scores = Counter()
+        for article_id in candidates - seen:
+            _, author_id, pub_date, times_read = articles[article_id]
+            if author_id == user_id:
+                continue
+            score = sum(interests[tag_id] for tag_id in article_tags[article_id])
+            if author_id in subscriptions and pub_date > self.since:
+                score += SUBSCRIPTION_WEIGHT
+            if score:
+                # popularity only breaks ties between equal scores
+                scores[article_id] = score + times_read / (times_read + 1000)
+        return scores.most_common(self.limit)
+
+    def build(self, user_ids):
+        signals = self.get_signals(user_ids)
+        interests, seen = self.get_tag_interests(signals)
+        subscriptions = self.get_subscriptions(user_ids)
+        tag_ids = set()
+        for counter in interests.values():
+            tag_ids.update(tag_id for tag_id, _ in counter.most_common(TAGS_PER_USER))
+        author_ids = set()
+        for authors in subscriptions.values():
+            author_ids.update(authors)
+        candidates = self.get_candidates(tag_ids, author_ids)
+        recommendations = []
+        for user_id in user_ids:
+            top = self.score_user(user_id, interests[user_id], seen[user_id],
+                                  subscriptions[user_id], *candidates)
+            recommendations += [Recommendation(user_id=user_id,
+                                               article_id=article_id,
+                                               score=score)
+                                for article_id, score in top]
+        with transaction.atomic():
+            Recommendation.objects.filter(user_id__in=user_ids).delete()
+            Recommendation.objects.bulk_create(recommendations)
+        return len(recommendations)
@@ -0,0 +1,137 @@
+import hashlib
+import logging
+from io import BytesIO
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from PIL import Image
+from core.validators import get_max_pixels
+
+logger = logging.getLogger(__name__)
+
+# modes that WebP can store as they are
+WEBP_MODES = ('RGB', 'RGBA')
+# names of sizes whose renditions of an image are in the storage
+SIZES_KEY = 'core:renditions:{}'
+# renditions generated or deleted by worker of another process
+# are not known to local memory cache of this one, so entries
+# expire, the ones with missing renditions sooner
+SIZES_TIMEOUT = 24 * 60 * 60
+MISSING_TIMEOUT = 60
+
+
+def get_sizes():
+    # name of rendition and the biggest side of its image in pixels
+    return getattr(settings, 'IMAGE_RENDITIONS',
+                   {'thumb': 100, 'card': 600, 'large': 1200})
+
+
+def get_rendition_name(name, size_name):
+    # renditions are stored next to the original image, e.g.
+    # core/images/photo.jpg.card.webp for core/images/photo.jpg,
+    # extension is kept, so photo.png has renditions of its own
+    return f'{name}.{size_name}.webp'
+
+
+def get_sizes_key(name):
+    return SIZES_KEY.format(hashlib.md5(name.encode()).hexdigest())
+
+
+def set_stored_sizes(name, size_names):
+    complete = set(size_names) >= set(get_sizes())
+    cache.set(get_sizes_key(name), set(size_names),
+              SIZES_TIMEOUT if complete else MISSING_TIMEOUT)
+
+
+def get_stored_sizes(field_file):
+    # storage is asked only when cache does not know the image,
+    # e.g. renditions were generated before it was cleared
+    size_names = cache.get(get_sizes_key(field_file.name))
+    if size_names is None:
+        storage = field_file.storage
+        size_names = {size_name for size_name in get_sizes()
+                      if storage.exists(get_rendition_name(field_file.name, size_name))}
+        set_stored_sizes(field_file.name, size_names)
+    return size_names
+
+
+def render(image, size):
+    rendition = image.copy()
+    # keeps proportions and never makes image bigger
+    rendition.thumbnail((size, size), Image.LANCZOS)
+    if rendition.mode not in WEBP_MODES:
+        has_alpha = 'A' in rendition.mode or 'transparency' in rendition.info
+        rendition = rendition.convert('RGBA' if has_alpha else 'RGB')
+    content = BytesIO()
+    rendition.save(content, 'WEBP',
+                   quality=getattr(settings, 'IMAGE_RENDITION_QUALITY', 80))
+    return ContentFile(content.getvalue())
+
+
+def generate_renditions(field_file, force=False):
+    """
+    Writes resized WebP copies of image of ImageField for every size
+    of IMAGE_RENDITIONS, returns the number of written renditions.
+    Files that can not be read as images are skipped
+    """
+    if not field_file:
+        return 0
+    storage = field_file.storage
+    try:
+        names = {size_name: get_rendition_name(field_file.name, size_name)
+                 for size_name in get_sizes()}
+        if not force:
+            names = {size_name: name for size_name, name in names.items()
+                     if not storage.exists(name)}
+        if not names:
+            set_stored_sizes(field_file.name, get_sizes())
+            return 0
+        with storage.open(field_file.name, 'rb') as original:
+            image = Image.open(original)
+            if image.width * image.height > get_max_pixels():
+                raise ValueError('image has too many pixels')
+            # JPEG is decoded right away at a smaller scale,
+            # which is enough for the biggest rendition
+            biggest = max(get_sizes().values())
+            image.draft('RGB', (biggest, biggest))
+            image.load()
+        for size_name, name in names.items():
+            content = render(image, get_sizes()[size_name])
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, content)
+    except (FileNotFoundError, SuspiciousFileOperation) as error:
+        # original is not in the storage
+        logger.info('Renditions of %s were not generated: %s',
+                    field_file.name, error)
+        return 0
+    except (OSError, ValueError) as error:
+        logger.warning('Renditions of %s were not generated: %s',
+                       field_file.name, error)
+        return 0
+    set_stored_sizes(field_file.name, get_sizes())
+    return len(names)
+
+
+def delete_renditions(name, storage):
+    cache.delete(get_sizes_key(name))
+    for size_name in get_sizes():
+        try:
+            rendition = get_rendition_name(name, size_name)
+            if storage.exists(rendition):
+                storage.delete(rendition)
+        except (OSError, SuspiciousFileOperation):
+            pass
+
+
+def get_rendition_url(field_file, size_name):
+    # original image is used until rendition is generated
+    if not field_file:
+        return ''
+    try:
+        if size_name in get_sizes() and size_name in get_stored_sizes(field_file):
+            return field_file.storage.url(get_rendition_name(field_file.name, size_name))
+    except SuspiciousFileOperation:
+        pass
+    return field_file.url
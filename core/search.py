@@ -0,0 +1,127 @@
+import re
+from collections import Counter
+from functools import reduce
+from operator import or_
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import FloatField, Sum
+from django.db.models.expressions import RawSQL
+from django.db.models.query_utils import Q
+from core.models import Article, SearchDocument, SearchTerm
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+# importance of a single occurrence of a term in every part of article
+TITLE_WEIGHT = 5
+TAGS_WEIGHT = 3
+AUTHOR_WEIGHT = 3
+CONTENT_WEIGHT = 1
+# content of a long article cannot outweigh its title
+MAX_CONTENT_WEIGHT = 10
+
+
+def tokenize(text):
+    return [token[:MAX_TERM_LENGTH]
+            for token in TOKEN_RE.findall(text.lower()) if len(token) > 1]
+
+
+class InvertedIndexBackend:
+    """
+    Search over SearchTerm table, works on every database.
+    Terms of query are matched as prefixes, so 'music' finds
+    articles with 'musician' in title
+    """
+
+    def get_terms(self, article, tag_names):
+        terms = Counter()
+        for token in tokenize(article.title):
+            terms[token] += TITLE_WEIGHT
+        for token in tokenize(' '.join(tag_names)):
+            terms[token] += TAGS_WEIGHT
+        for token in tokenize(article.author.username):
+            terms[token] += AUTHOR_WEIGHT
+        content = Counter(tokenize(article.content))
+        for token, number in content.items():
+            terms[token] += min(number, MAX_CONTENT_WEIGHT) * CONTENT_WEIGHT
+        return terms
+
+    def index(self, articles):
+        search_terms = []
+        for article in articles:
+            tag_names = [tag.name for tag in article.tags.all()]
+            search_terms += [SearchTerm(term=term, article=article, weight=weight)
+                             for term, weight in self.get_terms(article, tag_names).items()]
+        with transaction.atomic():
+            SearchTerm.objects.filter(article__in=articles).delete()
+            SearchTerm.objects.bulk_create(search_terms, batch_size=1000)
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def search(self, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return Article.objects.none()
+        matches = reduce(or_, [Q(searchterm__term__startswith=token)
+                               for token in tokens])
+        return Article.objects.\
+            filter(matches).\
+            annotate(rank=Sum('searchterm__weight')).\
+            order_by('-rank', '-times_read')
+
+
+class FulltextBackend:
+    """
+    Search with MySQL FULLTEXT index over SearchDocument table,
+    ranked by relevance MySQL computes itself
+    """
+    match = 'MATCH (core_searchdocument.title, core_searchdocument.tags, ' \
+        'core_searchdocument.author, core_searchdocument.content) ' \
+        'AGAINST (%s IN NATURAL LANGUAGE MODE)'
+
+    def index(self, articles):
+        documents = [SearchDocument(article=article,
+                                    title=article.title,
+                                    tags=' '.join(tag.name for tag in article.tags.all()),
+                                    author=article.author.username,
+                                    content=article.content)
+                     for article in articles]
+        with transaction.atomic():
+            SearchDocument.objects.filter(article__in=articles).delete()
+            SearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+    def clear(self):
+        SearchDocument.objects.all().delete()
+
+    def search(self, query):
+        if not query.strip():
+            return Article.objects.none()
+        return Article.objects.\
+            filter(searchdocument__isnull=False).\
+            annotate(rank=RawSQL(self.match, (query, ), output_field=FloatField())).\
+            filter(rank__gt=0).\
+            order_by('-rank', '-times_read')
+
+
+def get_search_backend():
+    if connection.vendor == 'mysql' and getattr(settings, 'SEARCH_USE_FULLTEXT', True):
+        return FulltextBackend()
+    return InvertedIndexBackend()
+
+
+def index_articles(articles):
+    articles = list(articles)
+    if articles:
+        get_search_backend().index(articles)
+
+
+def index_article_ids(article_ids):
+    articles = Article.objects.\
+        select_related('author').\
+        prefetch_related('tags').\
+        filter(id__in=article_ids)
+    index_articles(articles)
+
+
+def search_articles(query):
+    return get_search_backend().search(query)
@@ -0,0 +1,219 @@
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django_cleanup.signals import cleanup_pre_delete
+from taggit.models import Tag, TaggedItem
+from core.counters import read_counter
+from core.fragments import invalidate_article_cards
+from core.page_cache import purge_page_cache
+from core.models import Article, AuthorStats, Job, Reaction, SocialMedia, Subscription, TagCloud, UserDescription
+from core.search import index_article_ids, index_articles
+from core.tag_cloud import invalidate_tag_cloud
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def release_user_reactions(sender, instance, **kwargs):
+    # cascade deletion of reactions bypasses ReactionQuerySet.delete,
+    # so reactions of deleted user are removed here first to keep
+    # like/dislike counters of articles correct
+    Reaction.objects.filter(user=instance).delete()
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def release_user_subscriptions(sender, instance, **kwargs):
+    # the same for subscriptions and subscribers of authors
+    Subscription.objects.\
+        filter(Q(subscriber=instance) | Q(subscribe_to=instance)).\
+        delete()
+
+
+@receiver(request_finished)
+def flush_read_counter(sender, **kwargs):
+    # buffered reads are written even when article
+    # that was read last is not read again for a long time
+    read_counter.flush_if_due()
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def update_tag_cloud(sender, instance, action, pk_set, **kwargs):
+    if not isinstance(instance, Article):
+        return
+    if action == 'post_add':
+        TagCloud.objects.increment(pk_set)
+    elif action == 'post_remove':
+        TagCloud.objects.decrement(pk_set)
+    elif action == 'pre_clear':
+        # taggit does not tell which tags were cleared
+        instance._cleared_tag_ids = list(instance.tags.values_list('id', flat=True))
+        return
+    elif action == 'post_clear':
+        TagCloud.objects.decrement(getattr(instance, '_cleared_tag_ids', []))
+    else:
+        return
+    invalidate_tag_cloud()
+
+
+@receiver(pre_delete, sender=Article)
+def release_article_tags(sender, instance, **kwargs):
+    # tagged items of deleted article are removed by cascade,
+    # which does not send m2m_changed signal
+    tag_ids = list(instance.tags.values_list('id', flat=True))
+    if tag_ids:
+        TagCloud.objects.decrement(tag_ids)
+        invalidate_tag_cloud()
+
+
+@receiver(post_save, sender=Article)
+def index_saved_article(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_articles([instance])
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def index_retagged_article(sender, instance, action, **kwargs):
+    if isinstance(instance, Article) and \
+            action in ('post_add', 'post_remove', 'post_clear'):
+        index_articles([instance])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def index_articles_of_renamed_author(sender, instance, created, update_fields=None, **kwargs):
+    # name of author is searchable, but most saves of user,
+    # like updating last_login, do not touch it
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    # cards of articles show the name of author as well
+    article_ids = Article.objects.\
+        filter(author=instance).\
+        values_list('id', flat=True)
+    article_ids = list(article_ids)
+    index_article_ids(article_ids)
+    invalidate_article_cards(article_ids)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_author_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Article)
+def count_saved_article(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        AuthorStats.objects.change(instance.author_id, articles=1,
+                                   reads=instance.times_read,
+                                   likes=instance.likes)
+    elif instance._saved_counters is not None:
+        # counters changed directly on the instance, e.g. in admin
+        times_read, likes = instance._saved_counters
+        AuthorStats.objects.change(instance.author_id,
+                                   reads=instance.times_read - times_read,
+                                   likes=instance.likes - likes)
+    instance._saved_counters = (instance.times_read, instance.likes)
+
+
+@receiver(post_delete, sender=Article)
+def count_deleted_article(sender, instance, **kwargs):
+    AuthorStats.objects.change(instance.author_id, articles=-1,
+                               reads=-instance.times_read,
+                               likes=-instance.likes)
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def invalidate_card_of_article(sender, instance, **kwargs):
+    invalidate_article_cards([instance.id])
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def invalidate_card_of_retagged_article(sender, instance, action, **kwargs):
+    if isinstance(instance, Article) and \
+            action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_article_cards([instance.id])
+
+
+def purge_pages_of_article(article, tag_slugs=()):
+    # index page lists popular articles and tags
+    purge_page_cache(f'article:{article.id}', f'author:{article.author_id}',
+                     'index', *[f'tag:{slug}' for slug in tag_slugs])
+
+
+@receiver(post_save, sender=Article)
+def purge_pages_of_saved_article(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # new article gets its tags later
+    tag_slugs = [] if created else instance.tags.values_list('slug', flat=True)
+    purge_pages_of_article(instance, tag_slugs)
+
+
+@receiver(pre_delete, sender=Article)
+def purge_pages_of_deleted_article(sender, instance, **kwargs):
+    purge_pages_of_article(instance, instance.tags.values_list('slug', flat=True))
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def purge_pages_of_retagged_article(sender, instance, action, pk_set, **kwargs):
+    if not isinstance(instance, Article):
+        return
+    if action in ('post_add', 'post_remove'):
+        tag_ids = pk_set
+    elif action == 'post_clear':
+        tag_ids = getattr(instance, '_cleared_tag_ids', [])
+    else:
+        return
+    tag_slugs = Tag.objects.filter(id__in=tag_ids).values_list('slug', flat=True)
+    purge_pages_of_article(instance, tag_slugs)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def purge_pages_of_saved_user(sender, instance, update_fields=None, **kwargs):
+    # login only updates last_login, which pages do not show
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    purge_page_cache(f'author:{instance.id}')
+
+
+@receiver(post_save, sender=UserDescription)
+@receiver(post_delete, sender=UserDescription)
+@receiver(post_save, sender=SocialMedia)
+@receiver(post_delete, sender=SocialMedia)
+def purge_about_page_of_author(sender, instance, **kwargs):
+    purge_page_cache(f'author:{instance.user_id}')
+
+
+def get_image_field(sender):
+    return 'image' if sender is Article else 'user_image'
+
+
+@receiver(pre_save, sender=Article)
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def mark_uploaded_image(sender, instance, raw=False, **kwargs):
+    # uploaded file is not committed to the storage yet,
+    # after saving it is impossible to tell it was new
+    if not raw:
+        image = getattr(instance, get_image_field(sender))
+        instance._image_uploaded = bool(image) and not image._committed
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def enqueue_image_renditions(sender, instance, **kwargs):
+    # images are decoded and resized by worker, not during request
+    if getattr(instance, '_image_uploaded', False):
+        instance._image_uploaded = False
+        Job.objects.enqueue('generate_renditions',
+                            {'model': sender._meta.label, 'pk': instance.pk,
+                             'field': get_image_field(sender)})
+
+
+@receiver(cleanup_pre_delete)
+def delete_renditions_of_image(sender, file, **kwargs):
+    # django-cleanup removes replaced and orphaned originals,
+    # their renditions are removed by worker
+    Job.objects.enqueue('delete_renditions', {'name': file.name})
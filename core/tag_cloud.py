@@ -0,0 +1,42 @@
+import math
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from taggit.models import Tag
+
+CACHE_KEY = 'core:tag-cloud'
+
+
+def invalidate_tag_cloud():
+    cache.delete(CACHE_KEY)
+
+
+def set_weights(tags):
+    # weight is a font size in percents, it grows with
+    # logarithm of the number of articles, so one very popular
+    # tag does not make all other tags look the same
+    if not tags:
+        return tags
+    max_count = max(tag.articles_count for tag in tags)
+    for tag in tags:
+        if max_count > 1:
+            ratio = math.log(tag.articles_count) / math.log(max_count)
+        else:
+            ratio = 0
+        tag.weight = 100 + round(100 * ratio)
+    return tags
+
+
+def get_tag_cloud(weighted=False):
+    tags = cache.get(CACHE_KEY)
+    if tags is None:
+        tags = Tag.objects.\
+            filter(cloud__articles_count__gt=0).\
+            annotate(articles_count=F('cloud__articles_count')).\
+            order_by('name')
+        tags = list(tags)
+        cache.set(CACHE_KEY, tags,
+                  getattr(settings, 'TAG_CLOUD_CACHE_TIMEOUT', 300))
+    if weighted:
+        return set_weights(tags)
+    return tags
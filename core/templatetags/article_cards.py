@@ -0,0 +1,15 @@
+from django import template
+from core.fragments import get_timeout, set_card_versions
+
+register = template.Library()
+
+
+@register.filter
+def with_card_versions(articles, fragment_name):
+    # {% for article in articles|with_card_versions:'article-card' %}
+    return set_card_versions(articles, fragment_name)
+
+
+@register.simple_tag
+def card_cache_timeout():
+    return get_timeout()
@@ -0,0 +1,10 @@
+from django import template
+from core.renditions import get_rendition_url
+
+register = template.Library()
+
+
+@register.filter
+def rendition(field_file, size_name):
+    # {{ article.image|rendition:'card' }} is url of resized image
+    return get_rendition_url(field_file, size_name)
@@ -0,0 +1,494 @@
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.loader import MigrationLoader
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from taggit.models import Tag, TaggedItem
+
+from core.models import Article, AuthorStats, Comment, FavoriteArticles, Job, Reaction, Recommendation, \
+    SearchTerm, Subscription, TagCloud, TrendingScore, TrendingState, UserReading
+from core.trending import TrendingUpdater
+from users.models import CustomUser
+
+
+class RecountReactionsCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user_1 = CustomUser.objects.create_user(username='User1',
+                                                     password='34somepassword34',
+                                                     email='user1@gmail.com')
+        test_user_2 = CustomUser.objects.create_user(username='User2',
+                                                     password='34somepassword34',
+                                                     email='user2@gmail.com')
+
+        article_1 = Article.objects.\
+            create(title='Something1',
+                   content='Cool content 1',
+                   author=test_user_1,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+        Article.objects.\
+            create(title='Something2',
+                   content='Cool content 2',
+                   author=test_user_1,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+
+        Reaction.objects.create(user=test_user_2, article=article_1, value=1)
+        # counters drift, when they are changed bypassing Reaction model
+        Article.objects.filter(title='Something1').update(likes=7, dislikes=3)
+
+    def test_command_repairs_drifted_counters(self):
+        out = StringIO()
+        call_command('recount_reactions', batch_size=1, stdout=out)
+        article = Article.objects.get(title='Something1')
+        self.assertEqual(article.likes, 1)
+        self.assertEqual(article.dislikes, 0)
+        self.assertIn('Checked 2 articles, repaired 1', out.getvalue())
+
+    def test_dry_run_does_not_change_counters(self):
+        out = StringIO()
+        call_command('recount_reactions', dry_run=True, stdout=out)
+        article = Article.objects.get(title='Something1')
+        self.assertEqual(article.likes, 7)
+        self.assertIn('1 have wrong counters', out.getvalue())
+
+
+class RebuildTagCloudCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user = CustomUser.objects.create_user(username='User1',
+                                                   password='34somepassword34',
+                                                   email='user1@gmail.com')
+
+        article = Article.objects.\
+            create(title='Something1',
+                   content='Cool content 1',
+                   author=test_user,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+        article.tags.add('music', 'sport')
+        TagCloud.objects.filter(tag__name='music').update(articles_count=5)
+
+    def test_command_rebuilds_tag_cloud(self):
+        out = StringIO()
+        call_command('rebuild_tag_cloud', stdout=out)
+        self.assertEqual(
+            TagCloud.objects.get(tag__name='music').articles_count, 1)
+        self.assertIn('2 tags are in use', out.getvalue())
+
+
+class RebuildAuthorStatsCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user = CustomUser.objects.create_user(username='User1',
+                                                   password='34somepassword34',
+                                                   email='user1@gmail.com')
+
+        Article.objects.\
+            create(title='Something1',
+                   content='Cool content 1',
+                   author=test_user,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name,
+                   times_read=7)
+        AuthorStats.objects.filter(user=test_user).update(reads=100)
+
+    def test_command_rebuilds_stats(self):
+        out = StringIO()
+        call_command('rebuild_author_stats', stdout=out)
+        self.assertEqual(
+            AuthorStats.objects.get(user__username='User1').reads, 7)
+        self.assertIn('Statistics of 1 users rebuilt', out.getvalue())
+
+
+class RemoveDuplicatesCommandTest(TransactionTestCase):
+    def setUp(self):
+        # duplicates can only be made in databases
+        # the unique constraints were not applied to yet
+        self.migrate(('core', '0015_job'))
+        # historical models send no signals, so nothing touches
+        # tables made by later migrations, counters are set by hand
+        apps = MigrationLoader(connection).project_state(('core', '0015_job')).apps
+        user_model = apps.get_model('users', 'CustomUser')
+        self.user = user_model.objects.create(username='User1', email='user1@gmail.com')
+        self.author = user_model.objects.create(username='User2', email='user2@gmail.com')
+        self.article = apps.get_model('core', 'Article').objects.\
+            create(title='Something1',
+                   content='Cool content 1',
+                   author=self.author,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name,
+                   likes=1, dislikes=1)
+        apps.get_model('core', 'AuthorStats').objects.\
+            create(user=self.author, articles=1, likes=1, subscribers=3)
+        for value in (-1, 1):
+            apps.get_model('core', 'Reaction').objects.\
+                create(user=self.user, article=self.article, value=value)
+        for _ in range(3):
+            apps.get_model('core', 'Subscription').objects.\
+                create(subscriber=self.user, subscribe_to=self.author)
+
+    def tearDown(self):
+        self.migrate(*MigrationLoader(connection).graph.leaf_nodes())
+
+    def migrate(self, *targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(list(targets))
+
+    def assertDuplicatesRemoved(self):
+        self.assertEqual(list(Reaction.objects.values_list('value', flat=True)), [1])
+        self.assertEqual(Subscription.objects.count(), 1)
+        article = Article.objects.get(id=self.article.id)
+        self.assertEqual((article.likes, article.dislikes), (1, 0))
+        stats = AuthorStats.objects.get(user_id=self.author.id)
+        self.assertEqual((stats.likes, stats.subscribers), (1, 1))
+
+    def test_command_keeps_latest_reaction_and_one_subscription(self):
+        out = StringIO()
+        call_command('remove_duplicates', stdout=out)
+        self.assertDuplicatesRemoved()
+        self.assertIn('1 duplicated reactions removed', out.getvalue())
+        self.assertIn('2 duplicated subscriptions removed', out.getvalue())
+
+    def test_migration_removes_duplicates(self):
+        self.migrate(('core', '0016_reaction_subscription_constraints'))
+        self.assertDuplicatesRemoved()
+
+    def test_dry_run_only_counts_duplicates(self):
+        out = StringIO()
+        call_command('remove_duplicates', '--dry-run', stdout=out)
+        self.assertEqual(Reaction.objects.count(), 2)
+        self.assertIn('2 duplicated subscriptions found', out.getvalue())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SeedLoadDataCommandTest(TestCase):
+    def seed(self, seed=0):
+        call_command('seed_load_data', '--users', '30', '--articles', '100',
+                     '--tags', '10', '--reactions', '500', '--comments', '100',
+                     '--readings', '300', '--subscriptions', '50', '--favorites', '100',
+                     '--seed', str(seed), '--batch-size', '70', stdout=StringIO())
+
+    def test_command_creates_rows(self):
+        self.seed()
+        self.assertEqual(CustomUser.objects.count(), 30)
+        self.assertEqual(Article.objects.count(), 100)
+        self.assertEqual(Reaction.objects.count(), 500)
+        self.assertEqual(FavoriteArticles.articles.through.objects.count(), 100)
+        self.assertTrue(Subscription.objects.exists())
+        self.assertTrue(UserReading.objects.exists())
+
+    def test_counters_match_generated_rows(self):
+        self.seed()
+        out = StringIO()
+        call_command('recount_reactions', '--dry-run', stdout=out)
+        self.assertIn('0 have wrong counters', out.getvalue())
+        author = Article.objects.values('author').annotate(number=Count('id')).\
+            order_by('-number').first()
+        self.assertEqual(AuthorStats.objects.get(user=author['author']).articles,
+                         author['number'])
+
+    def test_popularity_is_skewed(self):
+        self.seed()
+        counts = list(Reaction.objects.values('article').annotate(number=Count('id')).
+                      order_by('-number').values_list('number', flat=True))
+        # the most popular article gets many times more than the median one
+        self.assertGreater(counts[0], 5 * counts[len(counts) // 2])
+
+    def test_same_seed_generates_same_data(self):
+        def get_data():
+            # ids differ between runs, rows are compared by
+            # position of users, articles and tags they point to
+            users = {pk: n for n, pk in enumerate(
+                CustomUser.objects.order_by('id').values_list('id', flat=True))}
+            articles = {pk: n for n, pk in enumerate(
+                Article.objects.order_by('id').values_list('id', flat=True))}
+            tags = {pk: n for n, pk in enumerate(
+                Tag.objects.order_by('id').values_list('id', flat=True))}
+            return {
+                'articles': [(title, times_read, users[author_id])
+                             for title, times_read, author_id in Article.objects.
+                             order_by('id').values_list('title', 'times_read', 'author_id')],
+                'tags': sorted((articles[object_id], tags[tag_id])
+                               for object_id, tag_id in TaggedItem.objects.
+                               values_list('object_id', 'tag_id')),
+                'reactions': sorted((users[user_id], articles[article_id], value)
+                                    for user_id, article_id, value in Reaction.objects.
+                                    values_list('user_id', 'article_id', 'value')),
+                'subscriptions': sorted((users[subscriber_id], users[author_id])
+                                        for subscriber_id, author_id in Subscription.objects.
+                                        values_list('subscriber_id', 'subscribe_to_id')),
+            }
+
+        self.seed(seed=7)
+        first = get_data()
+        CustomUser.objects.all().delete()
+        Tag.objects.all().delete()
+        self.seed(seed=7)
+        self.assertEqual(get_data(), first)
+
+    def test_every_article_has_image_of_its_own(self):
+        self.seed()
+        images = list(Article.objects.values_list('image', flat=True))
+        self.assertEqual(len(set(images)), len(images))
+        article, other = Article.objects.order_by('id')[:2]
+        article.image.delete(save=False)
+        self.assertTrue(other.image.storage.exists(other.image.name))
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0, MEDIA_ROOT=tempfile.mkdtemp())
+class LoadTestCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        call_command('seed_load_data', '--users', '10', '--articles', '30',
+                     '--tags', '5', '--reactions', '50', '--comments', '20',
+                     '--readings', '20', '--subscriptions', '10', '--favorites', '10',
+                     stdout=StringIO())
+
+    def run_load_test(self, *args):
+        out = StringIO()
+        call_command('load_test', '--concurrency', '1', '--iterations', '6',
+                     *args, stdout=out)
+        return out.getvalue()
+
+    def test_results_are_written_as_json(self):
+        results = json.loads(self.run_load_test('--output', '-', '--label', '1.2.0'))
+        self.assertEqual(results['label'], '1.2.0')
+        self.assertEqual(results['total']['journeys'], 6)
+        self.assertEqual(results['total']['errors'], 0)
+        detail = results['endpoints']['public:article-detail']
+        self.assertGreater(detail['requests'], 0)
+        self.assertLessEqual(detail['p50_ms'], detail['p95_ms'])
+        self.assertLessEqual(detail['p95_ms'], detail['p99_ms'])
+
+    def test_journeys_of_scenario_write(self):
+        comments = Comment.objects.count()
+        results = json.loads(self.run_load_test('--scenario', 'participate', '--output', '-'))
+        self.assertEqual(results['scenarios'], ['participate'])
+        self.assertEqual(Comment.objects.count(), comments + 6)
+        self.assertEqual(results['endpoints']['public:like-article (post)']['errors'], 0)
+        self.assertEqual(results['endpoints']['public:article-detail (post)']['errors'], 0)
+
+    def test_table_is_written_without_output(self):
+        self.assertIn('6 journeys in', self.run_load_test())
+
+    def test_empty_database_is_reported(self):
+        Article.objects.all().delete()
+        with self.assertRaises(CommandError):
+            self.run_load_test()
+
+
+class GenerateRenditionsCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user = CustomUser.objects.create_user(username='User1',
+                                                   password='34somepassword34',
+                                                   email='user1@gmail.com')
+
+        Article.objects.\
+            create(title='Something1',
+                   content='Cool content 1',
+                   author=test_user,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+
+    def test_command_skips_missing_images(self):
+        out = StringIO()
+        call_command('generate_renditions', stdout=out)
+        self.assertIn('0 renditions of 1 images generated', out.getvalue())
+
+
+class RunWorkerCommandTest(TestCase):
+    def test_command_runs_due_jobs_and_exits(self):
+        Job.objects.enqueue('delete_renditions', {'name': 'core/images/missing.jpg'})
+        out = StringIO()
+        call_command('run_worker', '--once', stdout=out)
+        self.assertFalse(Job.objects.exists())
+        self.assertIn('1 jobs run', out.getvalue())
+
+
+class BuildRecommendationsCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user_1 = CustomUser.objects.create_user(username='User1',
+                                                     password='34somepassword34',
+                                                     email='user1@gmail.com')
+        test_user_2 = CustomUser.objects.create_user(username='User2',
+                                                     password='34somepassword34',
+                                                     email='user2@gmail.com')
+        test_user_3 = CustomUser.objects.create_user(username='User3',
+                                                     password='34somepassword34',
+                                                     email='user3@gmail.com')
+
+        articles = {}
+        for title, author, tags in [('Liked', test_user_1, ['music']),
+                                    ('Music', test_user_1, ['music']),
+                                    ('Sport', test_user_1, ['sport']),
+                                    ('Subscribed', test_user_3, ['news']),
+                                    ('Own', test_user_2, ['music'])]:
+            articles[title] = Article.objects.\
+                create(title=title,
+                       content='Cool content',
+                       author=author,
+                       image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+            articles[title].tags.add(*tags)
+
+        Reaction.objects.create(user=test_user_2, article=articles['Liked'],
+                                value=1)
+        Subscription.objects.create(subscriber=test_user_2,
+                                    subscribe_to=test_user_3)
+
+    def test_command_builds_recommendations_from_likes_and_subscriptions(self):
+        out = StringIO()
+        call_command('build_recommendations', batch_size=2, stdout=out)
+        recommended = list(Recommendation.objects.
+                           filter(user__username='User2').
+                           order_by('-score').
+                           values_list('article__title', flat=True))
+        # liked and own articles are not recommended,
+        # article of subscription gets the biggest score
+        self.assertEqual(recommended, ['Subscribed', 'Music'])
+        self.assertIn('for 3 users', out.getvalue())
+
+    def test_command_replaces_old_recommendations(self):
+        user = CustomUser.objects.get(username='User2')
+        Recommendation.objects.create(
+            user=user, article=Article.objects.get(title='Sport'), score=100)
+        call_command('build_recommendations', stdout=StringIO())
+        self.assertFalse(Recommendation.objects.
+                         filter(user=user, article__title='Sport').exists())
+
+
+    @mock.patch('core.recommendations.CANDIDATES_PER_TAG', 1)
+    def test_only_most_read_articles_of_tag_are_candidates(self):
+        for most_read, expected in [('Music', ['Subscribed', 'Music']),
+                                    ('Own', ['Subscribed'])]:
+            with self.subTest(most_read=most_read):
+                Article.objects.filter(title=most_read).update(times_read=100)
+                call_command('build_recommendations', stdout=StringIO())
+                recommended = list(Recommendation.objects.
+                                   filter(user__username='User2').
+                                   order_by('-score').
+                                   values_list('article__title', flat=True))
+                self.assertEqual(recommended, expected)
+                Article.objects.filter(title=most_read).update(times_read=0)
+
+
+class UpdateTrendingCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user_1 = CustomUser.objects.create_user(username='User1',
+                                                     password='34somepassword34',
+                                                     email='user1@gmail.com')
+        test_user_2 = CustomUser.objects.create_user(username='User2',
+                                                     password='34somepassword34',
+                                                     email='user2@gmail.com')
+
+        article_1 = Article.objects.\
+            create(title='Something1',
+                   content='Cool content 1',
+                   author=test_user_1,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+        article_2 = Article.objects.\
+            create(title='Something2',
+                   content='Cool content 2',
+                   author=test_user_1,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+
+        now = timezone.now()
+        UserReading.objects.create(user=test_user_2, article=article_1,
+                                   date_read=now - timedelta(hours=1))
+        Reaction.objects.create(user=test_user_2, article=article_2, value=1)
+        # events younger than lag of updater are left for the next run
+        Reaction.objects.update(reaction_date=now - timedelta(minutes=30))
+        # old reading weighs less than a fresh one
+        UserReading.objects.create(user=test_user_2, article=article_2,
+                                   date_read=now - timedelta(days=3))
+
+    def test_command_computes_scores(self):
+        out = StringIO()
+        call_command('update_trending', stdout=out)
+        self.assertIn('updated for 2 articles', out.getvalue())
+        titles = [a.title for a in Article.objects.trending()]
+        self.assertEqual(titles, ['Something2', 'Something1'])
+
+    def test_scores_decay_between_runs(self):
+        updater = TrendingUpdater(half_life=timedelta(hours=24))
+        now = timezone.now()
+        updater.update(now)
+        score = TrendingScore.objects.get(article__title='Something1').score
+        updater.update(now + timedelta(hours=24))
+        new_score = TrendingScore.objects.get(article__title='Something1').score
+        self.assertAlmostEqual(new_score, score / 2)
+
+    def test_events_counted_once(self):
+        updater = TrendingUpdater(half_life=timedelta(hours=24))
+        now = timezone.now()
+        updater.update(now)
+        score = TrendingScore.objects.get(article__title='Something1').score
+        self.assertEqual(updater.update(now), 0)
+        self.assertAlmostEqual(
+            TrendingScore.objects.get(article__title='Something1').score, score)
+
+    def test_events_not_counted_again_after_scores_removed(self):
+        updater = TrendingUpdater(half_life=timedelta(hours=24))
+        now = timezone.now()
+        updater.update(now)
+        TrendingScore.objects.all().delete()
+        self.assertEqual(updater.update(now + timedelta(minutes=1)), 0)
+        self.assertFalse(TrendingScore.objects.exists())
+
+    def test_event_committed_late_with_older_date_counted(self):
+        updater = TrendingUpdater(half_life=timedelta(hours=24))
+        now = timezone.now()
+        updater.update(now)
+        article = Article.objects.get(title='Something1')
+        UserReading.objects.create(user=CustomUser.objects.get(username='User1'),
+                                   article=article, date_read=now - timedelta(minutes=5))
+        score = TrendingScore.objects.get(article=article).score
+        self.assertEqual(updater.update(now + timedelta(minutes=1)), 1)
+        self.assertGreater(TrendingScore.objects.get(article=article).score, score)
+        self.assertEqual(TrendingState.objects.get().last_reading_id,
+                         UserReading.objects.latest('id').id)
+
+    def test_events_younger_than_lag_left_for_next_run(self):
+        updater = TrendingUpdater(half_life=timedelta(hours=24),
+                                  lag=timedelta(minutes=5))
+        now = timezone.now()
+        updater.update(now)
+        state = TrendingState.objects.get()
+        article = Article.objects.get(title='Something1')
+        UserReading.objects.create(user=CustomUser.objects.get(username='User1'),
+                                   article=article, date_read=now)
+        # reading with a lower id may still be uncommitted,
+        # so neither this one nor its id is taken yet
+        self.assertEqual(updater.update(now + timedelta(minutes=1)), 0)
+        self.assertEqual(TrendingState.objects.get().last_reading_id,
+                         state.last_reading_id)
+        self.assertEqual(updater.update(now + timedelta(minutes=6)), 1)
+
+
+class RebuildSearchIndexCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user = CustomUser.objects.create_user(username='User1',
+                                                   password='34somepassword34',
+                                                   email='user1@gmail.com')
+
+        for number in range(1, 4):
+            Article.objects.\
+                create(title=f'Something{number}',
+                       content=f'Cool content {number}',
+                       author=test_user,
+                       image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+        SearchTerm.objects.all().delete()
+
+    def test_command_indexes_all_articles(self):
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=2, stdout=out)
+        self.assertIn('Indexed 3 articles', out.getvalue())
+        self.assertEqual(SearchTerm.objects.
+                         filter(term='something2').count(), 1)
@@ -0,0 +1,177 @@
+import tempfile
+import threading
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.db.pool import ConnectionPool, PoolTimeout
+from core.db.routers import PIN_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware
+from core.models import Article, Comment
+from users.models import CustomUser
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+
+    def ping(self):
+        if not self.healthy:
+            raise OSError('Lost connection')
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def get_pool(self, **options):
+        return ConnectionPool(create=FakeConnection, check=FakeConnection.ping,
+                              close=FakeConnection.close, **options)
+
+    def test_released_connection_is_reused(self):
+        pool = self.get_pool()
+        connection = pool.acquire()
+        pool.release(connection)
+        self.assertIs(pool.acquire(), connection)
+        stats = pool.get_stats()
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['reused'], 1)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_unusable_connection_is_closed(self):
+        pool = self.get_pool()
+        connection = pool.acquire()
+        pool.release(connection, reusable=False)
+        self.assertTrue(connection.closed)
+        self.assertIsNot(pool.acquire(), connection)
+
+    def test_idle_connection_is_checked(self):
+        pool = self.get_pool(health_check_interval=0)
+        connection = pool.acquire()
+        connection.healthy = False
+        pool.release(connection)
+        self.assertIsNot(pool.acquire(), connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.get_stats()['discarded'], 1)
+
+    def test_old_connection_is_closed(self):
+        pool = self.get_pool(max_age=0)
+        connection = pool.acquire()
+        pool.release(connection)
+        self.assertIsNot(pool.acquire(), connection)
+        self.assertTrue(connection.closed)
+
+    def test_full_pool_times_out(self):
+        pool = self.get_pool(max_size=1, timeout=0.01)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        stats = pool.get_stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['wait_time_max'], 0)
+
+    def test_waiting_thread_gets_released_connection(self):
+        pool = self.get_pool(max_size=1, timeout=5)
+        connection = pool.acquire()
+        timer = threading.Timer(0.01, pool.release, [connection])
+        timer.start()
+        self.assertIs(pool.acquire(), connection)
+        timer.join()
+        self.assertEqual(pool.get_stats()['waits'], 1)
+
+    def test_failed_connect_frees_place(self):
+        pool = ConnectionPool(create=mock.Mock(side_effect=OSError), check=FakeConnection.ping,
+                              close=FakeConnection.close, max_size=1)
+        with self.assertRaises(OSError):
+            pool.acquire()
+        self.assertEqual(pool.get_stats()['in_use'], 0)
+
+    def test_forked_process_does_not_reuse_connections(self):
+        pool = self.get_pool()
+        connection = pool.acquire()
+        pool.release(connection)
+        with mock.patch('core.db.pool.os.getpid', return_value=-1):
+            self.assertIsNot(pool.acquire(), connection)
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRouterTest(SimpleTestCase):
+    def route(self, method, cookies=None, write=False):
+        router = ReplicaRouter()
+
+        def view(request):
+            if write:
+                router.db_for_write(Article)
+            return HttpResponse(router.db_for_read(Article))
+
+        request = RequestFactory().generic(method, '/')
+        request.COOKIES.update(cookies or {})
+        return ReplicaRoutingMiddleware(view)(request)
+
+    def test_reads_of_get_requests_go_to_replica(self):
+        self.assertEqual(self.route('GET').content, b'replica')
+        self.assertEqual(self.route('POST').content, b'default')
+
+    def test_reads_after_write_go_to_default(self):
+        response = self.route('GET', write=True)
+        self.assertEqual(response.content, b'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_write_pins_user_to_default(self):
+        response = self.route('POST', write=True)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], settings.REPLICA_PIN_SECONDS)
+        self.assertEqual(self.route('GET', cookies={PIN_COOKIE: '1'}).content, b'default')
+
+    def test_reads_outside_requests_go_to_default(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Article), 'default')
+
+    def test_sessions_are_read_from_default(self):
+        from django.contrib.sessions.models import Session
+
+        router = ReplicaRouter()
+
+        def view(request):
+            return HttpResponse(router.db_for_read(Session))
+
+        response = ReplicaRoutingMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(response.content, b'default')
+
+
+# needs settings with a second database named 'replica', e.g. another
+# SQLite file, which is not a test mirror of default database
+@skipUnless('replica' in settings.DATABASES, 'No replica database is configured')
+@override_settings(REPLICA_DATABASES=['replica'], PAGE_CACHE_TIMEOUT=0)
+class ReplicaDatabaseTest(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        # replica lags behind, so its article has another title
+        for database, title in (('default', 'Primary title'), ('replica', 'Replica title')):
+            user = CustomUser.objects.db_manager(database).\
+                create_user(username='User1', password='34somepassword34')
+            cls.article = Article.objects.using(database).\
+                create(title=title,
+                       content='Cool content 1',
+                       author=user,
+                       image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+
+    def get_article_page(self):
+        return self.client.get(reverse('public:article-detail',
+                                       kwargs={'pk': self.article.id}))
+
+    def test_pages_are_read_from_replica(self):
+        response = self.get_article_page()
+        self.assertEqual(response.context['article'].title, 'Replica title')
+
+    def test_user_reads_from_default_after_comment(self):
+        self.client.login(username='User1', password='34somepassword34')
+        self.client.post(reverse('public:comment-article',
+                                 kwargs={'pk': self.article.id}),
+                         {'content': 'New comment'})
+        response = self.get_article_page()
+        self.assertEqual(response.context['article'].title, 'Primary title')
+        self.assertEqual(Comment.objects.using('replica').count(), 0)
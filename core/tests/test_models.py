@@ -1,6 +1,21 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
 
-from core.models import Subscription
+from core.counters import ReadCounterBuffer
+from core.jobs import handler, run_pending_jobs
+from core.renditions import delete_renditions, get_rendition_name, get_rendition_url
+from core.models import validate_image, Article, AuthorStats, FavoriteArticles, Job, PageVersion, Reaction, Subscription, TagCloud, UserReading
 from users.models import CustomUser
 
 
@@ -26,3 +41,634 @@ class SubscriptionModelTest(TestCase):
         sub_obj = Subscription.objects.get(subscribe_to__username='User1')
         field_label = sub_obj._meta.get_field('subscriber').verbose_name
         self.assertEqual(field_label, 'subscriber')
+
+
+class ReactionCountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user_1 = CustomUser.objects.create_user(username='User1',
+                                                     password='34somepassword34',
+                                                     email='user1@gmail.com')
+        test_user_2 = CustomUser.objects.create_user(username='User2',
+                                                     password='34somepassword34',
+                                                     email='user2@gmail.com')
+        test_user_3 = CustomUser.objects.create_user(username='User3',
+                                                     password='34somepassword34',
+                                                     email='user3@gmail.com')
+
+        article = Article.objects.\
+            create(title='Something1',
+                   content='Cool content 1',
+                   author=test_user_1,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+
+        Reaction.objects.create(user=test_user_2, article=article, value=1)
+        Reaction.objects.create(user=test_user_3, article=article, value=-1)
+
+    def get_article(self):
+        return Article.objects.get(title='Something1')
+
+    def test_counters_increased_when_reactions_created(self):
+        article = self.get_article()
+        self.assertEqual(article.likes, 1)
+        self.assertEqual(article.dislikes, 1)
+
+    def test_counters_moved_when_reaction_value_changed(self):
+        reaction = Reaction.objects.get(user__username='User2')
+        reaction.value = -1
+        reaction.save()
+        article = self.get_article()
+        self.assertEqual(article.likes, 0)
+        self.assertEqual(article.dislikes, 2)
+
+    def test_counters_not_changed_when_reaction_saved_without_changes(self):
+        reaction = Reaction.objects.get(user__username='User2')
+        reaction.save()
+        article = self.get_article()
+        self.assertEqual(article.likes, 1)
+        self.assertEqual(article.dislikes, 1)
+
+    def test_counters_decreased_when_reaction_deleted(self):
+        Reaction.objects.get(user__username='User2').delete()
+        article = self.get_article()
+        self.assertEqual(article.likes, 0)
+        self.assertEqual(article.dislikes, 1)
+
+    def test_counters_decreased_once_when_reaction_deleted_twice(self):
+        first = Reaction.objects.get(user__username='User2')
+        second = Reaction.objects.get(user__username='User2')
+        self.assertEqual(first.delete()[0], 1)
+        self.assertEqual(second.delete(), (0, {}))
+        article = self.get_article()
+        self.assertEqual((article.likes, article.dislikes), (0, 1))
+        self.assertEqual(AuthorStats.objects.get(user=article.author).likes, 0)
+
+    def test_counters_decreased_when_queryset_deleted(self):
+        Reaction.objects.all().delete()
+        article = self.get_article()
+        self.assertEqual(article.likes, 0)
+        self.assertEqual(article.dislikes, 0)
+
+    def test_pages_of_article_purged_when_queryset_deleted(self):
+        tag = f'article:{self.get_article().id}'
+        version = PageVersion.objects.get_versions([tag])
+        self.assertEqual(Reaction.objects.all().delete(), (2, {'core.Reaction': 2}))
+        self.assertNotEqual(PageVersion.objects.get_versions([tag]), version)
+
+    def test_counters_decreased_when_user_deleted(self):
+        CustomUser.objects.get(username='User3').delete()
+        article = self.get_article()
+        self.assertEqual(article.likes, 1)
+        self.assertEqual(article.dislikes, 0)
+
+    def test_deleting_article_costs_the_same_for_any_number_of_reactions(self):
+        def count_queries(article):
+            with CaptureQueriesContext(connection) as queries:
+                article.delete()
+            return len(queries)
+
+        author = CustomUser.objects.get(username='User1')
+        article = Article.objects.create(title='Something2', content='Cool content 2',
+                                         author=author, image=self.get_article().image)
+        users = CustomUser.objects.bulk_create(
+            CustomUser(username=f'Reader{number}', email=f'reader{number}@gmail.com')
+            for number in range(50))
+        Reaction.objects.bulk_create(Reaction(user=user, article=article, value=1)
+                                     for user in users)
+        # reactions of deleted article are removed by one DELETE,
+        # its pages are purged once by pre_delete signal of article
+        self.assertEqual(count_queries(article), count_queries(self.get_article()))
+
+
+class ReadCounterBufferTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user = CustomUser.objects.create_user(username='User1',
+                                                   password='34somepassword34',
+                                                   email='user1@gmail.com')
+
+        for number in range(1, 4):
+            Article.objects.\
+                create(title=f'Something{number}',
+                       content=f'Cool content {number}',
+                       author=test_user,
+                       image=tempfile.NamedTemporaryFile(suffix=".jpg").name,
+                       times_read=10)
+
+    @override_settings(READ_COUNTER_FLUSH_INTERVAL=60)
+    def test_reads_are_not_written_before_flush(self):
+        buffer = ReadCounterBuffer()
+        article = Article.objects.get(title='Something1')
+        buffer.add(article.id)
+        buffer.add(article.id)
+        self.assertEqual(buffer.pending(article.id), 2)
+        article.refresh_from_db()
+        self.assertEqual(article.times_read, 10)
+
+    @override_settings(READ_COUNTER_FLUSH_INTERVAL=60)
+    def test_flush_writes_increments_in_batches(self):
+        buffer = ReadCounterBuffer()
+        articles = list(Article.objects.order_by('title'))
+        buffer.add(articles[0].id)
+        buffer.add(articles[1].id)
+        buffer.add(articles[2].id, amount=3)
+        # savepoint, one UPDATE for articles read once and one for
+        # article read 3 times, authors of articles and one UPDATE
+        # of their statistics, release of savepoint
+        with self.assertNumQueries(6):
+            self.assertEqual(buffer.flush(), 3)
+        times_read = [a.times_read for a in Article.objects.order_by('title')]
+        self.assertEqual(times_read, [11, 11, 13])
+        self.assertEqual(AuthorStats.objects.get(user=articles[0].author).reads,
+                         sum(times_read))
+        self.assertEqual(buffer.pending(articles[0].id), 0)
+
+    @override_settings(READ_COUNTER_FLUSH_INTERVAL=60)
+    def test_failed_flush_does_not_count_reads_twice(self):
+        buffer = ReadCounterBuffer()
+        article = Article.objects.get(title='Something1')
+        buffer.add(article.id, amount=2)
+        # articles are updated, then update of authors fails
+        with mock.patch.object(buffer, 'flush_authors', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                buffer.flush()
+        article.refresh_from_db()
+        self.assertEqual(article.times_read, 10)
+        self.assertEqual(buffer.pending(article.id), 2)
+        buffer.flush()
+        article.refresh_from_db()
+        self.assertEqual(article.times_read, 12)
+        self.assertEqual(buffer.pending(article.id), 0)
+
+    @override_settings(READ_COUNTER_FLUSH_INTERVAL=60)
+    def test_flush_inside_transaction_of_caller_is_refused(self):
+        buffer = ReadCounterBuffer()
+        article = Article.objects.get(title='Something1')
+        buffer.add(article.id)
+        with transaction.atomic():
+            with self.assertRaises(RuntimeError):
+                buffer.flush()
+        self.assertEqual(buffer.pending(article.id), 1)
+        self.assertEqual(Article.objects.get(id=article.id).times_read, 10)
+
+    @override_settings(READ_COUNTER_FLUSH_INTERVAL=0)
+    def test_failed_flush_started_by_read_is_logged(self):
+        buffer = ReadCounterBuffer()
+        article = Article.objects.get(title='Something1')
+        with mock.patch.object(buffer, 'flush_authors', side_effect=DatabaseError):
+            with self.assertLogs('core.counters', 'ERROR'):
+                buffer.add(article.id)
+        self.assertEqual(buffer.pending(article.id), 1)
+
+    @override_settings(READ_COUNTER_FLUSH_INTERVAL=60, READ_COUNTER_MAX_PENDING=2)
+    def test_buffer_flushed_when_too_many_articles_pending(self):
+        buffer = ReadCounterBuffer()
+        articles = list(Article.objects.order_by('title'))
+        buffer.add(articles[0].id)
+        buffer.add(articles[1].id)
+        self.assertEqual(buffer.pending(articles[0].id), 0)
+        self.assertEqual(Article.objects.get(
+            id=articles[0].id).times_read, 11)
+
+    @override_settings(READ_COUNTER_FLUSH_INTERVAL=0)
+    def test_buffer_flushed_when_interval_passed(self):
+        buffer = ReadCounterBuffer()
+        article = Article.objects.get(title='Something1')
+        buffer.add(article.id)
+        article.refresh_from_db()
+        self.assertEqual(article.times_read, 11)
+
+
+class FavoriteArticlesModelTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user = CustomUser.objects.create_user(username='User1',
+                                                   password='34somepassword34',
+                                                   email='user1@gmail.com')
+
+        article_1 = Article.objects.\
+            create(title='Something1',
+                   content='Cool content 1',
+                   author=test_user,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+        Article.objects.\
+            create(title='Something2',
+                   content='Cool content 2',
+                   author=test_user,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+
+        fav_obj = FavoriteArticles.objects.create(user=test_user)
+        fav_obj.articles.add(article_1)
+
+    def test_has_article_uses_single_query(self):
+        fav_obj = FavoriteArticles.objects.get(user__username='User1')
+        article_1 = Article.objects.get(title='Something1')
+        article_2 = Article.objects.get(title='Something2')
+        with self.assertNumQueries(1):
+            self.assertTrue(fav_obj.has_article(article_1))
+        self.assertFalse(fav_obj.has_article(article_2))
+
+    def test_remove_article(self):
+        fav_obj = FavoriteArticles.objects.get(user__username='User1')
+        article_1 = Article.objects.get(title='Something1')
+        article_2 = Article.objects.get(title='Something2')
+        self.assertFalse(fav_obj.remove_article(article_2))
+        with self.assertNumQueries(1):
+            self.assertTrue(fav_obj.remove_article(article_1))
+        self.assertFalse(fav_obj.has_article(article_1))
+
+    def test_add_article_twice_keeps_one_row(self):
+        fav_obj = FavoriteArticles.objects.get(user__username='User1')
+        article_2 = Article.objects.get(title='Something2')
+        fav_obj.add_article(article_2)
+        fav_obj.add_article(article_2)
+        self.assertEqual(fav_obj.articles.filter(id=article_2.id).count(), 1)
+
+    def test_toggle_article(self):
+        fav_obj = FavoriteArticles.objects.get(user__username='User1')
+        article_1 = Article.objects.get(title='Something1')
+        self.assertFalse(fav_obj.toggle_article(article_1))
+        self.assertFalse(fav_obj.has_article(article_1))
+        self.assertTrue(fav_obj.toggle_article(article_1))
+        self.assertTrue(fav_obj.has_article(article_1))
+
+
+class UserReadingModelTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user = CustomUser.objects.create_user(username='User1',
+                                                   password='34somepassword34',
+                                                   email='user1@gmail.com')
+
+        Article.objects.\
+            create(title='Something1',
+                   content='Cool content 1',
+                   author=test_user,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+
+    def test_day_is_set_from_date_read(self):
+        user = CustomUser.objects.get(username='User1')
+        article = Article.objects.get(title='Something1')
+        date_read = timezone.now()
+        reading = UserReading.objects.create(user=user, article=article,
+                                             date_read=date_read)
+        self.assertEqual(reading.day, date_read.date())
+
+    def test_record_is_single_query(self):
+        user = CustomUser.objects.get(username='User1')
+        article = Article.objects.get(title='Something1')
+        with self.assertNumQueries(1):
+            UserReading.objects.record(user, article)
+        self.assertEqual(UserReading.objects.count(), 1)
+
+    def test_repeated_reading_on_the_same_day_updates_existing_row(self):
+        user = CustomUser.objects.get(username='User1')
+        article = Article.objects.get(title='Something1')
+        now = timezone.now().replace(hour=12)
+        UserReading.objects.record(user, article, now - timedelta(hours=1))
+        UserReading.objects.record(user, article, now)
+        readings = UserReading.objects.filter(user=user, article=article)
+        self.assertEqual(readings.count(), 1)
+        self.assertEqual(readings.first().date_read, now)
+
+    def test_reading_on_another_day_creates_new_row(self):
+        user = CustomUser.objects.get(username='User1')
+        article = Article.objects.get(title='Something1')
+        now = timezone.now()
+        UserReading.objects.record(user, article, now - timedelta(days=1))
+        UserReading.objects.record(user, article, now)
+        self.assertEqual(UserReading.objects.filter(
+            user=user, article=article).count(), 2)
+
+
+class TagCloudModelTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user = CustomUser.objects.create_user(username='User1',
+                                                   password='34somepassword34',
+                                                   email='user1@gmail.com')
+
+        article_1 = Article.objects.\
+            create(title='Something1',
+                   content='Cool content 1',
+                   author=test_user,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+        article_2 = Article.objects.\
+            create(title='Something2',
+                   content='Cool content 2',
+                   author=test_user,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+
+        article_1.tags.add('music', 'sport')
+        article_2.tags.add('music')
+
+    def get_counts(self):
+        return dict(TagCloud.objects.values_list('tag__name', 'articles_count'))
+
+    def test_counts_increased_when_tags_added(self):
+        self.assertEqual(self.get_counts(), {'music': 2, 'sport': 1})
+
+    def test_counts_decreased_when_tags_removed(self):
+        article = Article.objects.get(title='Something1')
+        article.tags.remove('music')
+        self.assertEqual(self.get_counts(), {'music': 1, 'sport': 1})
+
+    def test_unused_tags_disappear_when_tags_cleared(self):
+        article = Article.objects.get(title='Something1')
+        article.tags.clear()
+        self.assertEqual(self.get_counts(), {'music': 1})
+
+    def test_counts_decreased_when_tags_set(self):
+        article = Article.objects.get(title='Something1')
+        article.tags.set(['sport', 'news'])
+        self.assertEqual(self.get_counts(),
+                         {'music': 1, 'sport': 1, 'news': 1})
+
+    def test_counts_decreased_when_article_deleted(self):
+        Article.objects.get(title='Something2').delete()
+        self.assertEqual(self.get_counts(), {'music': 1, 'sport': 1})
+
+    def test_rebuild(self):
+        TagCloud.objects.all().delete()
+        self.assertEqual(TagCloud.objects.rebuild(), 2)
+        self.assertEqual(self.get_counts(), {'music': 2, 'sport': 1})
+
+
+class AuthorStatsModelTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user_1 = CustomUser.objects.create_user(username='User1',
+                                                     password='34somepassword34',
+                                                     email='user1@gmail.com')
+        test_user_2 = CustomUser.objects.create_user(username='User2',
+                                                     password='34somepassword34',
+                                                     email='user2@gmail.com')
+
+        Article.objects.\
+            create(title='Something1',
+                   content='Cool content 1',
+                   author=test_user_1,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name,
+                   times_read=10)
+        Article.objects.\
+            create(title='Something2',
+                   content='Cool content 2',
+                   author=test_user_1,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name,
+                   times_read=5)
+
+        Subscription.objects.create(subscriber=test_user_2,
+                                    subscribe_to=test_user_1)
+
+    def get_stats(self):
+        stats = AuthorStats.objects.get(user__username='User1')
+        return stats.articles, stats.reads, stats.likes, stats.subscribers
+
+    def test_stats_counted_when_objects_created(self):
+        self.assertEqual(self.get_stats(), (2, 15, 0, 1))
+
+    def test_stats_changed_by_reactions(self):
+        user = CustomUser.objects.get(username='User2')
+        article = Article.objects.get(title='Something1')
+        reaction = Reaction.objects.create(user=user, article=article, value=1)
+        self.assertEqual(self.get_stats(), (2, 15, 1, 1))
+        reaction.delete()
+        self.assertEqual(self.get_stats(), (2, 15, 0, 1))
+
+    def test_stats_changed_when_article_saved(self):
+        article = Article.objects.get(title='Something1')
+        article.times_read = 20
+        article.save()
+        self.assertEqual(self.get_stats(), (2, 25, 0, 1))
+
+    def test_stats_decreased_when_objects_deleted(self):
+        Article.objects.get(title='Something1').delete()
+        Subscription.objects.all().delete()
+        self.assertEqual(self.get_stats(), (1, 5, 0, 0))
+
+    def test_subscribers_decreased_when_subscriber_deleted(self):
+        CustomUser.objects.get(username='User2').delete()
+        self.assertEqual(self.get_stats(), (2, 15, 0, 0))
+
+    def test_rebuild(self):
+        AuthorStats.objects.all().delete()
+        self.assertEqual(AuthorStats.objects.rebuild(), 2)
+        self.assertEqual(self.get_stats(), (2, 15, 0, 1))
+        self.assertEqual(AuthorStats.objects.get(user__username='User2').articles, 0)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(),
+                   IMAGE_RENDITIONS={'thumb': 100, 'card': 300})
+class ImageRenditionsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def get_image(self, name='photo.jpg', image_format='JPEG'):
+        content = BytesIO()
+        Image.new('RGB', (800, 400), 'red').save(content, image_format)
+        return SimpleUploadedFile(name, content.getvalue(),
+                                  content_type=f'image/{image_format.lower()}')
+
+    def create_article(self, image=None):
+        test_user = CustomUser.objects.get_or_create(username='User1',
+                                                     email='user1@gmail.com')[0]
+        return Article.objects.\
+            create(title='Something1',
+                   content='Cool content 1',
+                   author=test_user,
+                   image=image or self.get_image())
+
+    def test_renditions_generated_by_worker_after_upload(self):
+        article = self.create_article()
+        name = get_rendition_name(article.image.name, 'card')
+        self.assertFalse(article.image.storage.exists(name))
+        self.assertEqual(run_pending_jobs(), 1)
+        with article.image.storage.open(name) as rendition:
+            image = Image.open(rendition)
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (300, 150))
+        self.assertEqual(get_rendition_url(article.image, 'card'),
+                         article.image.storage.url(name))
+
+    def test_storage_not_asked_for_generated_renditions(self):
+        article = self.create_article()
+        run_pending_jobs()
+        with mock.patch.object(article.image.storage, 'exists') as exists:
+            url = get_rendition_url(article.image, 'card')
+        exists.assert_not_called()
+        self.assertEqual(url, article.image.storage.url(
+            get_rendition_name(article.image.name, 'card')))
+
+    def test_original_used_when_rendition_missing(self):
+        article = self.create_article()
+        delete_renditions(article.image.name, article.image.storage)
+        self.assertEqual(get_rendition_url(article.image, 'thumb'),
+                         article.image.url)
+
+    def test_renditions_kept_when_image_replaced_with_one_of_same_stem(self):
+        article = self.create_article(self.get_image('replaced.jpg', 'JPEG'))
+        run_pending_jobs()
+        old_name = article.image.name
+        # old image is removed after commit, its renditions are
+        # deleted by a job enqueued after the one generating new ones
+        with self.captureOnCommitCallbacks(execute=True):
+            article.image = self.get_image('replaced.png', 'PNG')
+            article.save()
+        self.assertEqual(article.image.name, 'core/images/replaced.png')
+        self.assertEqual(list(Job.objects.order_by('id').values_list('name', flat=True)),
+                         ['generate_renditions', 'delete_renditions'])
+        self.assertEqual(run_pending_jobs(), 2)
+        storage = article.image.storage
+        self.assertFalse(storage.exists(old_name))
+        self.assertFalse(storage.exists(get_rendition_name(old_name, 'card')))
+        for size_name in ('thumb', 'card'):
+            self.assertTrue(storage.exists(get_rendition_name(article.image.name, size_name)))
+
+    def test_images_with_same_name_and_other_extension_have_own_renditions(self):
+        jpeg = self.create_article(self.get_image('cat.jpg', 'JPEG'))
+        png = self.create_article(self.get_image('cat.png', 'PNG'))
+        self.assertEqual(run_pending_jobs(), 2)
+        storage = jpeg.image.storage
+        self.assertNotEqual(get_rendition_name(jpeg.image.name, 'card'),
+                            get_rendition_name(png.image.name, 'card'))
+        delete_renditions(jpeg.image.name, storage)
+        self.assertFalse(storage.exists(get_rendition_name(jpeg.image.name, 'card')))
+        self.assertTrue(storage.exists(get_rendition_name(png.image.name, 'card')))
+        self.assertEqual(get_rendition_url(png.image, 'card'),
+                         storage.url(get_rendition_name(png.image.name, 'card')))
+
+
+calls = []
+
+
+@handler('test_job')
+def run_test_job(value, fail=False):
+    calls.append(value)
+    if fail:
+        raise ValueError(value)
+
+
+@override_settings(JOB_MAX_ATTEMPTS=2)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_finished_job_deleted(self):
+        Job.objects.enqueue('test_job', {'value': 1})
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_delayed_job_not_run_before_time(self):
+        Job.objects.enqueue('test_job', {'value': 1}, delay=60)
+        self.assertEqual(run_pending_jobs(), 0)
+        self.assertEqual(calls, [])
+
+    def test_failed_job_retried_later_then_kept(self):
+        job = Job.objects.enqueue('test_job', {'value': 1, 'fail': True})
+        run_pending_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertGreater(job.run_after, timezone.now())
+        Job.objects.update(run_after=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            run_pending_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn('ValueError', job.last_error)
+
+    def test_stale_running_job_requeued(self):
+        job = Job.objects.enqueue('test_job', {'value': 1})
+        Job.objects.update(status=Job.RUNNING,
+                           started=timezone.now() - timedelta(hours=1))
+        self.assertEqual(Job.objects.requeue_stale(600, 2), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+
+    def test_stale_job_failed_after_last_attempt(self):
+        job = Job.objects.enqueue('test_job', {'value': 1})
+        Job.objects.update(status=Job.RUNNING, attempts=2,
+                           started=timezone.now() - timedelta(hours=1))
+        self.assertEqual(Job.objects.requeue_stale(600, 2), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(run_pending_jobs(), 0)
+
+
+class ValidateImageTest(TestCase):
+    def make_upload(self, size=(40, 20), image_format='PNG'):
+        content = BytesIO()
+        Image.new('RGB', size).save(content, image_format)
+        return SimpleUploadedFile('photo', content.getvalue())
+
+    def test_valid_image_accepted(self):
+        validate_image(self.make_upload())
+
+    def test_file_that_is_not_image_rejected(self):
+        with self.assertRaisesMessage(ValidationError, 'Upload a valid image'):
+            validate_image(SimpleUploadedFile('photo.png', b'not an image'))
+
+    def test_format_that_is_not_allowed_rejected(self):
+        with self.assertRaisesMessage(ValidationError, 'Allowed formats'):
+            validate_image(self.make_upload(image_format='BMP'))
+
+    @override_settings(IMAGE_MAX_PIXELS=500)
+    def test_image_with_too_many_pixels_rejected(self):
+        with self.assertRaisesMessage(ValidationError, 'Maximum number of pixels'):
+            validate_image(self.make_upload())
+
+
+class IndexUsageTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = CustomUser.objects.create_user(username='User1',
+                                                  password='34somepassword34',
+                                                  email='user1@gmail.com')
+        cls.author = CustomUser.objects.create_user(username='User2',
+                                                    password='34somepassword34',
+                                                    email='user2@gmail.com')
+        cls.article = Article.objects.\
+            create(title='Something1',
+                   content='Cool content 1',
+                   author=cls.author,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = queryset.explain()
+        self.assertTrue(any(name in plan for name in index_names), plan)
+
+    def test_reaction_of_user_uses_unique_index(self):
+        self.assertUsesIndex(
+            Reaction.objects.filter(article=self.article, user=self.user),
+            # SQLite names indexes of unique constraints itself
+            'unique_reaction', 'sqlite_autoindex_core_reaction')
+
+    def test_reactions_of_article_use_index(self):
+        self.assertUsesIndex(
+            Reaction.objects.filter(article=self.article, value=1).
+            order_by().values('article').annotate(number=Count('id')),
+            'reaction_article_value')
+
+    def test_liked_articles_of_user_use_index(self):
+        self.assertUsesIndex(
+            Reaction.objects.filter(user=self.user, value=1).order_by('-reaction_date'),
+            'reaction_user_value_date')
+
+    def test_subscription_uses_unique_index(self):
+        self.assertUsesIndex(
+            Subscription.objects.filter(subscriber=self.user, subscribe_to=self.author),
+            'unique_subscription', 'sqlite_autoindex_core_subscription')
+
+    def test_reading_history_uses_index(self):
+        self.assertUsesIndex(
+            UserReading.objects.filter(user=self.user).order_by('-date_read'),
+            'user_reading_user_date')
+
+    def test_duplicates_are_rejected(self):
+        Reaction.objects.create(user=self.user, article=self.article, value=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Reaction.objects.create(user=self.user, article=self.article, value=-1)
+        Subscription.objects.create(subscriber=self.user, subscribe_to=self.author)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Subscription.objects.create(subscriber=self.user, subscribe_to=self.author)
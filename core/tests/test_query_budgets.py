@@ -0,0 +1,200 @@
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+from taggit.models import Tag, TaggedItem
+
+from core.models import Article, AuthorStats, Comment, FavoriteArticles, Reaction, SocialMedia, \
+    Subscription, UserDescription, UserReading
+from core.tag_cloud import invalidate_tag_cloud
+from users.models import CustomUser
+
+AUTHORS = 20
+ARTICLES_PER_AUTHOR = 25
+TAGS = 30
+TAGS_PER_ARTICLE = 3
+COMMENTS = 150
+# wall time of one request, generous enough for slow CI machines,
+# but far below what a query per row of seeded data takes
+MAX_SECONDS = 2
+
+# name of URL: (method, arguments, data, whether reader is logged in, queries)
+# queries are counted with empty caches, so they are the most a request costs
+BUDGETS = {
+    'core:index': ('get', None, None, True, 5),
+    'core:become-user': ('get', None, None, False, 0),
+    'core:request-stats': ('get', None, None, True, 2),
+    'users:register': ('get', None, None, False, 0),
+    'users:login': ('get', None, None, False, 0),
+    'users:logout': ('get', None, None, True, 4),
+    'users:change-user': ('get', None, None, True, 2),
+    'public:about-page': ('get', 'author', None, True, 6),
+    'public:author-page': ('get', 'author', None, True, 5),
+    'public:article-detail': ('get', 'article', None, True, 4),
+    'public:like-article': ('post', 'article', None, True, 12),
+    'public:dislike-article': ('post', 'article', None, True, 12),
+    'public:comment-article': ('post', 'article', {'content': 'New comment'}, True, 4),
+    'public:delete-comment': ('post', 'comment', None, True, 6),
+    'public:manage-favorites': ('post', 'article', None, True, 5),
+    'public:subscription-through-detail': ('post', 'article', None, True, 10),
+    'public:subscription-through-author': ('post', 'author', None, True, 9),
+    'public:articles-tag': ('get', 'tag', None, True, 5),
+    'public:search': ('get', None, {'query': 'Article'}, True, 4),
+    'public:trending': ('get', None, None, True, 4),
+    'public:articles-by-author': ('get', 'author', None, True, 6),
+    'public:article-comments': ('get', 'article', None, True, 5),
+    'public:article-comments-more': ('get', 'article', None, True, 4),
+    'public:update-comment': ('get', 'comment', None, True, 4),
+    'personal:personal-page': ('get', None, None, True, 3),
+    'personal:articles-list': ('get', None, None, True, 5),
+    'personal:article-detail': ('get', 'own-article', None, True, 5),
+    'personal:publish-article': ('get', None, None, True, 2),
+    'personal:update-article-list': ('get', 'own-article', None, True, 6),
+    'personal:update-article-detail': ('get', 'own-article', None, True, 6),
+    'personal:delete-article': ('post', 'own-article', None, True, 20),
+    'personal:about-page': ('get', None, None, True, 5),
+    'personal:social_media-delete': ('post', 'social-media', None, True, 6),
+    'personal:add-user-description': ('get', None, None, True, 3),
+    'personal:update-user-description': ('get', None, None, True, 3),
+    'personal:delete-user-description': ('post', None, None, True, 5),
+    'personal:reading-history': ('get', None, None, True, 3),
+    'personal:clear-reading-history': ('post', None, None, True, 3),
+    'personal:delete-reading': ('post', 'reading', None, True, 5),
+    'personal:liked-articles': ('get', None, None, True, 3),
+    'personal:disliked-articles': ('get', None, None, True, 3),
+    'personal:clear-likes': ('post', None, None, True, 10),
+    'personal:clear-dislikes': ('post', None, None, True, 8),
+    'personal:delete-like': ('post', 'like', None, True, 11),
+    'personal:delete-dislike': ('post', 'dislike', None, True, 10),
+    'personal:subscriptions-list': ('get', None, None, True, 3),
+    'personal:favorite-articles': ('get', None, None, True, 6),
+    'personal:delete-favorite-article': ('post', 'favorite', None, True, 5),
+    'personal:clear-favorites': ('post', None, None, True, 4),
+}
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0, READ_COUNTER_FLUSH_INTERVAL=3600,
+                   READ_COUNTER_MAX_PENDING=10 ** 6)
+class QueryBudgetTest(TestCase):
+    """
+    Requests every URL of the site with data many times larger
+    than a page and fails when a view issues more queries or takes
+    longer than its budget, which is how N+1 queries show up
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.reader = CustomUser.objects.create_user(username='Reader',
+                                                    password='34somepassword34',
+                                                    email='reader@gmail.com',
+                                                    is_staff=True)
+        authors = CustomUser.objects.bulk_create([
+            CustomUser(username=f'Author{number}', email=f'author{number}@gmail.com')
+            for number in range(AUTHORS)])
+        authors.append(cls.reader)
+        image = tempfile.NamedTemporaryFile(suffix=".jpg").name
+        now = timezone.now()
+        articles = Article.objects.bulk_create([
+            Article(title=f'Article {number} of {author.username}',
+                    content='Cool content ' * 50,
+                    author=author, image=image)
+            for author in authors for number in range(ARTICLES_PER_AUTHOR)])
+        # dates differ, like they do on a real site
+        for number, article in enumerate(articles):
+            article.pub_date = now - timedelta(minutes=number)
+        Article.objects.bulk_update(articles, ['pub_date'])
+        tags = Tag.objects.bulk_create([Tag(name=f'tag{number}', slug=f'tag{number}')
+                                        for number in range(TAGS)])
+        content_type = ContentType.objects.get_for_model(Article)
+        TaggedItem.objects.bulk_create([
+            TaggedItem(content_type=content_type, object_id=article.id,
+                       tag=tags[(number + shift) % TAGS])
+            for number, article in enumerate(articles)
+            for shift in range(TAGS_PER_ARTICLE)])
+
+        # reader liked, disliked, read and saved articles of most authors
+        others = [article for article in articles if article.author_id != cls.reader.id]
+        for number, article in enumerate(others[:200]):
+            Reaction(user=cls.reader, article=article,
+                     value=1 if number % 3 else -1).save()
+        UserReading.objects.bulk_create([
+            UserReading(user=cls.reader, article=article, date_read=now, day=now.date())
+            for article in others[:200]])
+        favorites = FavoriteArticles.objects.create(user=cls.reader)
+        favorites.articles.add(*others[:100])
+        Subscription.objects.bulk_create([
+            Subscription(subscriber=cls.reader, subscribe_to=author)
+            for author in authors[:-1]])
+        cls.article = others[0]
+        Comment.objects.bulk_create([
+            Comment(user=authors[number % len(authors)], article=cls.article,
+                    content=f'Comment {number}')
+            for number in range(COMMENTS)])
+        UserDescription.objects.create(user=cls.reader, content='About me')
+        SocialMedia.objects.create(user=cls.reader, link='https://twitter.com/reader',
+                                   title=SocialMedia.TWITTER)
+
+        AuthorStats.objects.rebuild()
+        call_command('rebuild_tag_cloud', stdout=StringIO())
+        call_command('rebuild_search_index', stdout=StringIO())
+        call_command('build_recommendations', stdout=StringIO())
+        call_command('update_trending', stdout=StringIO())
+
+    def get_arguments(self, kind):
+        reader = self.reader
+        own_article = Article.objects.filter(author=reader).first()
+        arguments = {
+            'author': {'pk': self.article.author_id},
+            'article': {'pk': self.article.id},
+            'own-article': {'pk': own_article.id},
+            'tag': {'slug': 'tag1'},
+            'comment': {'pk': Comment.objects.filter(user=reader).first().id},
+            'social-media': {'pk': SocialMedia.objects.get(user=reader).id},
+            'reading': {'pk': UserReading.objects.filter(user=reader).first().id},
+            'like': {'pk': Reaction.objects.filter(user=reader, value=1).first().id},
+            'dislike': {'pk': Reaction.objects.filter(user=reader, value=-1).first().id},
+            'favorite': {'pk': self.article.id},
+        }
+        return arguments.get(kind)
+
+    def request(self, name):
+        method, kind, data, logged_in, _ = BUDGETS[name]
+        if logged_in:
+            self.client.force_login(self.reader)
+        else:
+            self.client.logout()
+        url = reverse(name, kwargs=self.get_arguments(kind))
+        cache.clear()
+        invalidate_tag_cloud()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(self.client, method)(url, data or {})
+            duration = time.perf_counter() - started
+        return response, len(queries), duration
+
+    def test_every_url_has_budget(self):
+        names = set()
+        for namespace in ('core', 'users', 'public', 'personal'):
+            resolver = get_resolver().namespace_dict[namespace][1]
+            names |= {f'{namespace}:{name}' for name in resolver.reverse_dict
+                      if isinstance(name, str)}
+        self.assertEqual(names - set(BUDGETS), set())
+
+    def test_requests_stay_within_budget(self):
+        for name, budget in BUDGETS.items():
+            with self.subTest(name=name), transaction.atomic():
+                response, queries, duration = self.request(name)
+                self.assertLess(response.status_code, 400)
+                self.assertLessEqual(queries, budget[-1])
+                self.assertLess(duration, MAX_SECONDS)
+                # requests that write must not change
+                # what the next one is measured on
+                transaction.set_rollback(True)
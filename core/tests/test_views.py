@@ -1,5 +1,182 @@
-from django.test import TestCase
+import base64
+import json
+import tempfile
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+
+from core.db.routers import ReplicaRouter, ReplicaRoutingMiddleware
+from core.fragments import get_card_versions, invalidate_article_cards
+from core.metrics import percentile, request_metrics
+from core.models import Article, Recommendation
+from core.page_cache import AnonymousPageCacheMiddleware, add_page_cache_tags, purge_page_cache
+from core.pagination import InvalidCursor, KeysetPaginator, encode_cursor
+from users.models import CustomUser
+
+
+class IndexViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user = CustomUser.objects.create_user(username='User1',
+                                                   password='34somepassword34',
+                                                   email='user1@gmail.com')
+
+        article_1 = Article.objects.\
+            create(title='Something1',
+                   content='Cool content 1',
+                   author=test_user,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+        article_2 = Article.objects.\
+            create(title='Something2',
+                   content='Cool content 2',
+                   author=test_user,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+
+        article_1.tags.add('music', 'sport')
+        article_2.tags.add('music')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_view_uses_correct_template(self):
+        response = self.client.get(reverse('core:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'core/index.html')
+
+    def test_tags_with_number_of_articles_in_context(self):
+        response = self.client.get(reverse('core:index'))
+        tags = response.context['tags']
+        self.assertEqual([tag.name for tag in tags], ['music', 'sport'])
+        self.assertEqual([tag.articles_count for tag in tags], [2, 1])
+        self.assertEqual([tag.weight for tag in tags], [200, 100])
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_tag_cloud_served_from_cache(self):
+        self.client.get(reverse('core:index'))
+        # only popular articles and their tags are queried
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('core:index'))
+        self.assertEqual(len(response.context['tags']), 2)
+
+    def test_popular_articles_shown_to_not_logged_user(self):
+        Article.objects.filter(title='Something2').update(times_read=10)
+        response = self.client.get(reverse('core:index'))
+        self.assertEqual([a.title for a in response.context['articles']],
+                         ['Something2', 'Something1'])
+
+    def test_recommended_articles_shown_to_logged_user(self):
+        user = CustomUser.objects.get(username='User1')
+        article = Article.objects.get(title='Something1')
+        Recommendation.objects.create(user=user, article=article, score=3)
+        login = self.client.login(username='User1',
+                                  password='34somepassword34')
+        response = self.client.get(reverse('core:index'))
+        self.assertEqual(list(response.context['articles']), [article])
+
+    def test_cache_invalidated_when_tags_change(self):
+        self.client.get(reverse('core:index'))
+        Article.objects.get(title='Something2').tags.add('news')
+        response = self.client.get(reverse('core:index'))
+        self.assertEqual([tag.name for tag in response.context['tags']],
+                         ['music', 'news', 'sport'])
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user = CustomUser.objects.create_user(username='User1',
+                                                   password='34somepassword34',
+                                                   email='user1@gmail.com')
+
+        Article.objects.\
+            create(title='Something1',
+                   content='Cool content 1',
+                   author=test_user,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_url(self):
+        article = Article.objects.get(title='Something1')
+        return reverse('public:article-detail', kwargs={'pk': article.id})
+
+    def test_page_served_from_cache_to_not_logged_user(self):
+        url = self.get_url()
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, 'Something1')
+        # every visitor gets its own csrf token
+        self.assertNotContains(response, 'page-cache-csrf-token')
+        self.assertContains(response, 'name="csrfmiddlewaretoken"')
+        self.assertIn('csrftoken', response.cookies)
+
+    def test_page_purged_when_article_changes(self):
+        url = self.get_url()
+        self.client.get(url)
+        article = Article.objects.get(title='Something1')
+        article.title = 'Something new'
+        article.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Something new')
+
+    def render(self, content, purge=False):
+        def view(request):
+            add_page_cache_tags(request, 'article:1')
+            if purge:
+                # object changed while page was rendered
+                purge_page_cache('article:1')
+            return HttpResponse(content)
+        request = RequestFactory().get('/page/')
+        request.user = AnonymousUser()
+        return AnonymousPageCacheMiddleware(view)(request)
+
+    def test_page_not_stored_when_purged_during_rendering(self):
+        self.render('Old content', purge=True)
+        self.assertContains(self.render('New content'), 'New content')
+        self.assertContains(self.render('Newer content'), 'New content')
+
+    @override_settings(REPLICA_DATABASES=['replica'])
+    def test_page_to_store_rendered_from_default_database(self):
+        def view(request):
+            add_page_cache_tags(request, 'article:1')
+            return HttpResponse(ReplicaRouter().db_for_read(Article))
+        request = RequestFactory().get('/page/')
+        request.user = AnonymousUser()
+        middleware = ReplicaRoutingMiddleware(AnonymousPageCacheMiddleware(view))
+        self.assertEqual(middleware(request).content, b'default')
+
+    @override_settings(PAGE_CACHE_LOCAL_MEMORY=False)
+    def test_cache_of_process_not_used_for_pages(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            AnonymousPageCacheMiddleware(lambda request: HttpResponse())
+
+    def test_page_not_cached_for_logged_user(self):
+        url = self.get_url()
+        self.client.login(username='User1', password='34somepassword34')
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertTemplateUsed(response, 'public/article_detail.html')
+
+
+class ArticleCardCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_card_invalidated_again_after_commit(self):
+        version = get_card_versions([1])[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_article_cards([1])
+            # card read before commit gets a new version with old rows
+            stale = get_card_versions([1])[1]
+        self.assertNotEqual(stale, version)
+        self.assertNotEqual(get_card_versions([1])[1], stale)
 
 
 class BecomeUserViewTest(TestCase):
@@ -8,3 +185,121 @@ class BecomeUserViewTest(TestCase):
         response = self.client.get(reverse('core:become-user'))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'core/become_user.html')
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user = CustomUser.objects.create_user(username='User1',
+                                                   password='34somepassword34',
+                                                   email='user1@gmail.com')
+
+        # pairs of articles share times_read, so id breaks ties
+        for number in range(7):
+            Article.objects.\
+                create(title=f'Something{number}',
+                       content=f'Cool content {number}',
+                       author=test_user,
+                       image=tempfile.NamedTemporaryFile(suffix=".jpg").name,
+                       times_read=number // 2)
+
+    def get_paginator(self):
+        return KeysetPaginator(Article.objects.all(), ('-times_read', 'id'), 3)
+
+    def test_pages_follow_ordering_without_gaps(self):
+        expected = list(Article.objects.order_by('-times_read', 'id'))
+        paginator = self.get_paginator()
+        page = paginator.page()
+        self.assertFalse(page.has_previous)
+        objects = list(page)
+        while page.has_next:
+            page = paginator.page(page.next_cursor)
+            objects += list(page)
+        self.assertEqual(objects, expected)
+        self.assertEqual(len(page), 1)
+
+    def test_previous_page_is_the_same_as_before(self):
+        paginator = self.get_paginator()
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        self.assertEqual(list(paginator.page(second.previous_cursor)), list(first))
+        self.assertFalse(paginator.page(second.previous_cursor).has_previous)
+
+    def test_deep_page_is_single_query(self):
+        paginator = self.get_paginator()
+        cursor = paginator.page(paginator.page().next_cursor).next_cursor
+        with self.assertNumQueries(1):
+            paginator.page(cursor)
+
+    def test_cursor_keeps_microseconds_of_dates(self):
+        paginator = KeysetPaginator(Article.objects.all(), ('-pub_date', 'id'), 2)
+        expected = list(Article.objects.order_by('-pub_date', 'id'))
+        page = paginator.page()
+        self.assertEqual(list(paginator.page(page.next_cursor)), expected[2:4])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            self.get_paginator().page('not-a-cursor')
+
+    def test_tampered_cursors(self):
+        paginator = KeysetPaginator(Article.objects.all(), ('-pub_date', 'id'), 2)
+        raw = [{'v': None, 'd': 'next'}, {'v': {}, 'd': 'next'}, {'v': [1, 1], 'd': 'up'}]
+        cursors = [base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+                   for data in raw]
+        cursors += [encode_cursor(values, 'next')
+                    for values in (['garbage', 1], ['2023-13-45T10:00:00', 1],
+                                   [{}, 1], [[1], 1], [None, 1], [1], [1, 2, 3],
+                                   [timezone.now(), 'one'], [timezone.now(), None])]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                paginator.page(cursor)
+
+    def test_cursor_of_annotated_field(self):
+        queryset = Article.objects.annotate(rank=F('times_read') * 1.0)
+        paginator = KeysetPaginator(queryset, ('-rank', '-times_read', 'id'), 2)
+        with self.assertRaises(InvalidCursor):
+            paginator.page(encode_cursor([1.0, 1], 'next'))
+        page = paginator.page(encode_cursor([2.0, 2, 10 ** 6], 'next'))
+        self.assertEqual([a.times_read for a in page], [1, 1])
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=0)
+class RequestStatsViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        CustomUser.objects.create_user(username='User1',
+                                       password='34somepassword34',
+                                       email='user1@gmail.com')
+        CustomUser.objects.create_user(username='Staff',
+                                       password='34somepassword34',
+                                       email='staff@gmail.com',
+                                       is_staff=True)
+
+    def setUp(self):
+        request_metrics.clear()
+
+    def test_view_is_only_for_staff(self):
+        url = reverse('core:request-stats')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.login(username='User1', password='34somepassword34')
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_requests_are_measured(self):
+        with self.assertLogs('core.metrics', level='INFO') as logs:
+            self.client.get(reverse('core:index'))
+        self.assertIn('view=core:index method=GET status=200', logs.output[0])
+        self.client.login(username='Staff', password='34somepassword34')
+        response = self.client.get(reverse('core:request-stats'))
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()['views']['core:index']
+        self.assertEqual(stats['requests'], 1)
+        self.assertGreater(stats['queries_p50'], 0)
+        self.assertGreater(stats['db_time_p99'], 0)
+        self.assertGreater(stats['render_time_p95'], 0)
+        self.assertGreater(stats['size_p50'], 0)
+
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
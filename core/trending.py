@@ -0,0 +1,110 @@
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from core.models import Comment, Reaction, TrendingScore, TrendingState, UserReading
+
+# how much a single event adds to the score of an article
+# at the moment it happens
+READING_WEIGHT = 1
+LIKE_WEIGHT = 2
+COMMENT_WEIGHT = 3
+# scores below this value are removed from the table
+MIN_SCORE = 0.01
+
+
+class TrendingUpdater:
+    """
+    Updates trending scores incrementally: existing scores are decayed
+    to the current moment with one UPDATE, then only events with ids
+    above the ones stored in TrendingState by the previous run are added.
+    Events younger than lag are left for the next run, an event with
+    a lower id can still be uncommitted while a newer one is visible
+    """
+
+    def __init__(self, half_life=None, lag=None, batch_size=1000):
+        self.half_life = half_life or timedelta(
+            hours=getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24))
+        self.lag = lag if lag is not None else timedelta(
+            seconds=getattr(settings, 'TRENDING_LAG_SECONDS', 300))
+        self.batch_size = batch_size
+
+    def decay(self, age):
+        return 0.5 ** (age / self.half_life)
+
+    def get_state(self, now):
+        # first run takes events of the last few half-lives into account,
+        # row is locked, so runs started at the same time do not
+        # add the same events twice
+        return TrendingState.objects.\
+            select_for_update().\
+            get_or_create(pk=1, defaults={'updated': now - 7 * self.half_life})
+
+    def get_last_id(self, model, date_field, cutoff):
+        # the newest event older than cutoff, every event with
+        # a lower id was inserted before it by a transaction
+        # shorter than lag, so it is committed by now
+        return model.objects.\
+            filter(**{f'{date_field}__lte': cutoff}).\
+            order_by('-id').\
+            values_list('id', flat=True).first() or 0
+
+    def get_events(self, state, now, since=None):
+        sources = [
+            (UserReading.objects.all(), 'date_read', 'last_reading_id', READING_WEIGHT),
+            (Reaction.objects.filter(value=1), 'reaction_date', 'last_reaction_id', LIKE_WEIGHT),
+            (Comment.objects.all(), 'pub_date', 'last_comment_id', COMMENT_WEIGHT),
+        ]
+        for queryset, date_field, last_id_field, weight in sources:
+            # events inserted while scores are updated are left for
+            # the next run, a reading read again on the same day keeps
+            # its id and is counted once
+            last_id = max(self.get_last_id(queryset.model, date_field, now - self.lag),
+                          getattr(state, last_id_field))
+            queryset = queryset.filter(id__gt=getattr(state, last_id_field), id__lte=last_id)
+            if since is not None:
+                queryset = queryset.filter(**{f'{date_field}__gt': since})
+            setattr(state, last_id_field, last_id)
+            events = queryset.order_by().\
+                values_list('article_id', date_field).\
+                iterator(chunk_size=self.batch_size)
+            for article_id, date in events:
+                yield article_id, weight, date
+
+    def apply(self, increments, now):
+        ids = list(increments)
+        for start in range(0, len(ids), self.batch_size):
+            batch = ids[start:start + self.batch_size]
+            scores = TrendingScore.objects.in_bulk(batch)
+            new_scores = []
+            for article_id in batch:
+                if article_id in scores:
+                    scores[article_id].score += increments[article_id]
+                    scores[article_id].updated = now
+                else:
+                    new_scores.append(TrendingScore(article_id=article_id,
+                                                    score=increments[article_id],
+                                                    updated=now))
+            TrendingScore.objects.bulk_update(scores.values(),
+                                              ['score', 'updated'])
+            TrendingScore.objects.bulk_create(new_scores)
+
+    def update(self, now=None):
+        now = now or timezone.now()
+        increments = Counter()
+        with transaction.atomic():
+            state, created = self.get_state(now)
+            since = state.updated if created else None
+            for article_id, weight, date in self.get_events(state, now, since):
+                # event committed after the previous run can be older than it
+                increments[article_id] += weight * self.decay(max(now - date, timedelta(0)))
+            TrendingScore.objects.\
+                update(score=F('score') * self.decay(now - state.updated),
+                       updated=now)
+            self.apply(increments, now)
+            TrendingScore.objects.filter(score__lt=MIN_SCORE).delete()
+            state.updated = now
+            state.save()
+        return len(increments)
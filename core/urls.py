@@ -8,4 +8,5 @@ urlpatterns = [
     path('', views.IndexView.as_view(), name='index'),
     path('become_user/',
          TemplateView.as_view(template_name='core/become_user.html'), name='become-user'),
+    path('stats/requests/', views.RequestStatsView.as_view(), name='request-stats'),
 ]
@@ -0,0 +1,46 @@
+import warnings
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from PIL import Image
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+
+def get_max_pixels():
+    return getattr(settings, 'IMAGE_MAX_PIXELS', 24_000_000)
+
+
+def read_image_header(file):
+    """
+    Returns format and size of image without decoding its pixels,
+    Pillow reads only as much of the file as its header takes
+    """
+    position = file.tell()
+    file.seek(0)
+    try:
+        with warnings.catch_warnings():
+            # Pillow only warns about images that are
+            # a bit bigger than its own limit
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            with Image.open(file) as image:
+                return image.format, image.size
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise ValidationError('Image has too many pixels')
+    except (OSError, SyntaxError, ValueError):
+        raise ValidationError('Upload a valid image')
+    finally:
+        file.seek(position)
+
+
+def check_image(image, limit_kb):
+    # cheap checks go first, so a burst of big uploads
+    # is rejected before anything is decoded
+    if image.size > limit_kb * 1024:
+        raise ValidationError(f"Maximum size of the image is {limit_kb} KB")
+    image_format, (width, height) = read_image_header(image)
+    if image_format not in ALLOWED_FORMATS:
+        raise ValidationError(
+            f"Allowed formats of the image are {', '.join(ALLOWED_FORMATS)}")
+    if width * height > get_max_pixels():
+        raise ValidationError(
+            f"Maximum number of pixels of the image is {get_max_pixels()}")
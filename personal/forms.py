@@ -9,7 +9,8 @@ class PublishUpdateArticleForm(forms.ModelForm):
     class Meta:
         model = Article
         exclude = [
-            'author', 'times_read', 'pub_date'
+            'author', 'times_read', 'pub_date',
+            'likes', 'dislikes'
         ]
 
 
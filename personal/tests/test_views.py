@@ -1377,6 +1377,14 @@ class ClearLikesViewTest(TestCase):
         reactions = Reaction.objects.filter(user__username='User1').count()
         self.assertEqual(reactions, 0)
 
+    def test_likes_counters_of_articles_decreased_after_clearing(self):
+        login = self.client.login(username='User1',
+                                  password='34somepassword34')
+        response = self.client.post(reverse('personal:clear-likes'))
+        self.assertEqual(response.status_code, 302)
+        for article in Article.objects.filter(author__username='User2'):
+            self.assertEqual(article.likes, 0)
+
 
 class ClearDislikesViewTest(TestCase):
     @classmethod
@@ -3,13 +3,13 @@ from django.core.exceptions import PermissionDenied
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db.models.query_utils import Q
-from django.db.models import Sum
 from django.http import Http404, HttpRequest, HttpResponse, HttpResponseForbidden
 from django.shortcuts import render, redirect
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.generic import ListView, DetailView
-from core.models import Subscription, Article, SocialMedia, UserDescription, FavoriteArticles, UserReading, Reaction
+from core.models import Subscription, Article, AuthorStats, SocialMedia, UserDescription, FavoriteArticles, UserReading, Reaction
+from core.pagination import KeysetPaginationMixin
 from personal.forms import PublishUpdateArticleForm, PublishSocialMediaForm, PublishUpdateUserDescriptionForm
 
 
@@ -17,8 +17,7 @@ class PersonalPageView(View):
     template_name = 'personal/personal_page.html'
 
     def get_subscribers(self, user):
-        return Subscription.objects.\
-            filter(subscribe_to=user).all().count()
+        return AuthorStats.objects.for_user(user).subscribers
 
     def get(self, request, *args, **kwargs):
         current_user = request.user
@@ -47,19 +46,24 @@ class SubscriptionsListView(ListView):
         return super().dispatch(request, *args, **kwargs)
 
 
-class ArticlesListView(ListView):
+class ArticlesListView(KeysetPaginationMixin, ListView):
     model = Article
     template_name = 'personal/articles_list.html'
     context_object_name = 'articles'
+    keyset_ordering = ('-pub_date', 'id')
 
     def get_queryset(self):
         current_user = self.request.user
         articles = Article.objects.\
             prefetch_related('tags').\
-            filter(author=current_user).\
-            order_by('-pub_date').all()
+            filter(author=current_user).all()
         return articles
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['number_of_articles'] = self.object_list.count()
+        return context
+
     @method_decorator(login_required)
     def dispatch(self, request, *args, **kwargs):
         return super().dispatch(request, *args, **kwargs)
@@ -215,16 +219,14 @@ class AboutPageView(View):
         return UserDescription.objects.filter(user=user).first()
 
     def get_readings(self, user):
-        return Article.objects.filter(author=user).aggregate(Sum('times_read'))
+        return AuthorStats.objects.for_user(user).reads
 
     def get(self, request, *args, **kwargs):
         current_user = request.user
         social_media_list = self.get_social_media(current_user)
         description = self.get_description(current_user)
         form = self.form_class()
-        readings = self.get_readings(current_user)['times_read__sum']
-        if not readings:
-            readings = 0
+        readings = self.get_readings(current_user)
         return render(request, self.template_name, {'form': form,
                                                     'social_media_list': social_media_list,
                                                     'description': description,
@@ -240,7 +242,7 @@ class AboutPageView(View):
             return redirect(self.redirect_to)
         social_media_list = self.get_social_media(current_user)
         description = self.get_description(current_user)
-        readings = self.get_readings(current_user)['times_read__sum']
+        readings = self.get_readings(current_user)
         return render(request, self.template_name, {'form': form,
                                                     'social_media_list': social_media_list,
                                                     'description': description,
@@ -528,10 +530,11 @@ class DeleteDislikeView(DeleteSingleReactionBaseClass):
     success_message = 'You successfully deleted one dislike reaction'
 
 
-class FavoriteArticlesList(ListView):
+class FavoriteArticlesList(KeysetPaginationMixin, ListView):
     model = FavoriteArticles
     context_object_name = 'articles'
     template_name = 'personal/favorite_articles.html'
+    keyset_ordering = ('id', )
 
     def get_queryset(self):
         favorite_object = FavoriteArticles.objects.\
@@ -540,9 +543,13 @@ class FavoriteArticlesList(ListView):
             return None
         else:
             return favorite_object.articles.\
-                select_related('author').\
-                prefetch_related('tags').\
-                order_by('id').all()
+                select_related('author').all()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.object_list is not None:
+            context['number_of_articles'] = self.object_list.count()
+        return context
 
     @method_decorator(login_required)
     def dispatch(self, request, *args, **kwargs):
@@ -569,11 +576,9 @@ class DeleteFavoriteArticle(View):
             messages.info(
                 request, 'You do not have any articles to remove from Favorites')
             return redirect(self.redirect_to)
-        favorite_articles = favorite_obj.articles.all()
-        if article not in favorite_articles:
+        if not favorite_obj.remove_article(article):
             messages.info(request, 'This article is not in your Favorites')
             return redirect(self.redirect_to)
-        favorite_obj.articles.remove(article)
         messages.success(
             request, 'You successfully removed an article from your Favorites')
         return redirect(self.redirect_to)
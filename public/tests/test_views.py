@@ -1,17 +1,25 @@
 import tempfile
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.messages import get_messages
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.db.models import Sum
 from django.db.models.query_utils import Q
 
+from core.counters import read_counter
+from core.pagination import encode_cursor
 from core.models import Article, SocialMedia, UserDescription,\
-    FavoriteArticles, Reaction, Comment, UserReading, Subscription
+    FavoriteArticles, Reaction, Comment, UserReading, Subscription, TrendingScore
 
 from public.forms import CommentArticleForm
 from users.models import CustomUser
 
+# values of cursors that were not made by paginator
+TAMPERED_CURSOR_VALUES = [['garbage', 1], ['2023-13-45T10:00:00', 1], [{}, 1],
+                          [[1], 1], [None, 1], [1], [1, 2, 3, 4]]
+
 
 class AboutPageViewTest(TestCase):
     @classmethod
@@ -103,6 +111,10 @@ class ArticleDetailViewTest(TestCase):
         fav_obj = FavoriteArticles.objects.create(user=test_user_2)
         fav_obj.articles.add(article)
 
+    def setUp(self):
+        # pages for anonymous visitors are cached
+        cache.clear()
+
     def test_view_uses_correct_template(self):
         article = Article.objects.get(title='Something1')
         response = self.client.get(reverse('public:article-detail',
@@ -170,6 +182,61 @@ class ArticleDetailViewTest(TestCase):
         self.assertEqual(response.context['favorite_status'],
                          'Remove from Favorites')
 
+    def test_number_of_queries_for_not_logged_user(self):
+        article = Article.objects.get(title='Something1')
+        # validators of page, versions of article and author,
+        # article with its counters and tags of article
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('public:article-detail',
+                                               kwargs={'pk': article.id}))
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified_returned_for_same_etag(self):
+        article = Article.objects.get(title='Something1')
+        url = reverse('public:article-detail', kwargs={'pk': article.id})
+        with self.settings(PAGE_CACHE_TIMEOUT=0):
+            etag = self.client.get(url)['ETag']
+            # only validators are computed
+            with self.assertNumQueries(2):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            Article.objects.filter(id=article.id).update(times_read=100)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_does_not_depend_on_cache(self):
+        # cache of another process does not know
+        # about purges made by this one and the other way
+        article = Article.objects.get(title='Something1')
+        url = reverse('public:article-detail', kwargs={'pk': article.id})
+        with self.settings(PAGE_CACHE_TIMEOUT=0):
+            etag = self.client.get(url)['ETag']
+            cache.clear()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            article.title = 'Something new'
+            article.save()
+            cache.clear()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Something new')
+
+    def test_number_of_queries_for_logged_user(self):
+        article = Article.objects.get(title='Something1')
+        login = self.client.login(username='User2',
+                                  password='34somepassword34')
+        # session, user, article with viewer's state and tags of article
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('public:article-detail',
+                                               kwargs={'pk': article.id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['favorite_status'],
+                         'Remove from Favorites')
+        self.assertEqual(response.context['subscription_status'],
+                         'Unsubscribe')
+        self.assertEqual(response.context['subscribers'], 2)
+
     def test_show_content_changes_to_true_when_post_method(self):
         article = Article.objects.get(title='Something1')
         response = self.client.post(reverse('public:article-detail',
@@ -177,6 +244,21 @@ class ArticleDetailViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue(response.context['show_content'])
 
+    def test_read_by_logged_user_is_buffered_and_shown(self):
+        article = Article.objects.get(title='Something1')
+        login = self.client.login(username='User2',
+                                  password='34somepassword34')
+        read_counter.clear()
+        with self.settings(READ_COUNTER_FLUSH_INTERVAL=60):
+            response = self.client.post(reverse('public:article-detail',
+                                                kwargs={'pk': article.id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['article'].times_read, 46)
+        self.assertEqual(read_counter.pending(article.id), 1)
+        read_counter.flush()
+        article.refresh_from_db()
+        self.assertEqual(article.times_read, 46)
+
     def test_correct_response_for_nonexistent_article(self):
         response = self.client.post(reverse('public:article-detail',
                                             kwargs={'pk': 888}))
@@ -217,6 +299,63 @@ class CommentsByArticleViewTest(TestCase):
                                            kwargs={'pk': 4567}))
         self.assertEqual(response.status_code, 404)
 
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_comments_paginated_by_cursor(self):
+        article = Article.objects.get(title='Something1')
+        user = CustomUser.objects.get(username='User1')
+        for i in range(3):
+            Comment.objects.create(user=user, article=article,
+                                   content=f'Comment {i}')
+        url = reverse('public:article-comments', kwargs={'pk': article.id})
+        # validators of page, version of article, article,
+        # count of comments and a page of comments with users
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(response.context['number_of_comments'], 3)
+        self.assertEqual([c.content for c in response.context['comments']],
+                         ['Comment 0', 'Comment 1'])
+        next_url = response.context['page'].next_url
+        response = self.client.get(url + next_url)
+        self.assertEqual([c.content for c in response.context['comments']],
+                         ['Comment 2'])
+
+    def test_not_modified_returned_until_comment_published(self):
+        article = Article.objects.get(title='Something1')
+        user = CustomUser.objects.get(username='User1')
+        Comment.objects.create(user=user, article=article, content='Comment')
+        url = reverse('public:article-comments', kwargs={'pk': article.id})
+        response = self.client.get(url)
+        # deleting a comment does not change the latest update
+        self.assertFalse(response.has_header('Last-Modified'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        comment = Comment.objects.create(user=user, article=article, content='New comment')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        comment.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'New comment')
+
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_more_comments_returned_as_fragment(self):
+        article = Article.objects.get(title='Something1')
+        user = CustomUser.objects.get(username='User1')
+        for i in range(3):
+            Comment.objects.create(user=user, article=article,
+                                   content=f'Comment {i}')
+        response = self.client.get(reverse('public:article-comments',
+                                           kwargs={'pk': article.id}))
+        cursor = response.context['page'].next_cursor
+        response = self.client.get(reverse('public:article-comments-more',
+                                           kwargs={'pk': article.id}),
+                                   {'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertIn('Comment 2', data['html'])
+        self.assertNotIn('Comment 1', data['html'])
+        self.assertIsNone(data['next_cursor'])
+
 
 class AddRemoveFavoriteArticleViewTest(TestCase):
     @classmethod
@@ -851,6 +990,10 @@ class SubscribeUnsubscribeThroughArticleDetailViewTest(TestCase):
 
 class ArticlesByTagViewTest(TestCase):
 
+    def setUp(self):
+        # pages for anonymous visitors are cached
+        cache.clear()
+
     def test_view_uses_correct_template(self):
         response = self.client.get(reverse('public:articles-tag',
                                            kwargs={'slug': 'some_tag'}))
@@ -864,8 +1007,152 @@ class ArticlesByTagViewTest(TestCase):
         self.assertTrue('articles' in response.context)
         self.assertTrue('tag' in response.context)
 
+    def test_articles_paginated_by_cursor(self):
+        test_user = CustomUser.objects.create_user(username='User1',
+                                                   email='user1@gmail.com',
+                                                   password='34somepassword34')
+        for number in range(5):
+            article = Article.objects.\
+                create(title=f'Something{number}',
+                       content=f'Cool content {number}',
+                       author=test_user,
+                       image=tempfile.NamedTemporaryFile(suffix=".jpg").name,
+                       times_read=number)
+            article.tags.add('music')
+        url = reverse('public:articles-tag', kwargs={'slug': 'music'})
+        with self.settings(ARTICLES_PER_PAGE=3):
+            response = self.client.get(url)
+            self.assertEqual([a.title for a in response.context['articles']],
+                             ['Something4', 'Something3', 'Something2'])
+            self.assertEqual(response.context['number_of_articles'], 5)
+            response = self.client.get(url + response.context['page'].next_url)
+        self.assertEqual([a.title for a in response.context['articles']],
+                         ['Something1', 'Something0'])
+        self.assertFalse(response.context['page'].has_next)
+
+    def test_correct_response_to_invalid_cursor(self):
+        response = self.client.get(reverse('public:articles-tag',
+                                           kwargs={'slug': 'some_tag'}) + '?cursor=abc')
+        self.assertEqual(response.status_code, 404)
+
+    def test_correct_response_to_tampered_cursor(self):
+        url = reverse('public:articles-tag', kwargs={'slug': 'some_tag'})
+        for values in TAMPERED_CURSOR_VALUES:
+            with self.subTest(values=values):
+                response = self.client.get(url, {'cursor': encode_cursor(values, 'next')})
+                self.assertEqual(response.status_code, 404)
+
+    def test_cards_of_articles_cached_until_article_changes(self):
+        test_user = CustomUser.objects.create_user(username='User1',
+                                                   email='user1@gmail.com',
+                                                   password='34somepassword34')
+        for number in range(3):
+            article = Article.objects.\
+                create(title=f'Something{number}',
+                       content=f'Cool content {number}',
+                       author=test_user,
+                       image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+            article.tags.add('music')
+        url = reverse('public:articles-tag', kwargs={'slug': 'music'})
+        with self.settings(PAGE_CACHE_TIMEOUT=0):
+            self.client.get(url)
+            # tag and articles, tags of articles are not needed
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+        self.assertContains(response, 'Something2')
+        article = Article.objects.get(title='Something2')
+        article.title = 'Something new'
+        article.save()
+        article.tags.add('rock')
+        response = self.client.get(url)
+        self.assertContains(response, 'Something new')
+        self.assertContains(response, '#rock')
+        self.assertNotContains(response, 'Something2')
+
 
 class SearchArticlesViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user = CustomUser.objects.create_user(username='Musician',
+                                                   email='user1@gmail.com',
+                                                   password='34somepassword34')
+
+        article_1 = Article.objects.\
+            create(title='Learning guitar',
+                   content='Some words about music',
+                   author=test_user,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+        article_1.tags.add('hobby')
+
+        article_2 = Article.objects.\
+            create(title='Music of the week',
+                   content='New albums',
+                   author=test_user,
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+        article_2.tags.add('music')
+
+        Article.objects.\
+            create(title='Football',
+                   content='Results of the match',
+                   author=CustomUser.objects.create_user(username='User2',
+                                                         email='user2@gmail.com',
+                                                         password='34somepassword34'),
+                   image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+
+    def test_articles_ranked_by_relevance(self):
+        response = self.client.get(reverse('public:search') + '?query=music')
+        self.assertEqual(response.status_code, 200)
+        # 'music' is in title and tags of the second article,
+        # and only in content of the first one (author's name
+        # 'Musician' matches both)
+        self.assertEqual([a.title for a in response.context['articles']],
+                         ['Music of the week', 'Learning guitar'])
+
+    def test_correct_response_to_tampered_cursor(self):
+        for values in TAMPERED_CURSOR_VALUES + [[1, 1, 'one'], [1.5, 1]]:
+            with self.subTest(values=values):
+                response = self.client.get(reverse('public:search'),
+                                           {'query': 'music',
+                                            'cursor': encode_cursor(values, 'next')})
+                self.assertEqual(response.status_code, 404)
+
+    def test_search_results_paginated_by_cursor(self):
+        url = reverse('public:search') + '?query=music'
+        with self.settings(ARTICLES_PER_PAGE=1):
+            response = self.client.get(url)
+            self.assertEqual([a.title for a in response.context['articles']],
+                             ['Music of the week'])
+            response = self.client.get(reverse('public:search') +
+                                       response.context['page'].next_url)
+        self.assertEqual([a.title for a in response.context['articles']],
+                         ['Learning guitar'])
+        self.assertFalse(response.context['page'].has_next)
+
+    def test_articles_found_by_content_and_tags(self):
+        response = self.client.get(reverse('public:search') + '?query=match')
+        self.assertEqual([a.title for a in response.context['articles']],
+                         ['Football'])
+        response = self.client.get(reverse('public:search') + '?query=hobby')
+        self.assertEqual([a.title for a in response.context['articles']],
+                         ['Learning guitar'])
+
+    def test_updated_article_reindexed(self):
+        article = Article.objects.get(title='Football')
+        article.title = 'Basketball'
+        article.save()
+        response = self.client.get(reverse('public:search') + '?query=football')
+        self.assertEqual(len(response.context['articles']), 0)
+        response = self.client.get(reverse('public:search') + '?query=basket')
+        self.assertEqual([a.title for a in response.context['articles']],
+                         ['Basketball'])
+
+    def test_articles_found_by_renamed_author(self):
+        author = CustomUser.objects.get(username='User2')
+        author.username = 'Sportsman'
+        author.save()
+        response = self.client.get(reverse('public:search') + '?query=sportsman')
+        self.assertEqual([a.title for a in response.context['articles']],
+                         ['Football'])
 
     def test_correct_response_to_empty_search(self):
         response = self.client.get(reverse('public:search') + '?query=')
@@ -923,6 +1210,10 @@ class AuthorPageViewTest(TestCase):
         Subscription.objects.create(subscriber=test_user_3,
                                     subscribe_to=test_user_1)
 
+    def setUp(self):
+        # pages for anonymous visitors are cached
+        cache.clear()
+
     def test_correct_response_to_nonexistent_author(self):
         response = self.client.get(reverse('public:author-page',
                                            kwargs={'pk': 876}))
@@ -1090,3 +1381,38 @@ class ArticlesByAuthorViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue('author' in response.context)
         self.assertTrue('articles' in response.context)
+
+    def test_correct_response_to_tampered_cursor(self):
+        author = CustomUser.objects.get(username='User1')
+        url = reverse('public:articles-by-author', kwargs={'pk': author.id})
+        for values in TAMPERED_CURSOR_VALUES:
+            with self.subTest(values=values):
+                response = self.client.get(url, {'cursor': encode_cursor(values, 'next')})
+                self.assertEqual(response.status_code, 404)
+
+
+class TrendingArticlesViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        test_user = CustomUser.objects.create_user(username='User1',
+                                                   email='user1@gmail.com',
+                                                   password='34somepassword34')
+
+        for number, score in [(1, 2.5), (2, 7.0), (3, 0)]:
+            article = Article.objects.\
+                create(title=f'Something{number}',
+                       content=f'Cool content {number}',
+                       author=test_user,
+                       image=tempfile.NamedTemporaryFile(suffix=".jpg").name)
+            TrendingScore.objects.create(article=article, score=score,
+                                         updated=timezone.now())
+
+    def test_view_uses_correct_template(self):
+        response = self.client.get(reverse('public:trending'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'public/trending_articles.html')
+
+    def test_articles_ordered_by_score(self):
+        response = self.client.get(reverse('public:trending'))
+        self.assertEqual([a.title for a in response.context['articles']],
+                         ['Something2', 'Something1'])
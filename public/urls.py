@@ -27,10 +27,14 @@ urlpatterns = [
          views.ArticlesByTag.as_view(), name='articles-tag'),
     path('public/articles/search/',
          views.SearchArticlesView.as_view(), name='search'),
+    path('public/articles/trending/',
+         views.TrendingArticlesView.as_view(), name='trending'),
     path('public/articles/authors/<int:pk>/', views.ArticlesByAuthor.as_view(),
          name='articles-by-author'),
     path('public/articles/<int:pk>/comments/',
          views.CommentsByArticleList.as_view(), name='article-comments'),
+    path('public/articles/<int:pk>/comments/more/',
+         views.MoreCommentsView.as_view(), name='article-comments-more'),
     path('public/articles/comments/<int:pk>/update/', views.UpdateCommentView.as_view(),
          name='update-comment')
 ]
@@ -1,25 +1,43 @@
 from typing import Any, Dict
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
 from django.db.models.query_utils import Q
-from django.db.models import Sum
-from django.http import HttpResponseRedirect, Http404, HttpResponseNotAllowed, HttpResponseForbidden
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import HttpResponseRedirect, Http404, HttpResponseNotAllowed, HttpResponseForbidden, JsonResponse
 from django.urls import reverse
 from django.utils.decorators import method_decorator
-from django.utils import timezone
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.views.generic import ListView, DetailView
 from django.views import View
 from taggit.models import Tag
 from users.models import CustomUser
-from core.models import Subscription, SocialMedia, UserDescription, Article, FavoriteArticles, Reaction, Comment, UserReading
+from core.conditional import ConditionalGetMixin, make_etag
+from core.counters import read_counter
+from core.page_cache import add_page_cache_tags
+from core.pagination import KeysetPaginationMixin
+from core.models import Subscription, SocialMedia, UserDescription, Article, AuthorStats, FavoriteArticles, Reaction, Comment, UserReading, PageVersion
+from core.search import search_articles
 from public.forms import CommentArticleForm
 
 
-class AboutPageView(View):
+class AboutPageView(ConditionalGetMixin, View):
     template_name = 'public/about_page.html'
 
+    def get_validators(self):
+        # description and social media purge author's pages,
+        # reads are changed without purging
+        author_id = self.kwargs['pk']
+        reads = AuthorStats.objects.\
+            filter(user_id=author_id).\
+            values_list('reads', flat=True).first()
+        versions = PageVersion.objects.get_versions([f'author:{author_id}'])
+        return make_etag(reads, versions), None
+
     def get_author(self, pk):
         return CustomUser.objects.filter(pk=pk).first()
 
@@ -33,8 +51,7 @@ class AboutPageView(View):
             order_by('title')
 
     def get_readings(self, author):
-        return Article.objects.filter(
-            author=author).all().aggregate(Sum('times_read'))
+        return AuthorStats.objects.for_user(author).reads
 
     def get(self, request, *args, **kwargs):
         author = self.get_author(self.kwargs['pk'])
@@ -42,70 +59,64 @@ class AboutPageView(View):
             raise Http404
         description = self.get_description(author)
         social_media_list = self.get_social_media(author)
-        readings = self.get_readings(author)['times_read__sum']
+        readings = self.get_readings(author)
         return render(request, self.template_name, {'description': description,
                                                     'social_media_list': social_media_list,
                                                     'author': author,
                                                     'readings': readings})
 
 
-class ArticleDetailView(View):
+class ArticleDetailView(ConditionalGetMixin, View):
     template_name = 'public/article_detail.html'
 
-    def get_article(self, pk):
-        return Article.objects.\
+    def get_validators(self):
+        # edits, tags and reactions purge pages of article,
+        # subscriptions purge pages of author, reads
+        # are changed without purging
+        article = Article.objects.\
+            filter(pk=self.kwargs['pk']).\
+            values_list('author_id', 'times_read').first()
+        if not article:
+            return None, None
+        author_id, times_read = article
+        versions = PageVersion.objects.get_versions([f"article:{self.kwargs['pk']}",
+                                                     f'author:{author_id}'])
+        return make_etag(times_read, versions), None
+
+    def get_article(self, pk, user):
+        # article is fetched together with everything the page shows
+        # about it and about current user: favorite, reaction and
+        # subscription flags and number of author's subscribers,
+        # so rendering it costs one query instead of eight
+        articles = Article.objects.\
             select_related('author').\
-            filter(pk=pk).first()
-
-    def get_favorite(self, user):
-        return FavoriteArticles.objects.\
-            filter(user=user).first()
-
-    def get_subscription(self, user, author):
-        return Subscription.objects.filter(
-            Q(subscriber=user) &
-            Q(subscribe_to=author)
-        ).first()
+            annotate(subscribers=Coalesce('author__stats__subscribers', 0))
+        if user.is_authenticated:
+            favorites = FavoriteArticles.articles.through.objects.\
+                filter(
+                    Q(favoritearticles__user=user) &
+                    Q(article=OuterRef('pk'))
+                )
+            reactions = Reaction.objects.\
+                filter(
+                    Q(article=OuterRef('pk')) &
+                    Q(user=user)
+                ).values('value')[:1]
+            subscriptions = Subscription.objects.\
+                filter(
+                    Q(subscriber=user) &
+                    Q(subscribe_to=OuterRef('author'))
+                )
+            articles = articles.annotate(is_favorite=Exists(favorites),
+                                         reaction_value=Subquery(reactions),
+                                         is_subscribed=Exists(subscriptions))
+        return articles.filter(pk=pk).first()
 
     def manage_user_readings(self, article, user):
-        user_readings = UserReading.objects.\
-            filter(
-                Q(article=article) &
-                Q(user=user)
-            ).all()
-        exists_for_current_date = False
-        user_reading_index = None
-
-        for index, user_reading in enumerate(user_readings):
-            if user_reading.date_read.date() == timezone.now().date():
-                exists_for_current_date = True
-                user_reading_index = index
-        if exists_for_current_date:
-            user_reading: UserReading = user_readings[user_reading_index]
-            user_reading.date_read = timezone.now()
-            user_reading.save()
-            return None
-        else:
-            user_reading = UserReading(
-                user=user,
-                article=article,
-                date_read=timezone.now()
-            )
-            user_reading.save()
-            return None
-
-    def get_reaction(self, user, article):
-        return Reaction.objects.\
-            filter(
-                Q(article=article) &
-                Q(user=user)
-            ).first()
+        UserReading.objects.record(user, article)
 
     def set_favorite_status(self, user, article):
-        if not user.is_authenticated:
-            return 'Add to Favorites'
-        favorite = self.get_favorite(user)
-        if (not favorite) or (article not in favorite.articles.all()):
+        if not user.is_authenticated or not article.is_favorite:
             return 'Add to Favorites'
         else:
             return 'Remove from Favorites'
@@ -113,120 +124,114 @@ class ArticleDetailView(View):
     def set_reaction_status(self, user, article):
         if not user.is_authenticated:
             return None
-        reaction = self.get_reaction(user, article)
-        if not reaction:
-            return None
-        if reaction.value == 1:
+        if article.reaction_value == 1:
             return 'You liked this article'
-        else:
+        elif article.reaction_value == -1:
             return 'You disliked this article'
+        return None
 
-    def set_subscription_status(self, user, author):
-        if not user.is_authenticated:
-            return 'Subscribe'
-        subscription = self.get_subscription(user, author)
-        if not subscription:
+    def set_subscription_status(self, user, article):
+        if not user.is_authenticated or not article.is_subscribed:
             return 'Subscribe'
         else:
             return 'Unsubscribe'
 
-    def get_likes(self, article):
-        likes = Reaction.objects.filter(
-            Q(article=article) &
-            Q(value=1)
-        ).count()
-        return likes
-
-    def get_dislikes(self, article):
-        dislikes = Reaction.objects.filter(
-            Q(article=article) &
-            Q(value=-1)
-        ).count()
-        return dislikes
-
-    def get_subscribers(self, author):
-        return Subscription.objects.\
-            filter(subscribe_to=author).count()
+    def get_context(self, user, article, show_content):
+        # likes and dislikes are denormalized counters
+        # maintained by Reaction model
+        return {'article': article,
+                'favorite_status': self.set_favorite_status(user, article),
+                'show_content': show_content,
+                'reaction_status': self.set_reaction_status(user, article),
+                'subscription_status': self.set_subscription_status(user, article),
+                'likes': article.likes,
+                'dislikes': article.dislikes,
+                'subscribers': article.subscribers}
 
     def get(self, request, *args, **kwargs):
         current_user = request.user
-        article = self.get_article(self.kwargs['pk'])
+        article = self.get_article(self.kwargs['pk'], current_user)
         if not article:
             raise Http404
-        favorite_status = self.set_favorite_status(current_user, article)
-        reaction_status = self.set_reaction_status(current_user, article)
-        subscription_status = self.set_subscription_status(
-            current_user, article.author)
-        likes = self.get_likes(article)
-        dislikes = self.get_dislikes(article)
-        subscribers = self.get_subscribers(article.author)
-        return render(request, self.template_name, {'article': article,
-                                                    'favorite_status': favorite_status,
-                                                    'show_content': False,
-                                                    'reaction_status': reaction_status,
-                                                    'subscription_status': subscription_status,
-                                                    'likes': likes,
-                                                    'dislikes': dislikes,
-                                                    'subscribers': subscribers})
+        add_page_cache_tags(request, f'article:{article.id}',
+                            f'author:{article.author_id}')
+        return render(request, self.template_name,
+                      self.get_context(current_user, article, False))
 
     def post(self, request, *args, **kwargs):
         current_user = request.user
-        article = self.get_article(self.kwargs['pk'])
+        article = self.get_article(self.kwargs['pk'], current_user)
         if not article:
             raise Http404
         if current_user.is_authenticated:
+            # increment is written to the database later by the buffer,
+            # reader sees it right away
+            read_counter.add(article.id)
             article.times_read += 1
-            article.save()
-        favorite_status = self.set_favorite_status(current_user, article)
-        reaction_status = self.set_reaction_status(current_user, article)
-        likes = self.get_likes(article)
-        dislikes = self.get_dislikes(article)
-        subscribers = self.get_subscribers(article.author)
-        subscription_status = self.set_subscription_status(
-            current_user, article.author)
-        if current_user.is_authenticated:
             self.manage_user_readings(article, current_user)
-        return render(request, self.template_name, {'article': article,
-                                                    'favorite_status': favorite_status,
-                                                    'show_content': True,
-                                                    'reaction_status': reaction_status,
-                                                    'subscription_status': subscription_status,
-                                                    'likes': likes,
-                                                    'dislikes': dislikes,
-                                                    'subscribers': subscribers})
+        return render(request, self.template_name,
+                      self.get_context(current_user, article, True))
 
 
-class CommentsByArticleList(ListView):
+class CommentsByArticleList(ConditionalGetMixin, KeysetPaginationMixin, ListView):
     template_name = 'public/comments_by_article.html'
     context_object_name = 'comments'
+    keyset_ordering = ('pub_date', 'id')
+
+    def get_validators(self):
+        # number of comments changes when one is deleted,
+        # latest update_date when one is published or updated,
+        # there is no Last-Modified, deleting a comment does not move it
+        comments = Comment.objects.\
+            filter(article_id=self.kwargs['pk']).\
+            aggregate(number=Count('id'), last_update=Max('update_date'))
+        versions = PageVersion.objects.get_versions([f"article:{self.kwargs['pk']}"])
+        return make_etag(comments['number'], comments['last_update'], versions), None
+
+    def get_per_page(self):
+        return getattr(settings, 'COMMENTS_PER_PAGE', 20)
 
     def get_queryset(self):
-        article_id = self.kwargs['pk']
-        article = Article.objects.filter(id=article_id).first()
-        if not article:
+        # article is fetched once and reused by get_context_data
+        self.article = Article.objects.filter(id=self.kwargs['pk']).first()
+        if not self.article:
             raise Http404
-        comments = Comment.objects.\
-            select_related('user').filter(article=article).\
-            order_by('pub_date').all()
-        return comments
+        return Comment.objects.\
+            select_related('user').filter(article=self.article)
+
+    def get_number_of_comments(self):
+        return Comment.objects.filter(article=self.article).count()
 
     def get_context_data(self, **kwargs: Any):
         context = super().get_context_data(**kwargs)
-        article = Article.objects.filter(id=self.kwargs['pk']).first()
-        context['article'] = article
+        context['article'] = self.article
+        context['number_of_comments'] = self.get_number_of_comments()
         return context
 
 
+class MoreCommentsView(CommentsByArticleList):
+    """
+    Returns next page of comments as rendered html fragment
+    for 'Load more comments' button
+    """
+    template_name = 'public/includes/comments.html'
+
+    def get_number_of_comments(self):
+        return None
+
+    def render_to_response(self, context, **response_kwargs):
+        html = render_to_string(self.template_name, context,
+                                request=self.request)
+        return JsonResponse({'html': html,
+                             'next_cursor': context['page'].next_cursor})
+
+
 class AddRemoveFavoriteArticle(View):
     redirect_to = 'public:article-detail'
     success_remove = 'You successfully removed this article from your Favorites'
     success_add = 'You successfully added this article to your Favorites'
     info_message = 'Please, become an authenticated user to add this article to your Favorites'
 
-    def get_favorite(self, user):
-        return FavoriteArticles.objects.\
-            filter(user=user).first()
-
     def get_article(self, pk):
         return Article.objects.filter(pk=pk).first()
 
@@ -238,29 +243,14 @@ class AddRemoveFavoriteArticle(View):
         if not current_user.is_authenticated:
             messages.info(request, self.info_message)
             return HttpResponseRedirect(reverse(self.redirect_to, args=(article.id, )))
-        favorite = self.get_favorite(current_user)
-        if not favorite:
-            # If user have never added any articles to favorites
-            # then when they hit this view we both create new instance of
-            # FavoriteArticles and add new article in many-to-many relationship
-            # between FavoriteArticles and Article models
-            favorite = FavoriteArticles(user=current_user)
-            favorite.save()
-            favorite.articles.add(article)
-            messages.success(request, self.success_add)
-            return HttpResponseRedirect(reverse(self.redirect_to, args=(article.id, )))
-        # If user already has FavoriteArticles instance
-        # we check if article in many-to-many relationship
-        if article not in favorite.articles.all():
-            # If not we add and return appropriate message about it
-            favorite.articles.add(article)
+        # If user have never added any articles to favorites
+        # then instance of FavoriteArticles is created first
+        favorite, _ = FavoriteArticles.objects.get_or_create(user=current_user)
+        if favorite.toggle_article(article):
             messages.success(request, self.success_add)
-            return HttpResponseRedirect(reverse(self.redirect_to, args=(article.id, )))
         else:
-            # If it article is there, we remove it and return appropriate message about it
-            favorite.articles.remove(article)
             messages.success(request, self.success_remove)
-            return HttpResponseRedirect(reverse(self.redirect_to, args=(article.id, )))
+        return HttpResponseRedirect(reverse(self.redirect_to, args=(article.id, )))
 
 
 class LeaveReactionBaseClass(View):
@@ -273,7 +263,10 @@ class LeaveReactionBaseClass(View):
         return Article.objects.filter(pk=pk).first()
 
     def get_reaction(self, user, article):
+        # row is locked, so that two quick clicks on the same button
+        # cannot change article's counters twice
         return Reaction.objects.\
+            select_for_update().\
             filter(
                 Q(article=article) &
                 Q(user=user)
@@ -313,11 +306,17 @@ class LeaveReactionBaseClass(View):
         if not current_user.is_authenticated:
             messages.info(request, self.info_message)
             return HttpResponseRedirect(reverse(self.redirect_to, args=(article.id, )))
-        reaction = self.get_reaction(current_user, article)
-        if self.is_dislike:
-            self.leave_dislike(current_user, article, reaction)
-        if self.is_like:
-            self.leave_like(current_user, article, reaction)
+        try:
+            with transaction.atomic():
+                reaction = self.get_reaction(current_user, article)
+                if self.is_dislike:
+                    self.leave_dislike(current_user, article, reaction)
+                if self.is_like:
+                    self.leave_like(current_user, article, reaction)
+        except IntegrityError:
+            # another request of the user reacted first, there
+            # was no row to lock when this one looked for it
+            pass
         return HttpResponseRedirect(reverse(self.redirect_to, args=(article.id, )))
 
 
@@ -439,7 +438,45 @@ class UpdateCommentView(View):
         return super().dispatch(request, *args, **kwargs)
 
 
-class SubscribeUnsubscribeThroughArticleDetail(View):
+class SubscriptionMixin:
+    """
+    Mixin for views that subscribe current user to an author
+    or unsubscribe from them
+    """
+
+    def get_subscription(self, user, author):
+        return Subscription.objects.filter(
+            Q(subscriber=user) &
+            Q(subscribe_to=author)
+        ).first()
+
+    def save_subscription(self, subscription):
+        # quick second click finds subscription already there
+        try:
+            with transaction.atomic():
+                subscription.save()
+        except IntegrityError:
+            pass
+
+    def toggle_subscription(self, user, author):
+        # row is locked, so two quick clicks on unsubscribe cannot
+        # delete it twice and take two subscribers off the author
+        with transaction.atomic():
+            subscription = Subscription.objects.\
+                select_for_update().\
+                filter(
+                    Q(subscriber=user) &
+                    Q(subscribe_to=author)
+                ).first()
+            if not subscription:
+                self.save_subscription(Subscription(subscriber=user,
+                                                    subscribe_to=author))
+                return self.success_message_subscribed
+            subscription.delete()
+            return self.success_message_unsubscribed
+
+
+class SubscribeUnsubscribeThroughArticleDetail(SubscriptionMixin, View):
     """
     This view is called in 'article_detail.html' template,
     and it redirects back to 'public:article-detail' view
@@ -454,12 +491,6 @@ class SubscribeUnsubscribeThroughArticleDetail(View):
         return Article.objects.\
             filter(pk=pk).first()
 
-    def get_subscription(self, user, author):
-        return Subscription.objects.filter(
-            Q(subscriber=user) &
-            Q(subscribe_to=author)
-        ).first()
-
     def post(self, request, *args, **kwargs):
         current_user = request.user
         article = self.get_article(self.kwargs['pk'])
@@ -472,52 +503,56 @@ class SubscribeUnsubscribeThroughArticleDetail(View):
         if author == current_user:
             messages.info(request, self.info_message_to_auth_user)
             return HttpResponseRedirect(reverse(self.redirect_to, args=(article.id,)))
-        subscription = self.get_subscription(current_user, author)
-        if not subscription:
-            subscription = Subscription(
-                subscriber=current_user,
-                subscribe_to=author
-            )
-            subscription.save()
-            success_message = self.success_message_subscribed
-        else:
-            subscription.delete()
-            success_message = self.success_message_unsubscribed
+        success_message = self.toggle_subscription(current_user, author)
         messages.success(request, success_message)
         return HttpResponseRedirect(reverse(self.redirect_to, args=(article.id,)))
 
 
-class ArticlesByTag(ListView):
+class ArticlesByTag(KeysetPaginationMixin, ListView):
     context_object_name = 'articles'
     template_name = 'public/articles_by_tag.html'
+    keyset_ordering = ('-times_read', 'id')
 
     def get_queryset(self):
         tag_slug = self.kwargs['slug']
-        tag_object = Tag.objects.filter(slug=tag_slug).first()
+        self.tag_object = Tag.objects.\
+            select_related('cloud').\
+            filter(slug=tag_slug).first()
+        # tags are prefetched by the template only for
+        # articles whose cards are not cached
         articles = Article.objects.\
             select_related('author').\
-            prefetch_related('tags').\
-            filter(tags=tag_object).\
-            order_by('-times_read').all()
+            filter(tags=self.tag_object).all()
         return articles
 
+    def get_number_of_articles(self):
+        # total number comes from tag cloud, so it is not
+        # counted again on every page
+        if not self.tag_object or not hasattr(self.tag_object, 'cloud'):
+            return 0
+        return self.tag_object.cloud.articles_count
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['tag'] = ' '.join(self.kwargs['slug'].split('-'))
+        context['number_of_articles'] = self.get_number_of_articles()
+        add_page_cache_tags(self.request, f"tag:{self.kwargs['slug']}")
         return context
 
 
-class SearchArticlesView(View):
+class SearchArticlesView(KeysetPaginationMixin, View):
     template_name = 'public/search_results.html'
+    # rank is not stable, FULLTEXT relevance changes with every article
+    # indexed and rank of inverted index with every edit, so pages can
+    # skip or repeat an article between requests, id as the last field
+    # keeps order of articles with equal rank and times read fixed
+    keyset_ordering = ('-rank', '-times_read', 'id')
 
     def get_articles(self, search_string):
-        return Article.objects.\
-            select_related('author').\
-            prefetch_related('tags').\
-            filter(
-                Q(title__icontains=search_string) |
-                Q(author__username__icontains=search_string)
-            ).order_by('-times_read').all()
+        # articles are found through search index of title,
+        # content, tags and author's name, most relevant first
+        return search_articles(search_string).\
+            select_related('author')
 
     def convert_tag_to_slug(self, tag: str):
         # this method is needed if
@@ -542,27 +577,29 @@ class SearchArticlesView(View):
             tag_slug = self.convert_tag_to_slug(query.strip()[1:])
             return HttpResponseRedirect(reverse('public:articles-tag', args=(tag_slug, )))
 
-        articles = self.get_articles(query)
-        return render(request, self.template_name, {'articles': articles,
+        page = self.paginate_keyset(self.get_articles(query))
+        return render(request, self.template_name, {'articles': page.object_list,
+                                                    'page': page,
                                                     'query': query})
 
 
-class AuthorPageView(View):
+class AuthorPageView(ConditionalGetMixin, SubscriptionMixin, View):
     template_name = 'public/author_page.html'
 
+    def get_validators(self):
+        # everything the page shows purges pages of author,
+        # number of subscribers is also rebuilt without purging
+        subscribers = AuthorStats.objects.\
+            filter(user_id=self.kwargs['pk']).\
+            values_list('subscribers', flat=True).first()
+        versions = PageVersion.objects.get_versions([f"author:{self.kwargs['pk']}"])
+        return make_etag(subscribers, versions), None
+
     def get_author(self, pk):
         return CustomUser.objects.filter(pk=pk).first()
 
     def get_subscribers(self, author):
-        return Subscription.objects.\
-            filter(subscribe_to=author).\
-            count()
-
-    def get_subscription(self, user, author):
-        return Subscription.objects.filter(
-            Q(subscriber=user) &
-            Q(subscribe_to=author)
-        ).first()
+        return AuthorStats.objects.for_user(author).subscribers
 
     def set_subscription_status(self, user, author):
         if not user.is_authenticated:
@@ -581,12 +618,13 @@ class AuthorPageView(View):
         subscription_status = self.set_subscription_status(
             current_user, author)
         subscribers = self.get_subscribers(author)
+        add_page_cache_tags(request, f'author:{author.id}')
         return render(request, self.template_name, {'author': author,
                                                     'subscription_status': subscription_status,
                                                     'subscribers': subscribers})
 
 
-class SubscribeUnsubscribeThroughAuthorPageView(View):
+class SubscribeUnsubscribeThroughAuthorPageView(SubscriptionMixin, View):
     info_message_to_anonymous_user = 'You cannot subscribe to this author while you are not authenticated'
     info_message_to_auth_user = 'You cannot subscribe to yourself'
     redirect_to = 'public:author-page'
@@ -596,12 +634,6 @@ class SubscribeUnsubscribeThroughAuthorPageView(View):
     def get_author(self, pk):
         return CustomUser.objects.filter(pk=pk).first()
 
-    def get_subscription(self, user, author):
-        return Subscription.objects.filter(
-            Q(subscriber=user) &
-            Q(subscribe_to=author)
-        ).first()
-
     def post(self, request, *args, **kwargs):
         current_user = request.user
         author = self.get_author(self.kwargs['pk'])
@@ -613,37 +645,41 @@ class SubscribeUnsubscribeThroughAuthorPageView(View):
         if current_user == author:
             messages.info(request, self.info_message_to_auth_user)
             return HttpResponseRedirect(reverse(self.redirect_to, args=(author.id, )))
-        subscription = self.get_subscription(current_user, author)
-        if not subscription:
-            subscription = Subscription(
-                subscriber=current_user,
-                subscribe_to=author
-            )
-            subscription.save()
-            success_message = self.success_message_subscribed
-        else:
-            subscription.delete()
-            success_message = self.success_message_unsubscribed
+        success_message = self.toggle_subscription(current_user, author)
         messages.success(request, success_message)
         return HttpResponseRedirect(reverse(self.redirect_to, args=(author.id, )))
 
 
-class ArticlesByAuthor(View):
+class ArticlesByAuthor(KeysetPaginationMixin, View):
     template_name = 'public/articles_by_author.html'
+    keyset_ordering = ('-times_read', 'id')
 
     def get_author(self, pk):
         return CustomUser.objects.filter(pk=pk).first()
 
     def get_articles(self, author):
         return Article.objects.\
-            prefetch_related('tags').\
-            filter(author=author).\
-            order_by('-times_read').all()
+            filter(author=author).all()
 
     def get(self, request, *args, **kwargs):
         author = self.get_author(self.kwargs['pk'])
         if not author:
             raise Http404
         articles = self.get_articles(author)
-        return render(request, self.template_name, {'articles': articles,
+        page = self.paginate_keyset(articles)
+        return render(request, self.template_name, {'articles': page.object_list,
+                                                    'page': page,
+                                                    'number_of_articles': articles.count(),
                                                     'author': author})
+
+
+class TrendingArticlesView(ListView):
+    context_object_name = 'articles'
+    template_name = 'public/trending_articles.html'
+    number_of_articles = 30
+
+    def get_queryset(self):
+        return Article.objects.\
+            select_related('author').\
+            prefetch_related('tags').\
+            trending()[:self.number_of_articles]
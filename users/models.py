@@ -1,18 +1,10 @@
 from django.db import models
-from django.core.exceptions import ValidationError
 from django.contrib.auth.models import AbstractUser
+from core.validators import check_image
 
 
 def validate_image(image):
-    file_size = image.file.size
-    limit_kb = 500
-    if file_size > limit_kb * 1024:
-        raise ValidationError(f"Maximum size of the image is {limit_kb} KB")
-
-    # file_size = image.file.size
-    # limit_mb = 8
-    # if file_size > limit_mb * 1024 * 1024:
-    #     raise ValidationError(f"Maximum size of the image is {limit_mb} MB")
+    check_image(image, limit_kb=500)
 
 
 class CustomUser(AbstractUser):